@@ -15,15 +15,29 @@ from tkinter import ttk, filedialog, messagebox
 import requests
 import openai
 
+from modules.screen_capture import create_capture_backend
+from modules.search_scope import split_scope, resolve_scope, unscoped_target
+from modules.template_store import TemplateStore
+from modules.template_matching import locate_in_frame, locate_near, locate_all
+from modules.feature_matcher import MATCHERS, create_feature_matcher
+from modules.ocr_engine import get_ocr_engine
+from modules.text_index import ScreenTextIndex
+
 class AIVisionController:
     def __init__(self):
         self.setup_pyautogui()
         self.ui_elements = {}
+        self.regions = {}  # Saved search rectangles by name
         self.action_history = []
         self.confidence_threshold = 0.8
         self.workflows = {}  # Store automation workflows
         self.api_key = None  # OpenAI API key
         self.model = "gpt-3.5-turbo"  # Default model
+        self.capture_backend = create_capture_backend("auto")  # Persistent screen grabber
+        self.template_store = TemplateStore()  # Decoded UI element images, loaded once
+        self.prior_margin = 32  # Pixels searched around an element's last found box
+        self.element_stats = {}  # Last-location hits/misses per element
+        self.feature_matchers = {}  # Keypoint matchers by name, created on first use
         
     def setup_pyautogui(self):
         """Configure PyAutoGUI settings"""
@@ -31,73 +45,144 @@ class AIVisionController:
         pyautogui.PAUSE = 0.1
         self.screen_width, self.screen_height = pyautogui.size()
         
+    def grab_frame(self, region=None):
+        """Capture screen or specific region as a NumPy-backed Frame"""
+        return self.capture_backend.grab(region)
+        
     def take_screenshot(self, region=None) -> Image.Image:
         """Take screenshot of screen or specific region"""
-        if region:
-            screenshot = pyautogui.screenshot(region=region)
-        else:
-            screenshot = pyautogui.screenshot()
-        return screenshot
+        return self.grab_frame(region).to_pil()
         
-    def save_ui_element(self, name: str, image_path: str, action_type: str = "click"):
-        """Save UI element reference for later recognition"""
+    def save_ui_element(self, name: str, image_path: str, action_type: str = "click", matcher: str = "template"):
+        """Save UI element reference for later recognition
+        
+        matcher is "template" for pixel matching, or "orb"/"akaze" for
+        keypoint matching that still works at a different display scaling.
+        """
+        if matcher not in MATCHERS:
+            print(f"Unknown matcher '{matcher}', using template matching")
+            matcher = "template"
         if os.path.exists(image_path):
             self.ui_elements[name] = {
                 'image_path': image_path,
                 'action_type': action_type,
+                'matcher': matcher,
                 'last_found': None
             }
+            self.template_store.add(image_path)
             print(f"UI element '{name}' saved successfully")
         else:
             print(f"Image file not found: {image_path}")
             
-    def find_ui_element(self, element_name: str) -> Optional[Tuple[int, int, int, int]]:
-        """Find UI element on screen using template matching"""
+    def save_region(self, name: str, region: Tuple[int, int, int, int]):
+        """Save a named screen rectangle that lookups can be scoped to"""
+        self.regions[name] = tuple(int(v) for v in region)
+        
+    def find_ui_element(self, element_name: str, region=None) -> Optional[Tuple[int, int, int, int]]:
+        """Find UI element on screen (or within region) using template matching"""
         if element_name not in self.ui_elements:
             print(f"UI element '{element_name}' not found in saved elements")
             return None
             
         element = self.ui_elements[element_name]
-        try:
-            # Use PyAutoGUI's built-in image recognition
-            location = pyautogui.locateOnScreen(element['image_path'], confidence=self.confidence_threshold)
-            if location:
-                element['last_found'] = location
-                return location
-            else:
-                print(f"Could not find '{element_name}' on screen")
-                return None
-        except pyautogui.ImageNotFoundException:
+        # Decoded once and kept in memory (reloaded if the file changes)
+        template = self.template_store.get(element['image_path'])
+        if template is None:
             print(f"Image not found for '{element_name}'")
             return None
             
-    def find_ui_element_opencv(self, element_name: str) -> Optional[Tuple[int, int, int, int]]:
+        match = self._locate_with_prior(element_name, template, self.grab_frame(region))
+        if match:
+            location = match[1]
+            element['last_found'] = location
+            return location
+        else:
+            print(f"Could not find '{element_name}' on screen")
+            return None
+            
+    def _locate_with_prior(self, element_name: str, template, frame, color: bool = False):
+        """Check the element's last found box (and a small margin) before scanning the whole frame"""
+        matcher = self.ui_elements[element_name].get('matcher', 'template')
+        if matcher != 'template':
+            if matcher not in self.feature_matchers:
+                self.feature_matchers[matcher] = create_feature_matcher(matcher)
+            return self.feature_matchers[matcher].locate(frame, template)
+        stats = self.element_stats.setdefault(element_name, {'hits': 0, 'misses': 0})
+        last_found = self.ui_elements[element_name].get('last_found')
+        if last_found:
+            match = locate_near(frame, template, tuple(last_found), self.prior_margin,
+                                self.confidence_threshold, color=color)
+            if match:
+                stats['hits'] += 1
+                return match
+        stats['misses'] += 1
+        return locate_in_frame(frame, template, self.confidence_threshold, color=color)
+        
+    def find_ui_element_opencv(self, element_name: str, region=None) -> Optional[Tuple[int, int, int, int]]:
         """Alternative UI element finding using OpenCV"""
         if element_name not in self.ui_elements:
             return None
             
-        # Take screenshot
-        screenshot = self.take_screenshot()
-        screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
-        
-        # Load template
-        template = cv2.imread(self.ui_elements[element_name]['image_path'])
+        # Preloaded template instead of cv2.imread on every lookup
+        template = self.template_store.get(self.ui_elements[element_name]['image_path'])
         if template is None:
             print(f"Could not load template for '{element_name}'")
             return None
             
-        # Template matching
-        result = cv2.matchTemplate(screenshot_cv, template, cv2.TM_CCOEFF_NORMED)
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-        
-        if max_val >= self.confidence_threshold:
-            h, w = template.shape[:2]
-            top_left = max_loc
-            bottom_right = (top_left[0] + w, top_left[1] + h)
-            return (top_left[0], top_left[1], w, h)
+        # Colour template matching on the screenshot (only the searched region),
+        # or the element's keypoint matcher
+        match = self._locate_with_prior(element_name, template, self.grab_frame(region), color=True)
+        if match:
+            return match[1]
         else:
             return None
             
+    def locate_many(self, names: List[str], frame=None, region=None, color: bool = False) -> Dict[str, Optional[Dict]]:
+        """Find several UI elements in one capture, matching templates in parallel
+        
+        Returns a dict of name -> {"box": (x, y, w, h), "center": (x, y),
+        "confidence": score}, with None for elements that weren't found.
+        """
+        templates = {}
+        for name in names:
+            if name not in self.ui_elements:
+                print(f"UI element '{name}' not found in saved elements")
+                continue
+            template = self.template_store.get(self.ui_elements[name]['image_path'])
+            if template is not None:
+                templates[name] = template
+                
+        results = {name: None for name in names}
+        if not templates:
+            return results
+            
+        if frame is None:
+            frame = self.grab_frame(region)
+        matches = {}
+        for name in list(templates):
+            if self.ui_elements[name].get('matcher', 'template') != 'template':
+                matches[name] = self._locate_with_prior(name, templates.pop(name), frame)
+                continue
+            last_found = self.ui_elements[name].get('last_found')
+            stats = self.element_stats.setdefault(name, {'hits': 0, 'misses': 0})
+            match = None
+            if last_found:
+                match = locate_near(frame, templates[name], tuple(last_found), self.prior_margin,
+                                    self.confidence_threshold, color=color)
+            if match:
+                stats['hits'] += 1
+                matches[name] = match
+                del templates[name]
+            else:
+                stats['misses'] += 1
+        matches.update(locate_all(frame, templates, self.confidence_threshold, color=color))
+        for name, match in matches.items():
+            if match:
+                score, (x, y, w, h) = match
+                results[name] = {'box': (x, y, w, h), 'center': (x + w // 2, y + h // 2), 'confidence': score}
+                self.ui_elements[name]['last_found'] = (x, y, w, h)
+        return results
+        
     def perform_action(self, action_type: str, target=None, text=None, **kwargs):
         """Perform various automation actions"""
         try:
@@ -105,11 +190,22 @@ class AIVisionController:
                 print("Warning: No action type specified")
                 return
                 
+            region = kwargs.get('region')
+            if kwargs.get('scope'):
+                region = resolve_scope(self, kwargs['scope'])
+                if region is None:
+                    if not isinstance(target, str):
+                        print(f"Search scope not found: {kwargs['scope']['name']}")
+                        return
+                    # "Stores near me" may just be the text to look for
+                    target = unscoped_target(target, kwargs['scope'])
+                    print(f"Search scope not found: {kwargs['scope']['name']}, looking for '{target}' as written")
+                    
             if action_type == "click":
                 if target:
                     if isinstance(target, str):  # UI element name
                         try:
-                            location = self.find_ui_element(target)
+                            location = self.find_ui_element(target, region=region)
                             if location:
                                 center_x = location[0] + location[2] // 2
                                 center_y = location[1] + location[3] // 2
@@ -117,7 +213,7 @@ class AIVisionController:
                                 self.log_action(f"Clicked on '{target}' at ({center_x}, {center_y})")
                             else:
                                 # If UI element not found, try to find by text
-                                if self.click_on_text(target):
+                                if self.click_on_text(target, region):
                                     pass  # Successfully clicked by text
                                 else:
                                     print(f"Could not find UI element or text: {target}")
@@ -139,7 +235,7 @@ class AIVisionController:
             elif action_type == "double_click":
                 if target and isinstance(target, str):
                     try:
-                        location = self.find_ui_element(target)
+                        location = self.find_ui_element(target, region=region)
                         if location:
                             center_x = location[0] + location[2] // 2
                             center_y = location[1] + location[3] // 2
@@ -147,7 +243,7 @@ class AIVisionController:
                             self.log_action(f"Double-clicked on '{target}'")
                         else:
                             # Try to find by text
-                            text_pos = self.find_text_on_screen(target)
+                            text_pos = self.find_text_on_screen(target, region)
                             if text_pos:
                                 pyautogui.doubleClick(text_pos[0], text_pos[1])
                                 self.log_action(f"Double-clicked on text '{target}'")
@@ -164,7 +260,7 @@ class AIVisionController:
                         
             elif action_type == "right_click":
                 if target and isinstance(target, str):
-                    location = self.find_ui_element(target)
+                    location = self.find_ui_element(target, region=region)
                     if location:
                         center_x = location[0] + location[2] // 2
                         center_y = location[1] + location[3] // 2
@@ -228,6 +324,11 @@ class AIVisionController:
         actions = []
         command = command.lower().strip()
         
+        # Split off a search scope (ok in "save as") so it isn't parsed as part of the target
+        scope = None
+        if re.match(r'(?:double.?|right.?)?click\b', command):
+            command, scope = split_scope(command)
+        
         # Define command patterns with enhanced coverage
         patterns = {
             # Basic UI interactions
@@ -356,6 +457,11 @@ class AIVisionController:
                     actions = first_actions + second_actions
                     break
         
+        if scope:
+            for action in actions:
+                if action.get('action') in ('click', 'double_click', 'right_click'):
+                    action['scope'] = scope
+        
         return actions
         
     def execute_command_sequence(self, commands: List[str]):
@@ -369,11 +475,9 @@ class AIVisionController:
                 target = action.get('target')
                 text = action.get('text')
                 
-                # Convert target to actual UI element if it exists
-                if target and target in self.ui_elements:
-                    self.perform_action(action_type, target=target, text=text, **action)
-                else:
-                    self.perform_action(action_type, target=target, text=text, **action)
+                # Remaining keys (clicks, duration, scope, ...) are action options
+                options = {key: value for key, value in action.items() if key not in ('action', 'target', 'text')}
+                self.perform_action(action_type, target=target, text=text, **options)
                     
                 time.sleep(0.5)  # Small delay between actions
                 
@@ -394,9 +498,9 @@ class AIVisionController:
         print(f"UI element '{name}' created and saved to {image_path}")
         
     def get_screen_text_ocr(self, region=None) -> str:
-        """Extract text from screen using OCR (requires pytesseract)"""
+        """Extract text from screen using OCR (requires Tesseract, see modules.ocr_engine)"""
         try:
-            import pytesseract
+            engine = get_ocr_engine()
             from PIL import Image
             
             screenshot = self.take_screenshot(region=region)
@@ -416,11 +520,11 @@ class AIVisionController:
             
             # Perform OCR
             config = '--psm 6'  # Assume a single block of text
-            text = pytesseract.image_to_string(processed_image, config=config)
+            text = engine.image_to_string(processed_image, config=config)
             
             return text.strip()
         except ImportError:
-            print("pytesseract not installed. Install with: pip install pytesseract")
+            print("No OCR engine available. Install with: pip install tesserocr (or pytesseract)")
             print("You also need to install Tesseract OCR: https://github.com/tesseract-ocr/tesseract")
             return ""
         except Exception as e:
@@ -430,8 +534,7 @@ class AIVisionController:
     def find_text_on_screen(self, text: str, region=None) -> Optional[Tuple[int, int]]:
         """Find text on screen and return its location using OCR"""
         try:
-            import pytesseract
-            import cv2
+            engine = get_ocr_engine()
             
             screenshot = self.take_screenshot(region=region)
             screenshot_np = np.array(screenshot)
@@ -443,87 +546,23 @@ class AIVisionController:
             # Apply threshold to make text more visible
             _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
             
-            # Use pytesseract to get word boxes
+            # Get word boxes from the loaded Tesseract engine
             custom_config = r'--oem 3 --psm 11'
-            data = pytesseract.image_to_data(binary, config=custom_config, output_type=pytesseract.Output.DICT)
-            
-            # Search for the target text
-            target_text = text.lower()
-            
-            n_boxes = len(data['text'])
-            for i in range(n_boxes):
-                word = data['text'][i].lower().strip()
-                
-                # Check if this word matches or contains the target text
-                if word and (word == target_text or target_text in word):
-                    # Get box coordinates
-                    x = data['left'][i]
-                    y = data['top'][i]
-                    w = data['width'][i]
-                    h = data['height'][i]
-                    
-                    # Calculate center of the word
-                    center_x = x + w // 2
-                    center_y = y + h // 2
-                    
-                    # If region was provided, adjust coordinates
-                    if region:
-                        center_x += region[0]
-                        center_y += region[1]
-                        
-                    print(f"Found text '{text}' at ({center_x}, {center_y})")
-                    return (center_x, center_y)
-                    
-                # Also check for consecutive words that form the target
-                if i < n_boxes - 1:
-                    two_words = f"{word} {data['text'][i+1].lower().strip()}"
-                    if two_words == target_text or target_text in two_words:
-                        # Calculate center between two words
-                        x1 = data['left'][i]
-                        x2 = data['left'][i+1] + data['width'][i+1]
-                        y1 = data['top'][i] + data['height'][i] // 2
-                        y2 = data['top'][i+1] + data['height'][i+1] // 2
-                        
-                        center_x = (x1 + x2) // 2
-                        center_y = (y1 + y2) // 2
-                        
-                        # If region was provided, adjust coordinates
-                        if region:
-                            center_x += region[0]
-                            center_y += region[1]
-                            
-                        print(f"Found text '{text}' at ({center_x}, {center_y})")
-                        return (center_x, center_y)
+            data = engine.image_to_data(binary, config=custom_config)
+            
+            # Whole words or phrases along a line, else text contained in a line
+            index = ScreenTextIndex(data, offset=(region[0], region[1]) if region else (0, 0))
+            spans = index.find(text)
+            if spans:
+                center_x, center_y = spans[0].center
+                print(f"Found text '{text}' at ({center_x}, {center_y})")
+                return (center_x, center_y)
                         
-            # If text is not found directly, check for partial matches
-            best_match = None
-            best_ratio = 0
-            
-            for i in range(n_boxes):
-                word = data['text'][i].lower().strip()
-                if len(word) >= 3:  # Ignore very short words
-                    # Calculate similarity ratio
-                    import difflib
-                    ratio = difflib.SequenceMatcher(None, word, target_text).ratio()
-                    
-                    if ratio > 0.7 and ratio > best_ratio:  # At least 70% similar
-                        best_match = i
-                        best_ratio = ratio
-            
-            if best_match is not None:
-                x = data['left'][best_match]
-                y = data['top'][best_match]
-                w = data['width'][best_match]
-                h = data['height'][best_match]
-                
-                center_x = x + w // 2
-                center_y = y + h // 2
-                
-                # If region was provided, adjust coordinates
-                if region:
-                    center_x += region[0]
-                    center_y += region[1]
-                    
+            # If text is not found directly, look for a close match (OCR misreadings)
+            matches = index.fuzzy(text, min_score=0.7)
+            if matches:
+                best_ratio, best_match = matches[0]
+                center_x, center_y = best_match.center
                 print(f"Found closest match for '{text}' at ({center_x}, {center_y}) with {best_ratio:.2f} confidence")
                 return (center_x, center_y)
             
@@ -531,7 +570,7 @@ class AIVisionController:
             return None
             
         except ImportError:
-            print("Required libraries not installed. Install with: pip install pytesseract opencv-python")
+            print("Required libraries not installed. Install with: pip install tesserocr (or pytesseract) opencv-python")
             return None
         except Exception as e:
             print(f"Error finding text: {str(e)}")
@@ -631,6 +670,10 @@ class AIVisionController:
             self.workflows = config.get('workflows', {})
             self.confidence_threshold = config.get('confidence_threshold', 0.8)
             
+            # Decode every element image now so lookups skip file I/O
+            self.template_store.clear()
+            self.template_store.preload(element['image_path'] for element in self.ui_elements.values())
+            
             print(f"Data loaded from {filename}")
             print(f"Loaded {len(self.ui_elements)} UI elements and {len(self.workflows)} workflows")
             
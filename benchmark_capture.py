@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# Micro-benchmark comparing screen capture backends
+
+import sys
+import os
+import time
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.screen_capture import create_capture_backend
+
+ITERATIONS = 30
+REGION = (100, 100, 400, 300)
+
+
+def time_calls(func, iterations=ITERATIONS):
+    """Return the mean time of func() in milliseconds"""
+    func()  # Warm up (creates grabbers, loads libraries)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark_backend(name):
+    """Benchmark one backend on full-screen and region captures"""
+    try:
+        backend = create_capture_backend(name)
+    except Exception as e:
+        print(f"{name:<10} unavailable: {str(e)}")
+        return
+
+    try:
+        full = time_calls(lambda: backend.grab())
+        full_pil = time_calls(lambda: backend.grab().to_pil())
+        region = time_calls(lambda: backend.grab(REGION))
+        region_pil = time_calls(lambda: backend.grab(REGION).to_pil())
+        frame = backend.grab()
+        print(f"{name:<10} {frame.width}x{frame.height:<6} "
+              f"{full:>9.2f} {full_pil:>11.2f} {region:>9.2f} {region_pil:>11.2f}")
+    finally:
+        backend.close()
+
+
+def main():
+    """Main entry point"""
+    print(f"Capture backend benchmark ({ITERATIONS} iterations, region={REGION})")
+    print(f"{'backend':<10} {'screen':<11} {'full ms':>9} {'full+PIL':>11} {'region ms':>9} {'region+PIL':>11}")
+    for name in ("pyautogui", "mss"):
+        benchmark_backend(name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# Run a workflow end to end on a synthetic display and time each step - no desktop needed
+#
+# Usage: python benchmark_headless.py [rounds]
+
+import sys
+import os
+import time
+import tempfile
+
+from PIL import Image
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.ai_vision_controller import EnhancedAIVisionController
+from modules.display_backend import SyntheticDisplay
+
+COMMANDS = [
+    "click: name_field",
+    "type: hello world",
+    "click: ok_button",
+    "press: tab",
+    "click: cancel_button",
+    "wait: 0.1",
+]
+
+
+def build_dialog(display):
+    """Draw a fake dialog with a textbox and two buttons"""
+    display.add_widget("dialog", "label", (560, 340, 800, 400), "Save As", color=(250, 250, 250))
+    display.add_textbox("name_field", (600, 420, 500, 32))
+    display.add_button("ok_button", (1000, 660, 120, 36), "OK")
+    display.add_button("cancel_button", (1140, 660, 120, 36), "Cancel")
+
+
+def register_elements(controller, display, directory):
+    """Save each widget as a UI element template cropped from the screen"""
+    frame = controller.grab_frame(fresh=True)
+    for name in ("name_field", "ok_button", "cancel_button"):
+        x, y, w, h = display.get_widget(name).rect
+        path = os.path.join(directory, f"{name}.png")
+        Image.fromarray(frame.crop((x, y, w, h)).to_rgb()).save(path)
+        controller.save_ui_element(name, path)
+
+
+def main():
+    """Main entry point"""
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    display = SyntheticDisplay()
+    build_dialog(display)
+    controller = EnhancedAIVisionController(display)
+    controller.toggle_visual_feedback(False)
+
+    with tempfile.TemporaryDirectory() as directory:
+        register_elements(controller, display, directory)
+        names = ["name_field", "ok_button", "cancel_button"]
+
+        start = time.perf_counter()
+        for name in names:
+            controller.find_ui_element(name)
+        one_by_one = time.perf_counter() - start
+        for name in names:
+            controller.ui_elements[name]["last_box"] = None  # Compare full scans, not cached locations
+        start = time.perf_counter()
+        controller.locate_many(names)
+        batched = time.perf_counter() - start
+
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            controller.execute_command_sequence(COMMANDS)
+            timings.append(time.perf_counter() - start)
+
+    per_step = [t / len(COMMANDS) * 1000 for t in timings]
+    print(f"\n{len(COMMANDS)} commands x {rounds} rounds on a synthetic display")
+    print(f"workflow: best {min(timings):.2f}s, mean {sum(timings) / len(timings):.2f}s")
+    print(f"per step: best {min(per_step):.0f} ms, mean {sum(per_step) / len(per_step):.0f} ms")
+    print(f"frame cache: {controller.frame_cache.get_stats()}")
+    print(f"template store: {controller.template_store.get_stats()}")
+    print(f"last-known-location: {controller.get_element_stats()}")
+    print(f"locate {len(names)} elements: find_ui_element {one_by_one * 1000:.0f} ms, "
+          f"locate_many {batched * 1000:.0f} ms")
+
+    for widget_name in ("name_field", "ok_button", "cancel_button"):
+        widget = display.get_widget(widget_name)
+        print(f"{widget_name}: {widget.clicks} clicks, text={widget.text!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# Benchmark encode time and size per frame for step-log image policies
+
+import sys
+import os
+import time
+
+import numpy as np
+import cv2
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.screen_capture import Frame, create_capture_backend
+from modules.image_policy import ImagePolicy
+
+ITERATIONS = 5
+
+POLICIES = [
+    ("png level 6 (default)", ImagePolicy("png", compress_level=6)),
+    ("png level 1", ImagePolicy("png", compress_level=1)),
+    ("png level 1, max 1280", ImagePolicy("png", compress_level=1, max_dimension=1280)),
+    ("png level 1, gray", ImagePolicy("png", compress_level=1, grayscale=True)),
+    ("webp q80", ImagePolicy("webp", quality=80)),
+    ("webp q80, max 1280", ImagePolicy("webp", quality=80, max_dimension=1280)),
+    ("jpeg q85", ImagePolicy("jpeg", quality=85)),
+    ("jpeg q70, max 1280", ImagePolicy("jpeg", quality=70, max_dimension=1280)),
+    ("npy raw", ImagePolicy("npy")),
+    ("npy raw, gray", ImagePolicy("npy", grayscale=True)),
+]
+
+
+def synthetic_frame(width=1920, height=1080):
+    """Build a desktop-like frame: flat panels, borders and text"""
+    image = np.full((height, width, 4), 240, dtype=np.uint8)
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        x, y = int(rng.integers(0, width - 200)), int(rng.integers(0, height - 100))
+        w, h = int(rng.integers(80, 600)), int(rng.integers(30, 400))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3)) + (255,)
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        cv2.rectangle(image, (x, y), (x + w, y + h), (60, 60, 60, 255), 1)
+        cv2.putText(image, f"Button {x}", (x + 5, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0, 255), 1)
+    return Frame(image, "BGRA")
+
+
+def get_frame():
+    """Capture the real screen when possible, else use a synthetic frame"""
+    try:
+        backend = create_capture_backend("auto")
+        frame = backend.grab()
+        print(f"Using live screen capture {frame.width}x{frame.height}")
+        return frame
+    except Exception as e:
+        print(f"Screen capture unavailable ({str(e)}), using a synthetic 1920x1080 frame")
+        return synthetic_frame()
+
+
+def main():
+    """Main entry point"""
+    frame = get_frame()
+    print(f"{'policy':<26} {'encode ms':>10} {'KB/frame':>10}")
+    for name, policy in POLICIES:
+        policy.encode(frame)  # Warm up
+        start = time.perf_counter()
+        for _ in range(ITERATIONS):
+            data = policy.encode(frame)
+        elapsed = (time.perf_counter() - start) * 1000 / ITERATIONS
+        print(f"{name:<26} {elapsed:>10.1f} {len(data) / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# Benchmark OCR calls per second: in-process Tesseract engines vs pytesseract (one process per call),
+# the result cache on repeated lookups of an unchanged screen, tiled parallel OCR of a 4K screen, and
+# fuzzy text lookups (n-gram index vs a difflib scan; no Tesseract needed)
+#
+# Usage: python benchmark_ocr.py [seconds per engine]
+
+import sys
+import os
+import time
+import difflib
+
+import numpy as np
+import cv2
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.ocr_engine import OCR_ENGINES, OCRCache, create_ocr_engine
+from modules.tiled_ocr import TiledOCR
+from modules.text_index import ScreenTextIndex
+
+WORDS = ["File", "Edit", "View", "Save", "Cancel", "Options", "Preferences", "Export", "Print", "Help"]
+
+
+def text_image(width, height, lines, seed=0):
+    """A light dialog-like grayscale image with lines of words"""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width), 245, dtype=np.uint8)
+    for row in range(lines):
+        words = " ".join(rng.choice(WORDS, 6))
+        cv2.putText(image, words, (20, 40 + row * 40), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2, cv2.LINE_AA)
+    return image
+
+
+def words_of(data):
+    """Recognized words with their boxes, for comparing engines"""
+    return [(data["text"][i], data["left"][i], data["top"][i])
+            for i in range(len(data["text"])) if data["text"][i].strip()]
+
+
+def benchmark(engine, image, config, seconds):
+    """Call image_to_data repeatedly for a while
+
+    Returns:
+        tuple: (calls per second, words of the last call)
+    """
+    data = engine.image_to_data(image, config=config)  # Loads the language data
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        data = engine.image_to_data(image, config=config)
+        calls += 1
+    return calls / (time.perf_counter() - start), words_of(data)
+
+
+def main():
+    """Main entry point"""
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    cases = [
+        ("button label 240x50", text_image(240, 50, 1), "--psm 7"),
+        ("dialog 800x300", text_image(800, 300, 6), "--oem 3 --psm 11"),
+        ("screen 1920x1080", text_image(1920, 1080, 25), "--oem 3 --psm 11"),
+    ]
+
+    engines = {}
+    for name in OCR_ENGINES:
+        try:
+            engines[name] = create_ocr_engine(name)
+            engines[name].cache = None  # Time the OCR itself
+        except (ImportError, OSError, RuntimeError) as e:
+            print(f"{name}: not available ({e})")
+
+    for label, image, config in cases:
+        print(f"\n{label} ({config})")
+        baseline = None
+        for name, engine in engines.items():
+            try:
+                rate, words = benchmark(engine, image, config, seconds)
+            except Exception as e:
+                print(f"  {name:12s} failed: {e}")
+                continue
+            if name == "pytesseract":
+                baseline = (rate, words)
+            print(f"  {name:12s} {rate:8.1f} calls/s  {len(words)} words")
+        if baseline is not None:
+            for name, engine in engines.items():
+                if name != "pytesseract" and engine.calls:
+                    same = words_of(engine.image_to_data(image, config=config)) == baseline[1]
+                    print(f"  {name} words identical to pytesseract: {same}")
+
+    if engines:
+        benchmark_cache(next(iter(engines.values())), text_image(800, 300, 6))
+        benchmark_tiled(next(iter(engines.values())))
+
+    for engine in engines.values():
+        print(f"\n{engine.get_stats()}")
+        engine.close()
+
+    benchmark_fuzzy()
+
+
+def benchmark_tiled(engine):
+    """One 4K screen OCRed whole vs as tiles across a process pool"""
+    image = text_image(3840, 2160, 52)
+    tiled = TiledOCR(engine_name=engine.name, cache=None)
+    print(f"\n4K screen, --psm 11: whole image vs {tiled.workers} worker process(es)")
+    engine.cache = None
+    try:
+        start = time.perf_counter()
+        whole = words_of(engine.image_to_data(image, config="--oem 3 --psm 11"))
+        whole_ms = (time.perf_counter() - start) * 1000
+        tiled.image_to_data(image[:1000, :1000], config="--oem 3 --psm 11")  # Start the workers
+        start = time.perf_counter()
+        parts = words_of(tiled.image_to_data(image, config="--oem 3 --psm 11"))
+        tiled_ms = (time.perf_counter() - start) * 1000
+    except Exception as e:
+        print(f"  failed: {e}")
+        return
+    finally:
+        tiled.close()
+    print(f"  whole: {whole_ms:8.1f} ms  {len(whole)} words")
+    print(f"  tiled: {tiled_ms:8.1f} ms  {len(parts)} words, {len(set(parts) & set(whole))} identical")
+
+
+def benchmark_cache(engine, image, lookups=5):
+    """Several text lookups on one unchanged dialog, with and without the result cache"""
+    print(f"\n{lookups} lookups on an unchanged 800x300 dialog ({engine.name})")
+    for cache in (None, OCRCache()):
+        engine.cache = cache
+        start = time.perf_counter()
+        try:
+            for _ in range(lookups):
+                engine.image_to_data(image, config="--oem 3 --psm 11")
+        except Exception as e:
+            print(f"  failed: {e}")
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        label = "cached" if cache is not None else "uncached"
+        print(f"  {label:9s} {elapsed:8.1f} ms" + (f"  {cache.get_stats()}" if cache is not None else ""))
+
+
+def screen_data(lines, words_per_line, seed=0):
+    """OCR output of a dense screen, in pytesseract's Output.DICT layout"""
+    rng = np.random.default_rng(seed)
+    vocabulary = WORDS + ["".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz"), rng.integers(3, 10)))
+                          for _ in range(500)]
+    data = {column: [] for column in ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                                      "left", "top", "width", "height", "conf", "text")}
+    for line in range(lines):
+        x = 10
+        for number in range(words_per_line):
+            word = str(rng.choice(vocabulary))
+            row = (5, 1, 1, 1, line, number, x, 10 + line * 20, len(word) * 9, 14, 90, word)
+            for column, value in zip(data, row):
+                data[column].append(value)
+            x += len(word) * 9 + 8
+    # A misread menu entry somewhere in the middle
+    middle = len(data["text"]) // 2
+    data["text"][middle:middle + 3] = ["Save", "as", "PDE"]
+    return data
+
+
+def difflib_scan(data, text):
+    """The previous fallback: compare every OCR word with the whole target"""
+    target, best, best_ratio = text.lower(), None, 0
+    for i, word in enumerate(data["text"]):
+        word = word.lower().strip()
+        if len(word) >= 3:
+            ratio = difflib.SequenceMatcher(None, word, target).ratio()
+            if ratio > 0.7 and ratio > best_ratio:
+                best, best_ratio = word, ratio
+    return best
+
+
+def benchmark_fuzzy(lookups=20):
+    """Fuzzy lookups on a dense screen: difflib over every word vs the n-gram index"""
+    data = screen_data(100, 25)
+    queries = ["Sav as PDF", "Preferenses", "Cancle", "Exprot", "Optoins"]
+    print(f"\n{lookups} fuzzy lookups of each of {len(queries)} queries on a screen of {len(data['text'])} words")
+
+    start = time.perf_counter()
+    for _ in range(lookups):
+        scanned = [difflib_scan(data, query) for query in queries]
+    scan_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index = ScreenTextIndex(data)
+    for _ in range(lookups):
+        matched = [index.fuzzy(query) for query in queries]
+    index_ms = (time.perf_counter() - start) * 1000
+
+    print(f"  difflib scan: {scan_ms:8.1f} ms")
+    print(f"  n-gram index: {index_ms:8.1f} ms (including building the index)")
+    for query, word, matches in zip(queries, scanned, matched):
+        best = f"{matches[0][1].text!r} ({matches[0][0]:.2f})" if matches else None
+        print(f"  {query!r:14s} difflib: {word!r:14s} index: {best}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# Benchmark ScreenImageLocator on a synthetic 4K desktop: exhaustive vs coarse-to-fine multiscale search,
+# duplicate suppression on screens full of near-identical matches, and masked matching of the
+# captures in ui_elements/ on other wallpapers
+
+import sys
+import os
+import time
+
+import numpy as np
+import cv2
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from image_extraction import ScreenImageLocator
+from modules.template_store import Template, background_mask
+from modules.template_matching import match_template
+
+WIDTH, HEIGHT = 3840, 2160
+
+
+def synthetic_screen(seed=0):
+    """Build a desktop-like BGR screen: flat panels, borders and text"""
+    rng = np.random.default_rng(seed)
+    image = np.full((HEIGHT, WIDTH, 3), 240, dtype=np.uint8)
+    for _ in range(120):
+        x, y = int(rng.integers(0, WIDTH - 400)), int(rng.integers(0, HEIGHT - 200))
+        w, h = int(rng.integers(80, 900)), int(rng.integers(30, 500))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, -1)
+        cv2.rectangle(image, (x, y), (x + w, y + h), (60, 60, 60), 1)
+        cv2.putText(image, f"Item {x}", (x + 5, y + 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    return image
+
+
+def make_icon():
+    """A 64x48 toolbar icon with some detail"""
+    icon = np.full((48, 64, 3), 250, dtype=np.uint8)
+    cv2.rectangle(icon, (2, 2), (61, 45), (40, 90, 200), -1)
+    cv2.circle(icon, (20, 24), 10, (255, 255, 255), -1)
+    cv2.putText(icon, "Go", (32, 32), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return icon
+
+
+def place(screen, icon, scale, position):
+    """Paste the icon, resized by scale, at position"""
+    resized = cv2.resize(icon, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    x, y = position
+    screen[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+    return (x, y, resized.shape[1], resized.shape[0])
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def benchmark_multiscale(locator):
+    """Compare exhaustive and pyramid multiscale search on placed icons"""
+    screen = synthetic_screen()
+    icon = make_icon()
+    placed = [place(screen, icon, 1.25, (2900, 1700)), place(screen, icon, 1.0, (500, 300))]
+
+    print(f"Multiscale search on {WIDTH}x{HEIGHT}, icon {icon.shape[1]}x{icon.shape[0]} placed at {placed}")
+    full, full_ms = timed(locator.find_image_multiscale, screen, icon, 0.8, pyramid=False)
+    fast, fast_ms = timed(locator.find_image_multiscale, screen, icon, 0.8)
+    stats = locator.last_search_stats
+
+    print(f"  exhaustive: {full_ms:8.1f} ms  {len(full)} match(es)")
+    print(f"  pyramid:    {fast_ms:8.1f} ms  {len(fast)} match(es), "
+          f"{stats['candidates']} candidates at scales {stats['coarse_scales']}")
+    for a, b in zip(full, fast):
+        print(f"    {a['top_left']} scale {a['scale']} {a['confidence']:.3f}  |  "
+              f"{b['top_left']} scale {b['scale']} {b['confidence']:.3f}")
+
+
+def icon_grid(icon, columns=40, rows=30, gap=16):
+    """A launcher-style screen tiled with copies of the icon"""
+    screen = np.full((HEIGHT, WIDTH, 3), 235, dtype=np.uint8)
+    height, width = icon.shape[:2]
+    for row in range(rows):
+        for column in range(columns):
+            x, y = 40 + column * (width + gap), 40 + row * (height + gap)
+            if x + width <= WIDTH and y + height <= HEIGHT:
+                screen[y:y + height, x:x + width] = icon
+    return screen
+
+
+def loop_matches(screenshot, template, threshold):
+    """The previous per-hit Python loop, kept here as the baseline"""
+    result = cv2.matchTemplate(cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY),
+                               cv2.cvtColor(template, cv2.COLOR_BGR2GRAY), cv2.TM_CCOEFF_NORMED)
+    height, width = template.shape[:2]
+    matches = []
+    for x, y in zip(*np.where(result >= threshold)[::-1]):
+        confidence = result[y, x]
+        for existing in matches:
+            ex, ey = existing['top_left']
+            if np.sqrt((x - ex) ** 2 + (y - ey) ** 2) < min(width, height) * 0.5:
+                if confidence > existing['confidence']:
+                    matches.remove(existing)
+                break
+        else:
+            matches.append({'top_left': (x, y), 'confidence': confidence})
+    return matches
+
+
+def loop_dedupe(matches):
+    """The previous pairwise overlap pass, kept here as the baseline"""
+    kept = []
+    for match in sorted(matches, key=lambda m: m['confidence'], reverse=True):
+        x1, y1 = match['top_left']
+        x2, y2 = match['bottom_right']
+        for existing in kept:
+            ex1, ey1 = existing['top_left']
+            ex2, ey2 = existing['bottom_right']
+            overlap = max(0, min(x2, ex2) - max(x1, ex1)) * max(0, min(y2, ey2) - max(y1, ey1))
+            if overlap > 0.3 * min((x2 - x1) * (y2 - y1), (ex2 - ex1) * (ey2 - ey1)):
+                break
+        else:
+            kept.append(match)
+    return kept
+
+
+def benchmark_dense(locator, threshold=0.6):
+    """Time match grouping and duplicate removal on an icon grid"""
+    icon = make_icon()
+    screen = icon_grid(icon)
+
+    print(f"\nDense matches: {WIDTH}x{HEIGHT} icon grid, threshold {threshold}")
+    old, old_ms = timed(loop_matches, screen, icon, threshold)
+    new, new_ms = timed(locator.find_image_matches, screen, icon, threshold)
+    print(f"  find_image_matches  loop: {old_ms:8.1f} ms  {len(old)} match(es)")
+    print(f"  find_image_matches  NMS:  {new_ms:8.1f} ms  {len(new)} match(es)")
+
+    # Duplicate removal on the raw hits of several scales, as multiscale search produces them
+    raw = []
+    for scale in (0.9, 1.0, 1.1):
+        resized = cv2.resize(icon, None, fx=scale, fy=scale)
+        for match in locator.find_image_matches(screen, resized, threshold - 0.2):
+            raw.append(dict(match, scale=scale))
+    old, old_ms = timed(loop_dedupe, raw)
+    new, new_ms = timed(locator.remove_duplicate_matches, list(raw))
+    same = [m['top_left'] for m in old] == [m['top_left'] for m in new]
+    print(f"  remove_duplicate_matches on {len(raw)} boxes  loop: {old_ms:8.1f} ms  NMS: {new_ms:8.1f} ms  "
+          f"{len(new)} kept, identical: {same}")
+
+
+def wallpaper(seed, width=1920, height=1080):
+    """A smooth random-colour wallpaper"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def best_elsewhere(image, template, mask, box):
+    """Best match score outside the true box, i.e. the strongest false candidate"""
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED, mask=mask)
+    result[~np.isfinite(result)] = -1.0
+    x, y, w, h = box
+    result[max(0, y - h):y + h, max(0, x - w):x + w] = -1.0
+    return float(result.max())
+
+
+def benchmark_masked():
+    """Find the ui_elements/ captures on wallpapers they weren't captured on"""
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ui_elements")
+    print("\nMasked matching: ui_elements/ captures pasted on 5 other wallpapers (true score / best false score)")
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith(".png"):
+            continue  # Saved keypoint files sit next to the images
+        image = cv2.imread(os.path.join(directory, name))
+        mask = background_mask(image)
+        if mask is None:
+            print(f"  {name:16s} no plain background to mask")
+            continue
+        template = Template(name, image, 0.0, auto_mask=True)
+        plain, masked = [], []
+        for seed in range(5):
+            screen = wallpaper(seed)
+            x, y = 600 + seed * 150, 400
+            h, w = mask.shape
+            area = screen[y:y + h, x:x + w]
+            area[mask > 0] = image[mask > 0]  # Only the element itself, on the new wallpaper
+            gray = cv2.cvtColor(screen, cv2.COLOR_BGR2GRAY)
+            box = (x, y, w, h)
+            plain.append((match_template(gray, template.gray, -1.0)[0], best_elsewhere(gray, template.gray, None, box)))
+            masked.append((match_template(gray, template.gray, -1.0, mask=template.mask)[0],
+                           best_elsewhere(gray, template.gray, template.mask, box)))
+
+        def summary(scores):
+            found = sum(1 for true, false in scores if true >= 0.8 and true > false)
+            return (f"{np.mean([t for t, _ in scores]):.2f} / {np.mean([f for _, f in scores]):.2f}, "
+                    f"found at 0.8: {found}/5")
+        print(f"  {name:16s} unmasked {summary(plain)}   masked {summary(masked)}")
+
+
+def main():
+    """Main entry point"""
+    locator = ScreenImageLocator()
+    benchmark_multiscale(locator)
+    benchmark_dense(locator)
+    benchmark_masked()
+
+
+if __name__ == "__main__":
+    main()
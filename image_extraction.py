@@ -3,6 +3,7 @@ import numpy as np
 import pyautogui
 from PIL import Image
 import os
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
@@ -11,6 +12,8 @@ class ScreenImageLocator:
         """Initialize the screen image locator"""
         # Disable pyautogui failsafe for smoother operation
         pyautogui.FAILSAFE = False
+        # Details of the last multiscale search (candidates evaluated, timing)
+        self.last_search_stats = {}
         
     def take_screenshot(self):
         """Take a screenshot of the entire screen"""
@@ -54,53 +57,78 @@ class ScreenImageLocator:
         # Perform template matching
         result = cv2.matchTemplate(screenshot_gray, template_gray, method)
         
-        # Find all matches above threshold
-        locations = np.where(result >= threshold)
+        # Matches closer than half the template size are the same hit
+        radius = max(1, int(min(template_width, template_height) * 0.5))
+        xs, ys, scores = self._local_maxima(result, threshold, radius)
+        keep = self._suppress_points(xs, ys, scores, radius)
+        
+        # Kept peaks come out sorted by confidence (highest first)
         matches = []
+        for x, y, confidence in zip(xs[keep].tolist(), ys[keep].tolist(), scores[keep].tolist()):
+            matches.append({
+                'top_left': (x, y),
+                'bottom_right': (x + template_width, y + template_height),
+                'center': (x + template_width // 2, y + template_height // 2),
+                'confidence': confidence,
+                'width': template_width,
+                'height': template_height
+            })
         
-        # Group nearby matches to avoid duplicates
-        for pt in zip(*locations[::-1]):
-            x, y = pt
-            confidence = result[y, x]
-            
-            # Check if this match is too close to an existing match
-            is_duplicate = False
-            for existing_match in matches:
-                existing_x, existing_y = existing_match['top_left']
-                distance = np.sqrt((x - existing_x)**2 + (y - existing_y)**2)
-                if distance < min(template_width, template_height) * 0.5:
-                    is_duplicate = True
-                    # Keep the match with higher confidence
-                    if confidence > existing_match['confidence']:
-                        matches.remove(existing_match)
-                        break
-                    else:
-                        break
-            
-            if not is_duplicate:
-                matches.append({
-                    'top_left': (x, y),
-                    'bottom_right': (x + template_width, y + template_height),
-                    'center': (x + template_width // 2, y + template_height // 2),
-                    'confidence': confidence,
-                    'width': template_width,
-                    'height': template_height
-                })
+        return matches
+    
+    def _local_maxima(self, result, threshold, radius):
+        """Find the peaks of a match result above threshold
         
-        # Sort by confidence (highest first)
-        matches.sort(key=lambda x: x['confidence'], reverse=True)
+        A pixel is a peak when it is the maximum of the square window of the
+        given radius around it, so a blob of above-threshold scores around
+        one hit collapses to a single point before any pairwise work.
         
-        return matches
+        Returns:
+            tuple: (xs, ys, scores) arrays of the peaks
+        """
+        kernel = np.ones((2 * radius + 1, 2 * radius + 1), np.uint8)
+        dilated = cv2.dilate(result, kernel)
+        ys, xs = np.nonzero((result >= threshold) & (result >= dilated))
+        return xs, ys, result[ys, xs]
+    
+    def _suppress_points(self, xs, ys, scores, radius):
+        """Greedy suppression of peaks closer than radius to a better one
+        
+        Each round keeps the best remaining peak and drops every peak within
+        radius of it in one vectorized step.
+        
+        Returns:
+            np.ndarray: Indices of the kept peaks, best first
+        """
+        order = np.argsort(-scores, kind='stable')
+        keep = []
+        while order.size:
+            best = order[0]
+            keep.append(best)
+            rest = order[1:]
+            distance_sq = (xs[rest] - xs[best]) ** 2 + (ys[rest] - ys[best]) ** 2
+            order = rest[distance_sq >= radius * radius]
+        return np.array(keep, dtype=np.intp)
     
-    def find_image_multiscale(self, screenshot, template, threshold=0.8, scales=None):
+    def find_image_multiscale(self, screenshot, template, threshold=0.8, scales=None, pyramid=True,
+                              top_k=10, coarse_margin=0.2):
         """
         Find image matches at multiple scales to handle size variations
         
+        With pyramid=True the search runs coarse-to-fine: every scale is
+        matched on a 1/4 (or 1/2 for small templates) resolution copy of the
+        screenshot, and only the top_k best candidate windows per scale are
+        matched again at full resolution. The number of candidates evaluated
+        is stored in self.last_search_stats.
+        
         Args:
             screenshot: Screenshot image
             template: Template image
             threshold: Matching threshold
             scales: List of scale factors to try
+            pyramid: Use the coarse-to-fine search instead of full-resolution matching per scale
+            top_k: Number of coarse candidates refined at full resolution (per scale)
+            coarse_margin: How far below threshold a coarse score may be and still be refined
             
         Returns:
             list: List of matches across all scales
@@ -108,6 +136,115 @@ class ScreenImageLocator:
         if scales is None:
             scales = [0.5, 0.75, 1.0, 1.25, 1.5]
         
+        start = time.perf_counter()
+        if not pyramid:
+            all_matches = self._find_multiscale_full(screenshot, template, threshold, scales)
+            self.last_search_stats = {
+                'pyramid': False,
+                'candidates': len(scales),
+                'matches': len(all_matches),
+                'time_ms': (time.perf_counter() - start) * 1000,
+            }
+            return all_matches
+        
+        screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        screen_height, screen_width = screenshot_gray.shape
+        levels = {1.0: screenshot_gray}  # Downscaled screenshots, built when first needed
+        
+        # Coarse pass: every scale on a small screenshot, keep the best peaks
+        candidates = []
+        for scale in scales:
+            width = int(template_gray.shape[1] * scale)
+            height = int(template_gray.shape[0] * scale)
+            if width > screen_width or height > screen_height or min(width, height) < 1:
+                continue
+            
+            coarse = self._coarse_factor(min(width, height))
+            if coarse not in levels:
+                levels[coarse] = cv2.resize(screenshot_gray, None, fx=coarse, fy=coarse, interpolation=cv2.INTER_AREA)
+            small_width, small_height = max(1, int(width * coarse)), max(1, int(height * coarse))
+            small_template = cv2.resize(template_gray, (small_width, small_height), interpolation=cv2.INTER_AREA)
+            result = cv2.matchTemplate(levels[coarse], small_template, cv2.TM_CCOEFF_NORMED)
+            for score, x, y in self._top_peaks(result, top_k, threshold - coarse_margin,
+                                               small_width, small_height):
+                candidates.append((score, x, y, scale, coarse, width, height))
+        
+        # Fine pass: match each candidate window at full resolution
+        resized = {}
+        all_matches = []
+        for score, x, y, scale, coarse, width, height in candidates:
+            if scale not in resized:
+                resized[scale] = cv2.resize(template_gray, (width, height))
+            pad = int(np.ceil(1.0 / coarse)) + 2
+            left = max(0, int(x / coarse) - pad)
+            top = max(0, int(y / coarse) - pad)
+            right = min(screen_width, int(x / coarse) + width + pad)
+            bottom = min(screen_height, int(y / coarse) + height + pad)
+            if right - left < width or bottom - top < height:
+                continue
+            
+            window = screenshot_gray[top:bottom, left:right]
+            result = cv2.matchTemplate(window, resized[scale], cv2.TM_CCOEFF_NORMED)
+            _, confidence, _, (match_x, match_y) = cv2.minMaxLoc(result)
+            if confidence < threshold:
+                continue
+            
+            match_x += left
+            match_y += top
+            all_matches.append({
+                'top_left': (match_x, match_y),
+                'bottom_right': (match_x + width, match_y + height),
+                'center': (match_x + width // 2, match_y + height // 2),
+                'confidence': confidence,
+                'width': width,
+                'height': height,
+                'scale': scale
+            })
+        
+        # Remove duplicates and sort by confidence
+        all_matches = self.remove_duplicate_matches(all_matches)
+        all_matches.sort(key=lambda x: x['confidence'], reverse=True)
+        
+        self.last_search_stats = {
+            'pyramid': True,
+            'coarse_scales': sorted(factor for factor in levels if factor < 1.0),
+            'candidates': len(candidates),
+            'matches': len(all_matches),
+            'time_ms': (time.perf_counter() - start) * 1000,
+        }
+        return all_matches
+    
+    def _coarse_factor(self, shortest_side):
+        """Pick the coarse search resolution for a scaled template
+        
+        The template must keep at least 8 pixels on its shorter side at the
+        coarse resolution to still be recognisable.
+        """
+        for factor in (0.25, 0.5):
+            if shortest_side * factor >= 8:
+                return factor
+        return 1.0
+    
+    def _top_peaks(self, result, k, min_score, width, height):
+        """Take up to k best-scoring, non-overlapping peaks from a match result
+        
+        Returns:
+            list: (score, x, y) tuples, best first
+        """
+        result = result.copy()
+        peaks = []
+        for _ in range(k):
+            _, score, _, (x, y) = cv2.minMaxLoc(result)
+            if score < min_score:
+                break
+            peaks.append((score, x, y))
+            # Suppress the neighbourhood so the next peak is a different window
+            result[max(0, y - height // 2):y + height // 2 + 1, max(0, x - width // 2):x + width // 2 + 1] = -1
+        return peaks
+    
+    def _find_multiscale_full(self, screenshot, template, threshold, scales):
+        """Full-resolution matching at every scale (used for tiny templates)"""
         all_matches = []
         
         for scale in scales:
@@ -138,37 +275,30 @@ class ScreenImageLocator:
         # Sort by confidence (highest first)
         matches.sort(key=lambda x: x['confidence'], reverse=True)
         
-        filtered_matches = []
-        for match in matches:
-            is_duplicate = False
-            x1, y1 = match['top_left']
-            x2, y2 = match['bottom_right']
-            
-            for existing in filtered_matches:
-                ex1, ey1 = existing['top_left']
-                ex2, ey2 = existing['bottom_right']
-                
-                # Check for overlap
-                if (x1 < ex2 and x2 > ex1 and y1 < ey2 and y2 > ey1):
-                    overlap_area = max(0, min(x2, ex2) - max(x1, ex1)) * max(0, min(y2, ey2) - max(y1, ey1))
-                    match_area = (x2 - x1) * (y2 - y1)
-                    existing_area = (ex2 - ex1) * (ey2 - ey1)
-                    
-                    # If significant overlap, consider it a duplicate
-                    if overlap_area > 0.3 * min(match_area, existing_area):
-                        is_duplicate = True
-                        break
-            
-            if not is_duplicate:
-                filtered_matches.append(match)
+        boxes = np.array([match['top_left'] + match['bottom_right'] for match in matches], dtype=np.int64)
+        x1, y1, x2, y2 = boxes.T
+        areas = (x2 - x1) * (y2 - y1)
+        
+        # Greedy suppression: keep the best remaining box and drop, in one
+        # step, every box overlapping it by more than 30% of the smaller area
+        order = np.arange(len(matches))
+        keep = []
+        while order.size:
+            best = order[0]
+            keep.append(best)
+            rest = order[1:]
+            overlap_width = np.minimum(x2[rest], x2[best]) - np.maximum(x1[rest], x1[best])
+            overlap_height = np.minimum(y2[rest], y2[best]) - np.maximum(y1[rest], y1[best])
+            overlap_area = np.clip(overlap_width, 0, None) * np.clip(overlap_height, 0, None)
+            order = rest[overlap_area <= 0.3 * np.minimum(areas[rest], areas[best])]
         
-        return filtered_matches
+        return [matches[i] for i in keep]
     
     def draw_matches(self, screenshot, matches, template_path):
         """Draw bounding boxes around found matches"""
         result_image = screenshot.copy()
         
-        for i, match in enumerate(matches):new
+        for i, match in enumerate(matches):
             x1, y1 = match['top_left']
             x2, y2 = match['bottom_right']
             center_x, center_y = match['center']
@@ -244,6 +374,8 @@ def main():
             # Find matches
             if multiscale:
                 matches = locator.find_image_multiscale(screenshot, template, threshold)
+                stats = locator.last_search_stats
+                print(f"Evaluated {stats['candidates']} candidate(s) in {stats['time_ms']:.0f} ms")
             else:
                 matches = locator.find_image_matches(screenshot, template, threshold)
             
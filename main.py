@@ -36,6 +36,7 @@ try:
     from modules.gui.tab_commands import CommandsTabManager
     from modules.gui.tab_prompt import PromptTabManager
     from modules.gui.ui_dialogs import UIElementDialog
+    from modules.image_policy import load_step_image, step_image_exists
 except ImportError as e:
     print(f"Error importing modules: {str(e)}")
     print("Make sure all required packages are installed using:")
@@ -997,14 +998,14 @@ class EnhancedAIControllerGUI(AIControllerGUI):
         import os
         from PIL import Image, ImageTk
         
-        if not image_path or not os.path.exists(image_path):
+        if not step_image_exists(image_path):
             self.screenshot_preview_label.configure(text="No screenshot available", image=None)
             self.screenshot_preview_image = None
             return
             
         try:
             # Load and resize the image
-            img = Image.open(image_path)
+            img = load_step_image(image_path)
             img.thumbnail((400, 250))  # Resize to fit in preview area
             self.screenshot_preview_image = ImageTk.PhotoImage(img)
             self.screenshot_preview_label.configure(image=self.screenshot_preview_image, text="")
@@ -1081,13 +1082,13 @@ class EnhancedAIControllerGUI(AIControllerGUI):
                 desc_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
             
             # Image frame (if image path is provided)
-            if image_path and os.path.exists(image_path):
+            if step_image_exists(image_path):
                 image_frame = ctk.CTkFrame(card_frame)
                 image_frame.pack(fill=tk.X, padx=5, pady=5)
                 
                 try:
                     # Load and resize the image
-                    img = Image.open(image_path)
+                    img = load_step_image(image_path)
                     img.thumbnail((300, 200))  # Resize image to fit in card
                     photo_img = ImageTk.PhotoImage(img)
                     
@@ -1249,18 +1250,21 @@ class EnhancedAIVisionController(AIVisionController):
             # Make sure step counter is reset
             self.step_counter = 0
             
-            # Clear previous logs
+            # Clear previous logs (after any screenshots still being written)
+            self.flush_step_screenshots()
             with open(os.path.join(self.session_dir, "execution_log.txt"), "w") as log_file:
                 log_file.write(f"Starting execution at {datetime.datetime.now()}\n\n")
             
             # Take an initial screenshot to analyze the starting state
             initial_screenshot = self.capture_step_screenshot("Initial screen state")
             if initial_screenshot and self.ai_manager is not None:
+                # Encode the frame for upload (reuses the step file if the policies match)
+                ai_image = self.prepare_ai_upload(initial_screenshot)
                 # Detect UI elements in the initial screenshot
-                self.ai_manager.detect_ui_elements(initial_screenshot)
+                self.ai_manager.detect_ui_elements(ai_image)
                 # Annotate the screenshot
                 if callable(getattr(self.ai_manager, 'annotate_detected_ui_elements', None)):
-                    annotated_path = self.ai_manager.annotate_detected_ui_elements(initial_screenshot)
+                    annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                     if annotated_path and hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
                         self.on_step_screenshot(self.step_counter, "Initial screen analysis", annotated_path)
             # Iterate through commands
@@ -1291,20 +1295,8 @@ class EnhancedAIVisionController(AIVisionController):
                         except Exception as e:
                             print(f"Error parsing coordinates: {str(e)}")
                     else:
-                        # Text description or UI element name
-                        if cmd_value in self.ui_elements:
-                            # It's a known UI element
-                            self.perform_action("click", target=cmd_value)
-                            action_success = True
-                        else:
-                            # Try OCR-based click
-                            success = self.click_on_text(cmd_value)
-                            if not success:
-                                print(f"Text not found: {cmd_value}")
-                                # Capture failed attempt
-                                self.capture_step_screenshot(f"ERROR: Text not found: {cmd_value}")
-                            else:
-                                action_success = True
+                        # UI element name or text, optionally scoped (e.g. OK in "Save As")
+                        action_success = self.click_target(cmd_value)
                 elif cmd_type == 'type':
                     self.perform_action("type", text=cmd_value)
                     action_success = True
@@ -1315,14 +1307,16 @@ class EnhancedAIVisionController(AIVisionController):
                         action_success = True
                     except ValueError:
                         print(f"Invalid wait time: {cmd_value}")
+                elif cmd_type in ('wait_for', 'wait_until_gone'):
+                    action_success = self.run_watch_command(cmd_type, cmd_value)
                 elif cmd_type == 'press':
                     self.perform_action("key_press", text=cmd_value)
                     action_success = True
                 else:
                     print(f"Unknown command type: {cmd_type}")
                     continue
-                # Always wait a bit after each action to let the UI update
-                time.sleep(1.0)
+                # Let the UI update - waits for the screen to settle rather than a fixed delay
+                self._settle_after_action(1.0)
                 # Take a screenshot after each action for AI analysis
                 after_screenshot = self.capture_step_screenshot(f"After {cmd_type}: {cmd_value}")
                 if after_screenshot:
@@ -1332,13 +1326,15 @@ class EnhancedAIVisionController(AIVisionController):
                         try:
                             # Create an action description for the analysis
                             action_desc = f"{cmd_type}: {cmd_value}"
+                            # Encode the frame for upload (reuses the step file if the policies match)
+                            ai_image = self.prepare_ai_upload(after_screenshot)
                             # First detect UI elements in the screenshot
-                            ui_elements = self.ai_manager.detect_ui_elements(after_screenshot)
+                            ui_elements = self.ai_manager.detect_ui_elements(ai_image)
                             print(f"Detected {len(ui_elements) if ui_elements else 0} UI elements in screenshot")
                             # Analyze this step with AI if the method exists
                             if callable(getattr(self.ai_manager, 'analyze_current_step', None)):
                                 analysis = self.ai_manager.analyze_current_step(
-                                    after_screenshot, 
+                                    ai_image, 
                                     self.step_counter,
                                     action_desc
                                 )
@@ -1361,7 +1357,7 @@ class EnhancedAIVisionController(AIVisionController):
                                     if success_status is False:  # Only update if explicitly False
                                         overall_success = False
                                     # Annotate the screenshot with analysis results
-                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(after_screenshot)
+                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                                     # Update step card if callback is available
                                     if hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
                                         # Add AI analysis to the description
@@ -1373,7 +1369,7 @@ class EnhancedAIVisionController(AIVisionController):
                                     print("Warning: analyze_current_step method not available in AI manager")
                                     # Annotate the screenshot with detected UI elements
                                     if callable(getattr(self.ai_manager, 'annotate_detected_ui_elements', None)):
-                                        annotated_path = self.ai_manager.annotate_detected_ui_elements(after_screenshot)
+                                        annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                                         if annotated_path and hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
                                             self.on_step_screenshot(self.step_counter, f"{cmd_type}: {cmd_value} - UI elements detected", annotated_path)
                         except Exception as e:
@@ -1382,13 +1378,15 @@ class EnhancedAIVisionController(AIVisionController):
                             traceback.print_exc()
                 else:
                     print("Warning: Failed to capture screenshot after action")
-                # Wait between commands
-                time.sleep(0.5)
+                # Wait between commands (settle detection already waited for the UI)
+                if not self.use_settle_detection:
+                    time.sleep(0.5)
             print(f"Command execution completed successfully")
             # Check if there was a failure detected by AI
             final_status = "✓ All steps completed successfully" if overall_success else "⚠️ Some steps had issues"
             print(final_status)
-            # Write final status to log
+            # Write final status to log once all step screenshots are written
+            self.flush_step_screenshots()
             with open(os.path.join(self.session_dir, "execution_log.txt"), "a") as log_file:
                 log_file.write(f"\nFinal Status: {final_status}\n")
             return self.session_dir
@@ -1415,62 +1413,6 @@ class EnhancedAIVisionController(AIVisionController):
             return True
         return False
     
-    def find_text_on_screen(self, text, region=None):
-        """Find text on screen using OCR
-        
-        Args:
-            text: Text to find
-            region: Region to search in (x, y, width, height)
-            
-        Returns:
-            tuple: (x, y) coordinates of the text or None if not found
-        """
-        # Capture a screenshot before searching
-        self.capture_step_screenshot(f"Looking for text: {text}")
-        
-        # Try to use OCR to find the text
-        screen_text = self.get_screen_text_ocr(region)
-        
-        # This is a simplified implementation - in a real application
-        # you would want to do more sophisticated text matching and
-        # get the actual position of the text from the OCR engine
-        if screen_text and text.lower() in screen_text.lower():
-            # For now, just return the center of the region or screen
-            if region:
-                x = region[0] + region[2] // 2
-                y = region[1] + region[3] // 2
-            else:
-                screen_width, screen_height = pyautogui.size()
-                x = screen_width // 2
-                y = screen_height // 2
-            return x, y
-        return None
-        
-    def get_screen_text_ocr(self, region=None):
-        """Get text from screen using OCR
-        
-        Args:
-            region: Region to get text from (x, y, width, height)
-            
-        Returns:
-            str: Text found on screen or empty string if OCR failed
-        """
-        try:
-            # Import pytesseract for OCR
-            import pytesseract
-            
-            # Take a screenshot of the specified region or the entire screen
-            screenshot = self.take_screenshot(region)
-            
-            if screenshot:
-                # Use pytesseract to get text from the screenshot
-                text = pytesseract.image_to_string(screenshot)
-                return text
-        except Exception as e:
-            print(f"OCR error: {str(e)}")
-        
-            return ""
-        
     def set_ai_manager(self, ai_manager):
         """Set the AI manager for this controller
         
@@ -10,6 +10,8 @@ from PIL import Image # Import the Image class from Pillow
 import numpy as np
 import cv2
 
+from modules.ui_proposals import UIProposer
+
 class AIIntegration:
     """AI integration module that uses Gemini API for visual understanding and automation"""
     
@@ -29,6 +31,10 @@ class AIIntegration:
         self.last_commands = []
         self.last_response = None
         self.last_detected_ui_elements = []
+        # Element boxes are proposed locally; Gemini is asked only for labels
+        self.ui_proposer = UIProposer()
+        self.remote_labels = False
+        self._last_proposal_key = None
         self.current_task = ""
         self.step_analysis = []
         self.automation_steps = []
@@ -359,6 +365,7 @@ class AIIntegration:
                     
                     # Store for annotation
                     self.last_detected_ui_elements = elements
+                    self._last_proposal_key = None
                     
                     # Annotate the screenshot
                     annotated_path = self.annotate_detected_ui_elements(screenshot_path)
@@ -554,8 +561,62 @@ class AIIntegration:
             print(f"Error in fallback execution: {str(e)}")
             return False
     
-    def detect_ui_elements(self, screenshot_path):
-        """Detect UI elements in the given screenshot using Gemini Vision API
+    def detect_ui_elements(self, screenshot_path, labels=None):
+        """Detect UI elements in the given screenshot
+        
+        Boxes are proposed locally from edges and contours (see
+        UIProposer), which takes milliseconds instead of a Gemini round
+        trip. The vision model is only asked when descriptive labels are
+        needed, and the local proposals are used if it fails.
+        
+        Args:
+            screenshot_path: Path to the screenshot file
+            labels: Ask Gemini for descriptive labels (None uses self.remote_labels)
+            
+        Returns:
+            list: List of detected UI elements with bounding boxes
+        """
+        if labels is None:
+            labels = self.remote_labels
+        if labels and self.model:
+            ui_elements = self._detect_ui_elements_remote(screenshot_path)
+            if ui_elements:
+                return ui_elements
+            print("Falling back to local UI element proposals")
+        return self._detect_ui_elements_local(screenshot_path)
+        
+    def _detect_ui_elements_local(self, screenshot_path):
+        """Propose UI element boxes on the CPU, in the same format as Gemini
+        
+        Args:
+            screenshot_path: Path to the screenshot file
+            
+        Returns:
+            list: List of proposed UI elements with bounding boxes
+        """
+        try:
+            # The step loop and analyze_current_step both ask about the same screenshot
+            key = (os.path.abspath(screenshot_path), os.path.getmtime(screenshot_path))
+        except OSError:
+            print(f"Error: Screenshot file not found at {screenshot_path}")
+            return []
+        if key == self._last_proposal_key:
+            return self.last_detected_ui_elements
+            
+        try:
+            ui_elements = self.ui_proposer.propose_file(screenshot_path)
+            if ui_elements is None:
+                return []
+            self.last_detected_ui_elements = ui_elements
+            self._last_proposal_key = key
+            print(f"Proposed {len(ui_elements)} UI elements locally")
+            return ui_elements
+        except Exception as e:
+            print(f"Error proposing UI elements: {str(e)}")
+            return []
+        
+    def _detect_ui_elements_remote(self, screenshot_path):
+        """Detect and label UI elements using Gemini Vision API
         
         Args:
             screenshot_path: Path to the screenshot file
@@ -599,6 +660,7 @@ class AIIntegration:
                 # Parse the JSON output
                 ui_elements = json.loads(cleaned_response)
                 self.last_detected_ui_elements = ui_elements
+                self._last_proposal_key = None
                 print(f"Successfully detected {len(ui_elements)} UI elements")
                 return ui_elements
             except json.JSONDecodeError as e:
@@ -1,4 +1,3 @@
-import pyautogui
 import cv2
 import numpy as np
 from PIL import Image
@@ -13,12 +12,48 @@ import threading
 import requests
 import datetime
 
+from modules.screen_capture import create_capture_backend
+from modules.display_backend import DisplayBackend, create_display_backend
+from modules.frame_cache import FrameCache
+from modules.capture_thread import ContinuousCapture
+from modules.screen_watcher import ScreenWatcher
+from modules.step_writer import StepScreenshotWriter, StepWriteJob
+from modules.image_policy import ImagePolicy
+from modules.session_recorder import SessionRecorder, parse_step_reference
+from modules.screen_settle import wait_for_settle
+from modules.search_scope import split_scope, resolve_scope, unscoped_target
+from modules.template_store import TemplateStore
+from modules.template_matching import locate_in_frame, locate_near, locate_all, scan_template, derive_thresholds
+from modules.feature_matcher import MATCHERS, create_feature_matcher
+from modules.ocr_engine import get_ocr_engine
+from modules.tiled_ocr import get_tiled_ocr
+from modules.text_index import build_text_index
+
 class AIVisionController:
     """Controller for AI vision-based automation"""
     
-    def __init__(self):
-        """Initialize the controller"""
+    def __init__(self, display=None):
+        """Initialize the controller
+        
+        Args:
+            display: Display backend or its name ("desktop", "xvfb" or
+                "synthetic"); defaults to $AUTOMATION_DISPLAY, else "desktop"
+        """
         self.ui_elements = {}
+        self.regions = {}  # Saved search rectangles by name, see save_region
+        self.template_store = TemplateStore()  # Decoded UI element images, loaded once
+        self.near_radius = 200  # Half-size of the area searched around a "near" anchor
+        self.prior_margin = 32  # Pixels searched around an element's last known box
+        self.element_stats = {}  # Last-known-location hits/misses per element
+        self.element_lock = threading.RLock()  # Element state is also updated by screen watches on their thread
+        self.feature_matchers = {}  # Keypoint matchers by name, created on first use
+        self.monitors = None  # Monitor rectangles, primary first; see get_monitors
+        self.dpi_scales = ()  # Extra template scales tried on a miss, e.g. (1.25, 1.5) for mixed-DPI monitors
+        self.default_confidence = 0.8  # Match threshold until an element has its own, see element_thresholds
+        self.score_history = 50  # Match scores kept per element for tuning its threshold
+        self.ocr_engine = None  # In-process Tesseract, loaded on first use; see get_ocr_engine
+        self.tiled_ocr = None  # Parallel OCR of large screens, see get_tiled_ocr
+        self.use_tiled_ocr = False  # Text lookups OCR the screen as parallel tiles (for large screens)
         self.move_duration = 0.5  # Default move duration (seconds)
         self.visual_feedback = True  # Enable visual feedback by default
         self.api_endpoint = "http://localhost:5000/v1/chat/completions"  # Default API endpoint
@@ -26,6 +61,26 @@ class AIVisionController:
         self.screenshots_dir = "execution_logs"
         self.ai_manager = None  # AI manager reference for UI element detection
         self.on_step_screenshot = None  # Callback for UI update on screenshot
+        self.display = display if isinstance(display, DisplayBackend) else create_display_backend(display)
+        self.capture_backend = self.display.capture  # Persistent screen grabber
+        self.input_backend = self.display.input  # Mouse and keyboard, pyautogui on the desktop
+        self.continuous_capture = None  # Background ring buffer, see start_continuous_capture
+        self.screen_watcher = None  # Shared polling loop for wait_for/wait_until_gone, created on first use
+        self.watch_timeout = 30.0  # Default limit for wait_for/wait_until_gone (seconds)
+        self.frame_cache = FrameCache(self._capture_frame, max_age=1.0,
+                                      source=self._buffered_frame_since)  # One capture per step
+        self.image_policies = {  # How screenshots are encoded, per use
+            "debug": ImagePolicy("png"),
+            "ai_upload": ImagePolicy("png"),
+        }
+        self.session_recorder = None  # Delta-encoded step recording, see set_session_recording
+        self.settle_stable_ms = 250  # Screen must be unchanged this long to count as settled
+        self.settle_timeout = 3.0  # Upper bound on any settle wait (seconds)
+        self.settle_react_ms = 500  # Wait this long for an action to change the screen at all
+        self.input_pause = None  # Input backend's own pause, restored when settle detection is off
+        self.set_settle_detection(True)  # Wait for the screen instead of fixed sleeps
+        self.step_writer = StepScreenshotWriter(max_queue=8, workers=2, policy="block",
+                                                save_image=self._save_debug_image)  # Async step logging
         
         # Create screenshots directory if it doesn't exist
         os.makedirs(self.screenshots_dir, exist_ok=True)
@@ -38,20 +93,382 @@ class AIVisionController:
         # Step counter for this session
         self.step_counter = 0
         
-    def take_screenshot(self, region=None):
-        """Take a screenshot of the entire screen or a specific region"""
+    def set_capture_backend(self, name):
+        """Switch the screen capture backend
+        
+        Args:
+            name: Backend name ("mss", "pyautogui" or "auto")
+        """
+        backend = create_capture_backend(name)
+        self.capture_backend.close()
+        self.capture_backend = backend
+        self.display.capture = backend
+        self.monitors = None
+        self.frame_cache.invalidate()
+        
+    def set_display_backend(self, display, **kwargs):
+        """Switch the screen and input device the controller drives
+        
+        Args:
+            display: DisplayBackend instance or name ("desktop", "xvfb", "synthetic")
+            **kwargs: Constructor arguments when display is a name
+        """
+        if not isinstance(display, DisplayBackend):
+            display = create_display_backend(display, **kwargs)
+        self.flush_step_screenshots()
+        self.display.close()
+        self.display = display
+        self.capture_backend = display.capture
+        self.input_backend = display.input
+        self.input_pause = None
+        self.set_settle_detection(self.use_settle_detection)
+        self.monitors = None
+        self.frame_cache.invalidate()
+        
+    def get_monitors(self, refresh=False):
+        """Get the monitor rectangles, primary first
+        
+        Args:
+            refresh: Ask the capture backend again (e.g. after plugging in a screen)
+            
+        Returns:
+            list: (x, y, width, height) of each monitor in global screen coordinates
+        """
+        if self.monitors is None or refresh:
+            try:
+                self.monitors = self.capture_backend.monitors()
+            except Exception as e:
+                print(f"Error listing monitors: {str(e)}")
+                self.monitors = []
+        return self.monitors
+        
+    def monitor_at(self, x, y):
+        """Get the index of the monitor containing a global screen point, or None"""
+        for index, (left, top, width, height) in enumerate(self.get_monitors()):
+            if left <= x < left + width and top <= y < top + height:
+                return index
+        return None
+        
+    def _capture_frame(self, region=None):
+        """Capture a new frame from the backend, bypassing the frame cache"""
         try:
-            if region:
-                screenshot = pyautogui.screenshot(region=region)
-            else:
-                screenshot = pyautogui.screenshot()
-            return screenshot
+            return self.capture_backend.grab(region)
         except Exception as e:
             print(f"Error taking screenshot: {str(e)}")
             return None
+        
+    def grab_frame(self, region=None, fresh=False, monitor=None):
+        """Get the current screen as a NumPy-backed Frame
+        
+        Frames are shared through the frame cache, so every consumer within
+        a step sees the same capture until an action invalidates it. Only
+        one monitor is captured at a time: the primary one by default, or
+        the one containing region.
+        
+        Args:
+            region: Region to return (x, y, width, height) in global coordinates
+            fresh: Force a new capture instead of reusing the cached frame
+            monitor: Index into get_monitors() to capture
+            
+        Returns:
+            Frame: The captured frame or None if capture failed
+        """
+        if monitor is None and region is not None and len(self.get_monitors()) > 1:
+            monitor = self.monitor_at(region[0] + region[2] // 2, region[1] + region[3] // 2)
+        if not monitor:
+            return self.frame_cache.get(region, fresh=fresh)
+        return self.frame_cache.get(region, fresh=fresh, monitor=self.get_monitors()[monitor])
+        
+    def start_continuous_capture(self, fps=5.0, buffer_size=16):
+        """Capture the screen in the background into a ring buffer
+        
+        While running, the frame cache hands out the newest buffered frame
+        (if it was captured after the last action) instead of capturing.
+        
+        Args:
+            fps: Captures per second
+            buffer_size: Number of frames kept for latest_frame/frames_since
+        """
+        self.stop_continuous_capture()
+        self.continuous_capture = ContinuousCapture(
+            lambda region: self.capture_backend.grab(region), fps=fps, buffer_size=buffer_size)
+        self.continuous_capture.start()
+        
+    def stop_continuous_capture(self):
+        """Stop the background capture thread and drop its buffer"""
+        if self.continuous_capture is not None:
+            self.continuous_capture.stop()
+            self.continuous_capture = None
+            
+    def _buffered_frame_since(self, timestamp):
+        """Frame cache source: newest buffered frame captured since timestamp"""
+        if self.continuous_capture is None:
+            return None
+        return self.continuous_capture.latest_since(timestamp)
+        
+    def latest_frame(self):
+        """Get the newest frame from the continuous capture buffer
+        
+        Returns:
+            Frame: The newest buffered frame, or a normal capture if
+            continuous capture isn't running
+        """
+        if self.continuous_capture is not None:
+            frame = self.continuous_capture.latest()
+            if frame is not None:
+                return frame
+        return self.grab_frame()
+        
+    def frames_since(self, timestamp, changed_only=False):
+        """Get buffered frames captured after a time.monotonic() timestamp
+        
+        Lets post-action checks look back at the transitions an action
+        caused without capturing again.
+        
+        Args:
+            timestamp: time.monotonic() value to look back to
+            changed_only: Only return frames that differ from the one before
+            
+        Returns:
+            list: Frames oldest first (empty if continuous capture isn't running)
+        """
+        if self.continuous_capture is None:
+            return []
+        return self.continuous_capture.frames_since(timestamp, changed_only)
+        
+    def _get_screen_watcher(self):
+        """Get the shared screen watcher, creating it on first use"""
+        if self.screen_watcher is None:
+            self.screen_watcher = ScreenWatcher(self._capture_frame, interval=0.25)
+        return self.screen_watcher
+        
+    def _watch_check(self, target, confidence=None):
+        """Build the watch check for a target: a saved UI element or on-screen text
+        
+        Returns:
+            callable: Takes a Frame, returns the target's (x, y) center or None
+        """
+        element_name = next((name for name in self.ui_elements if name.lower() == target.lower()), None)
+        if element_name is not None:
+            def check_element(frame):
+                template = self.template_store.get(self.ui_elements[element_name]["image_path"])
+                if template is None:
+                    return None
+                match = self._locate_with_prior(element_name, template, frame, confidence)
+                if match is None:
+                    return None
+                x, y, w, h = match[1]
+                return (x + w // 2, y + h // 2)
+            return check_element
+            
+        def check_text(frame):
+            return build_text_index(frame, self.get_ocr_engine()).locate(target)
+        return check_text
+        
+    def watch_for(self, target, appear=True, callback=None, region=None, confidence=None):
+        """Start watching for a UI element or text to appear or disappear
+        
+        All watches share one polling loop, and a watch only re-matches
+        when the pixels in its region change.
+        
+        Args:
+            target: Saved UI element name or text to look for with OCR
+            appear: Wait for the target to show up (True) or to go away (False)
+            callback: Called with the result when the watch fires
+            region: Only watch this region (x, y, width, height)
+            confidence: Minimum template match confidence (default: the element's tuned threshold)
+            
+        Returns:
+            Future: Resolves to the target's (x, y) center, or True once it is gone
+        """
+        return self._get_screen_watcher().watch(self._watch_check(target, confidence), region, appear,
+                                                callback, name=target)
+        
+    def wait_for(self, target, timeout=None, region=None, confidence=None):
+        """Block until a UI element or text is visible
+        
+        Returns:
+            tuple: (x, y) center of the target, or None on timeout
+        """
+        timeout = self.watch_timeout if timeout is None else timeout
+        return self._get_screen_watcher().wait(self._watch_check(target, confidence), region, True,
+                                               timeout, name=target)
+        
+    def wait_until_gone(self, target, timeout=None, region=None, confidence=None):
+        """Block until a UI element or text is no longer visible
+        
+        Returns:
+            bool: True if it went away, False on timeout
+        """
+        timeout = self.watch_timeout if timeout is None else timeout
+        return self._get_screen_watcher().wait(self._watch_check(target, confidence), region, False,
+                                               timeout, name=target) is not None
+        
+    def invalidate_frame(self):
+        """Mark the cached frame as stale after something changed the screen"""
+        self.frame_cache.invalidate()
+        
+    def set_settle_detection(self, enabled=True):
+        """Wait for the screen to settle after actions instead of sleeping
+        
+        With settle detection on, the input backend's fixed pause after every
+        call is turned off; actions are followed by wait_for_screen_settle.
+        Turning it off restores the pause the backend had before.
+        
+        Args:
+            enabled: Turn settle detection on or off
+        """
+        self.use_settle_detection = enabled
+        if enabled:
+            if self.input_pause is None:
+                self.input_pause = self.input_backend.get_pause()
+            self.input_backend.set_pause(0.0)
+        elif self.input_pause is not None:
+            self.input_backend.set_pause(self.input_pause)
+            self.input_pause = None
+        
+    def wait_for_screen_settle(self, stable_ms=None, timeout=None):
+        """Wait until the screen has stopped changing
+        
+        The last sampled frame becomes the cached frame, so the next
+        screenshot in the step doesn't capture again.
+        
+        Args:
+            stable_ms: How long the screen must stay unchanged (default settle_stable_ms)
+            timeout: Maximum wait in seconds (default settle_timeout)
+            
+        Returns:
+            bool: True if the screen settled, False on timeout
+        """
+        stable_ms = self.settle_stable_ms if stable_ms is None else stable_ms
+        timeout = self.settle_timeout if timeout is None else timeout
+        settled, frame = wait_for_settle(self._capture_frame, stable_ms=stable_ms, timeout=timeout,
+                                         react_ms=self.settle_react_ms)
+        if frame is not None:
+            frame.meta["settled"] = True
+            self.frame_cache.put(frame)
+        if not settled:
+            print(f"Screen did not settle within {timeout:.1f}s")
+        return settled
+        
+    def _settle_after_action(self, fallback_delay):
+        """Let the UI catch up after an action
+        
+        Skips the wait if the cached frame was already captured after the
+        screen settled (e.g. by perform_action).
+        
+        Args:
+            fallback_delay: Seconds to sleep when settle detection is off
+        """
+        if not self.use_settle_detection:
+            time.sleep(fallback_delay)
+            self.invalidate_frame()
+            return
+        frame = self.frame_cache.peek()
+        if frame is None or not frame.meta.get("settled"):
+            self.wait_for_screen_settle()
+        
+    def take_screenshot(self, region=None):
+        """Take a screenshot of the entire screen or a specific region"""
+        frame = self.grab_frame(region)
+        if frame is None:
+            return None
+        return frame.to_pil()
     
-    def capture_step_screenshot(self, description=""):
-        """Capture a screenshot for the current step"""
+    def set_image_policy(self, purpose, **options):
+        """Configure how screenshots are encoded for one use
+        
+        Args:
+            purpose: "debug" (step logs) or "ai_upload" (images sent to the AI model)
+            **options: ImagePolicy options - format, compress_level, quality,
+                max_dimension, grayscale
+                
+        Returns:
+            ImagePolicy: The new policy
+        """
+        if purpose not in self.image_policies:
+            raise ValueError(f"Unknown image policy purpose: {purpose}")
+        policy = ImagePolicy(**options)
+        if purpose == "ai_upload" and policy.format == "npy":
+            raise ValueError("AI uploads need an image format, not npy")
+        self.image_policies[purpose] = policy
+        return policy
+        
+    def set_session_recording(self, enabled=True, tile_size=32, keyframe_interval=25):
+        """Record step screenshots as one delta-encoded stream instead of image files
+        
+        Each step stores only the tiles that changed since the previous
+        step, with a full keyframe every keyframe_interval steps. Step
+        paths then look like "<session>/recording.bin#<record>" and can be
+        opened with load_step_image or a SessionReader.
+        
+        Args:
+            enabled: Turn delta recording on or off
+            tile_size: Edge length of the compared tiles in pixels
+            keyframe_interval: Steps between full keyframes
+        """
+        self.flush_step_screenshots()
+        if enabled:
+            self.session_recorder = SessionRecorder(self.session_dir, tile_size=tile_size,
+                                                    keyframe_interval=keyframe_interval)
+        else:
+            self.session_recorder = None
+        
+    def _save_debug_image(self, frame, filepath, scale=1.0):
+        """Encode a step screenshot with the debug image policy"""
+        policy = self.image_policies["debug"]
+        reference = parse_step_reference(filepath)
+        if reference and self.session_recorder is not None:
+            # Grayscale and downscaling from the debug policy still apply
+            # The step number was stored when the reference was reserved
+            self.session_recorder.record(None, policy.prepare(frame, scale), number=reference[1])
+        else:
+            policy.save(frame, filepath, scale)
+        
+    def prepare_ai_upload(self, step_path=None):
+        """Get an image file of the current screen encoded for AI upload
+        
+        If the AI upload policy matches the debug policy, the step
+        screenshot is reused instead of encoding the frame again.
+        
+        Args:
+            step_path: Step screenshot of the current frame, if there is one
+            
+        Returns:
+            str: Path of the image to upload or None if capture failed
+        """
+        policy = self.image_policies["ai_upload"]
+        if step_path and policy == self.image_policies["debug"] and not parse_step_reference(step_path):
+            self.wait_for_step_file(step_path)
+            return step_path
+            
+        frame = self.grab_frame()
+        if frame is None:
+            return None
+            
+        filepath = frame.meta.get("ai_upload_path")
+        if not filepath:
+            filename = f"ai_upload_{self.step_counter:03d}_{int(time.time() * 1000)}{policy.extension}"
+            filepath = os.path.join(self.session_dir, filename)
+            policy.save(frame, filepath)
+            frame.meta["ai_upload_path"] = filepath
+        return filepath
+        
+    def capture_step_screenshot(self, description="", wait=False):
+        """Capture a screenshot for the current step
+        
+        The frame is handed to the background step writer, which encodes
+        it, appends the log entry and notifies on_step_screenshot. The
+        returned path may not exist yet - pass wait=True (or call
+        wait_for_step_file) before reading the file.
+        
+        Args:
+            description: Description of the step
+            wait: Block until the screenshot is written
+            
+        Returns:
+            str: Path of the step screenshot or None if capture failed
+        """
         if not self.debug_mode:
             return None
             
@@ -59,87 +476,213 @@ class AIVisionController:
             # Increment step counter
             self.step_counter += 1
             
-            # Take screenshot
-            screenshot = self.take_screenshot()
-            if not screenshot:
+            # Get the current frame, shared with other consumers in this step
+            frame = self.grab_frame()
+            if frame is None:
                 return None
                 
-            # Generate filename with step number and timestamp
-            timestamp = datetime.datetime.now().strftime("%H%M%S")
-            filename = f"step_{self.step_counter:03d}_{timestamp}.png"
-            
-            # If description provided, add it to the filename
-            if description:
-                # Clean description for filename (remove special chars)
-                clean_desc = "".join(c for c in description if c.isalnum() or c == ' ')
-                clean_desc = clean_desc.replace(' ', '_')[:30]  # Limit length
-                filename = f"step_{self.step_counter:03d}_{timestamp}_{clean_desc}.png"
+            log_path = os.path.join(self.session_dir, "execution_log.txt")
+            callback = self.on_step_screenshot if callable(getattr(self, 'on_step_screenshot', None)) else None
                 
-            # Save screenshot
-            filepath = os.path.join(self.session_dir, filename)
-            screenshot.save(filepath)
-            
-            # Create a log entry
-            log_entry = f"Step {self.step_counter}: {description}\n"
-            with open(os.path.join(self.session_dir, "execution_log.txt"), "a") as log_file:
-                log_file.write(log_entry)
+            # The frame was already written by an earlier step - reference it
+            # instead of encoding the same pixels again
+            saved_path = frame.meta.get("step_path")
+            if saved_path:
+                log_entry = f"Step {self.step_counter}: {description} (unchanged, see {os.path.basename(saved_path)})\n"
+                job = StepWriteJob(self.step_counter, description, saved_path, None, log_path, log_entry, callback)
+            elif self.session_recorder is not None:
+                filepath = self.session_recorder.reserve(self.step_counter)
+                frame.meta["step_path"] = filepath
+                log_entry = f"Step {self.step_counter}: {description}\n"
+                job = StepWriteJob(self.step_counter, description, filepath, frame, log_path, log_entry, callback)
+            else:
+                # Generate filename with step number and timestamp
+                timestamp = datetime.datetime.now().strftime("%H%M%S")
+                extension = self.image_policies["debug"].extension
+                filename = f"step_{self.step_counter:03d}_{timestamp}{extension}"
+                
+                # If description provided, add it to the filename
+                if description:
+                    # Clean description for filename (remove special chars)
+                    clean_desc = "".join(c for c in description if c.isalnum() or c == ' ')
+                    clean_desc = clean_desc.replace(' ', '_')[:30]  # Limit length
+                    filename = f"step_{self.step_counter:03d}_{timestamp}_{clean_desc}{extension}"
+                    
+                filepath = os.path.join(self.session_dir, filename)
+                frame.meta["step_path"] = filepath
+                log_entry = f"Step {self.step_counter}: {description}\n"
+                job = StepWriteJob(self.step_counter, description, filepath, frame, log_path, log_entry, callback)
                 
-            # Notify UI to add step card if callback is set
-            if hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
-                self.on_step_screenshot(self.step_counter, description, filepath)
+            # Encoding, writing and the UI notification happen off this thread
+            self.step_writer.submit(job)
+            if wait:
+                job.wait()
                 
-            return filepath
+            return job.filepath
         except Exception as e:
             print(f"Error capturing step screenshot: {str(e)}")
             return None
+            
+    def wait_for_step_file(self, filepath, timeout=None):
+        """Wait until a step screenshot returned by capture_step_screenshot is on disk
+        
+        Args:
+            filepath: Path returned by capture_step_screenshot
+            timeout: Maximum time to wait in seconds
+            
+        Returns:
+            bool: True if the file has been written
+        """
+        if not filepath:
+            return False
+        return self.step_writer.wait_for(filepath, timeout)
+        
+    def flush_step_screenshots(self):
+        """Block until all queued step screenshots are written and logged"""
+        self.step_writer.flush()
     
-    def save_ui_element(self, name, image_path, action_type="click"):
-        """Save a UI element"""
+    def save_ui_element(self, name, image_path, action_type="click", matcher="template"):
+        """Save a UI element
+        
+        Args:
+            name: Element name used in commands
+            image_path: Image of the element
+            action_type: Default action for the element
+            matcher: "template" (pixel matching) or a keypoint matcher ("orb"
+                or "akaze") for elements that must be found at other display scalings
+        """
+        if matcher not in MATCHERS:
+            print(f"Unknown matcher '{matcher}', using template matching")
+            matcher = "template"
         self.ui_elements[name] = {
             "image_path": image_path,
             "action_type": action_type,
-            "last_found": None
+            "matcher": matcher,
+            "last_found": None,
+            "last_box": None  # (x, y, width, height) where it was last matched
             }
         
+        # Decode the image now so lookups don't touch the file
+        self.template_store.add(image_path)
+        
         # Save the UI elements to a file for persistence
         self._save_ui_elements()
         
+    def save_region(self, name, region):
+        """Save a named screen rectangle that lookups can be scoped to
+        
+        Args:
+            name: Region name, used as `click: OK in "name"`
+            region: Region (x, y, width, height)
+        """
+        self.regions[name] = tuple(int(v) for v in region)
+        
+    def resolve_search_scope(self, scope):
+        """Get the screen region a search scope refers to
+        
+        Args:
+            scope: Scope dict from split_scope (window, saved region or anchor)
+            
+        Returns:
+            tuple: Region (x, y, width, height) or None if it can't be found
+        """
+        return resolve_scope(self, scope)
+        
     def _save_ui_elements(self):
         """Save UI elements to a file"""
         # This is a placeholder - in a real implementation, this would
         # save the UI elements to a JSON file or database
         pass
+        
+    def save_all_data(self, filename):
+        """Save UI elements, saved regions and workflows to a JSON file
+        
+        Args:
+            filename: Path of the configuration file
+        """
+        config = {
+            "ui_elements": self.ui_elements,
+            "regions": self.regions,
+            "workflows": getattr(self, "workflows", {}),
+        }
+        try:
+            with open(filename, "w") as f:
+                with self.element_lock:
+                    json.dump(config, f, indent=2)
+            print(f"All data saved to {filename}")
+        except Exception as e:
+            print(f"Error saving data: {str(e)}")
             
-    def find_ui_element(self, element_name, confidence=0.8):
-        """Find a UI element on screen"""
+    def load_all_data(self, filename):
+        """Load UI elements, saved regions and workflows from a JSON file
+        
+        Every element image is decoded into the template store right away.
+        
+        Args:
+            filename: Path of the configuration file
+        """
+        try:
+            with open(filename, "r") as f:
+                config = json.load(f)
+        except Exception as e:
+            print(f"Error loading data: {str(e)}")
+            return
+            
+        self.ui_elements = config.get("ui_elements", {})
+        self.regions = {name: tuple(region) for name, region in config.get("regions", {}).items()}
+        workflows = config.get("workflows", {})
+        if getattr(self, "workflow_manager", None) is not None:
+            self.workflow_manager.import_workflows(workflows)
+        else:
+            self.workflows = workflows
+            
+        self.template_store.clear()
+        loaded = self.template_store.preload(element["image_path"] for element in self.ui_elements.values())
+        print(f"Data loaded from {filename}")
+        print(f"Loaded {len(self.ui_elements)} UI elements ({loaded} templates) and {len(workflows)} workflows")
+            
+    def find_ui_element(self, element_name, confidence=None, region=None):
+        """Find a UI element on screen
+        
+        Args:
+            element_name: Name of a saved UI element
+            confidence: Minimum match confidence (default: the element's tuned threshold)
+            region: Only search this region (x, y, width, height)
+            
+        Returns:
+            tuple: (x, y) screen coordinates of the element's center or None
+        """
         if element_name not in self.ui_elements:
             print(f"UI element '{element_name}' not found in saved elements")
             return None
             
         element = self.ui_elements[element_name]
-        if not os.path.exists(element["image_path"]):
-            print(f"Image file not found: {element['image_path']}")
+        # Decoded once and kept in memory (reloaded if the file changes)
+        template = self.template_store.get(element["image_path"])
+        if template is None:
             return None
             
         try:
             # Take a screenshot to search in
             self.capture_step_screenshot(f"Looking for UI element: {element_name}")
             
-            # Find the element using pyautogui - confidence is a valid parameter for this function
-            # but type checking may not recognize it correctly
-            try:
-                location = pyautogui.locateCenterOnScreen(  # type: ignore
-                    element["image_path"], 
-                    confidence=confidence
-                )
-            except TypeError:
-                # Fallback if confidence parameter is not supported
-                location = pyautogui.locateCenterOnScreen(element["image_path"])  # type: ignore
+            # Search the shared frame instead of capturing again
+            if region is not None:
+                frame = self.grab_frame(region)
+                scale = self._element_scale(element, self.monitor_at(region[0], region[1]))
+                match = self._locate_with_prior(element_name, template, frame, confidence, scale) if frame is not None else None
+            else:
+                match = self._search_monitors(element_name, template, confidence)
+            location = None
+            if match:
+                x, y, w, h = match[1]
+                location = (x + w // 2, y + h // 2)
             
             # Update last found timestamp if found
             if location:
                 import time
-                self.ui_elements[element_name]["last_found"] = time.time()
+                with self.element_lock:
+                    self.ui_elements[element_name]["last_found"] = time.time()
                 
                 # Take a screenshot showing we found the element
                 self.capture_step_screenshot(f"Found UI element: {element_name}")
@@ -149,9 +692,309 @@ class AIVisionController:
             print(f"Error finding UI element '{element_name}': {str(e)}")
             return None
             
+    def set_element_matcher(self, element_name, matcher):
+        """Choose how a saved UI element is found
+        
+        Args:
+            element_name: Name of a saved UI element
+            matcher: "template", "orb" or "akaze"
+            
+        Returns:
+            bool: True if the setting was changed
+        """
+        if element_name not in self.ui_elements or matcher not in MATCHERS:
+            print(f"Cannot use matcher '{matcher}' for UI element '{element_name}'")
+            return False
+        with self.element_lock:
+            self.ui_elements[element_name]["matcher"] = matcher
+        self._save_ui_elements()
+        return True
+        
+    def _feature_match(self, element_name, template, frame):
+        """Find an element with its keypoint matcher, or None if it uses template matching
+        
+        Returns:
+            tuple: (score, (x, y, width, height)) in screen coordinates, or None
+        """
+        name = self.ui_elements[element_name].get("matcher", "template")
+        if name == "template":
+            return None
+        if name not in self.feature_matchers:
+            self.feature_matchers[name] = create_feature_matcher(name)
+        match = self.feature_matchers[name].locate(frame, template)
+        if match:
+            with self.element_lock:
+                self.ui_elements[element_name]["last_box"] = list(match[1])
+        return match
+        
+    def _locate_with_prior(self, element_name, template, frame, confidence, scale=1.0):
+        """Match an element's template, trying its last known box first
+        
+        Elements that don't move are confirmed with one small comparison at
+        their previous position; only a miss there costs a full scan of the
+        frame. The box found is remembered for the next lookup. Elements set
+        to a keypoint matcher skip all that and use it instead.
+        
+        Safe to call from a screen watch: element state is only read and
+        updated under element_lock, the matching itself runs without it.
+        
+        Args:
+            confidence: Minimum match confidence, None for the element's tuned threshold
+            scale: Template scale to match at (the element's scale on this monitor)
+            
+        Returns:
+            tuple: (score, (x, y, width, height)) in screen coordinates, or None
+        """
+        element = self.ui_elements[element_name]
+        if element.get("matcher", "template") != "template":
+            return self._feature_match(element_name, template, frame)
+        template = template.scaled(scale)
+        with self.element_lock:
+            threshold, accept_score = self.element_thresholds(element_name, confidence)
+            last_box = element.get("last_box")
+        match = None
+        if last_box:
+            match = locate_near(frame, template, tuple(last_box), self.prior_margin, threshold)
+        hit = match is not None
+        scores = None
+        if not hit:
+            start_y = last_box[1] + last_box[3] // 2 if last_box else None
+            match, best, runner_up = scan_template(frame, template, threshold, accept_score, start_y)
+            scores = (best, runner_up)
+        with self.element_lock:
+            stats = self.element_stats.setdefault(element_name, {"hits": 0, "misses": 0})
+            stats["hits" if hit else "misses"] += 1
+            if match:
+                if scores is not None:
+                    self._record_match_scores(element_name, *scores)
+                element["last_box"] = list(match[1])
+        return match
+        
+    def element_thresholds(self, element_name, confidence=None):
+        """Get the match threshold and early-accept score for an element
+        
+        Both come from the element's recorded match scores (see
+        derive_thresholds); until there are enough of them the threshold is
+        default_confidence and scans never stop early.
+        
+        Args:
+            element_name: Name of a saved UI element
+            confidence: Explicit threshold that overrides the tuned one
+            
+        Returns:
+            tuple: (threshold, accept_score or None)
+        """
+        with self.element_lock:
+            scores = self.ui_elements.get(element_name, {}).get("match_scores", {})
+            threshold, accept_score = derive_thresholds(scores.get("best", []), scores.get("runner_up", []),
+                                                        self.default_confidence)
+        if confidence is not None:
+            threshold = confidence
+            accept_score = max(accept_score, confidence) if accept_score is not None else None
+        return threshold, accept_score
+        
+    def _record_match_scores(self, element_name, best, runner_up):
+        """Remember the best and runner-up score of a successful full scan
+        
+        A scan that stopped early has no runner-up; it only adds to the
+        best-score history, so the runner-ups seen so far are kept.
+        """
+        with self.element_lock:
+            scores = self.ui_elements[element_name].setdefault("match_scores", {"best": [], "runner_up": []})
+            for key, value in (("best", best), ("runner_up", runner_up)):
+                if value is not None:
+                    scores[key].append(round(value, 4))
+                    del scores[key][:-self.score_history]
+        
+    def _element_scale(self, element, monitor):
+        """Template scale that last matched an element on a monitor (1.0 if never)"""
+        if monitor is None:
+            return 1.0
+        return element.get("monitor_scales", {}).get(str(monitor), 1.0)
+        
+    def _monitor_order(self, elements):
+        """Monitor indexes to search, most recent location of the elements first"""
+        order = list(range(max(1, len(self.get_monitors()))))
+        seen = []
+        for element in elements:
+            box = element.get("last_box")
+            if box:
+                monitor = self.monitor_at(box[0] + box[2] // 2, box[1] + box[3] // 2)
+                if monitor is not None and monitor not in seen:
+                    seen.append(monitor)
+        return seen + [index for index in order if index not in seen]
+        
+    def _search_monitors(self, element_name, template, confidence):
+        """Find an element on any monitor, capturing one monitor at a time
+        
+        The monitor the element was last seen on is searched first at the
+        scale that matched there, then the other monitors. Only when all of
+        them miss are the extra dpi_scales tried; a scale that matches is
+        remembered for that element on that monitor.
+        
+        Returns:
+            tuple: (score, (x, y, width, height)) in global screen coordinates, or None
+        """
+        element = self.ui_elements[element_name]
+        threshold = self.element_thresholds(element_name, confidence)[0]
+        order = self._monitor_order([element])
+        for monitor in order:
+            frame = self.grab_frame(monitor=monitor)
+            if frame is None:
+                continue
+            match = self._locate_with_prior(element_name, template, frame, confidence,
+                                            self._element_scale(element, monitor))
+            if match:
+                return match
+                
+        if element.get("matcher", "template") != "template":
+            return None  # Keypoint matching already covers other scales
+        for scale in self.dpi_scales:
+            for monitor in order:
+                if scale == self._element_scale(element, monitor):
+                    continue
+                frame = self.grab_frame(monitor=monitor)
+                match = locate_in_frame(frame, template.scaled(scale), threshold) if frame is not None else None
+                if match:
+                    with self.element_lock:
+                        element.setdefault("monitor_scales", {})[str(monitor)] = scale
+                        element["last_box"] = list(match[1])
+                    return match
+        return None
+        
+    def get_element_stats(self, element_name=None):
+        """Get last-known-location hit/miss counts and tuned thresholds
+        
+        Args:
+            element_name: One element's stats, or None for all of them
+            
+        Returns:
+            dict: {"hits", "misses", "hit_rate", "threshold", "accept_score"}
+                (per element name if None)
+        """
+        def with_rate(name, stats):
+            total = stats["hits"] + stats["misses"]
+            threshold, accept_score = self.element_thresholds(name)
+            return dict(stats, hit_rate=stats["hits"] / total if total else 0.0,
+                        threshold=threshold, accept_score=accept_score)
+        
+        with self.element_lock:
+            if element_name is not None:
+                return with_rate(element_name, self.element_stats.get(element_name, {"hits": 0, "misses": 0}))
+            return {name: with_rate(name, stats) for name, stats in self.element_stats.items()}
+        
+    def locate_many(self, names, frame=None, confidence=None, region=None):
+        """Find several UI elements in one screen capture
+        
+        All templates are matched against the same frame in parallel worker
+        threads, so a workflow touching many elements captures and converts
+        the screen once instead of once per element. Without a frame or
+        region, monitors are searched one at a time (where the elements were
+        last seen first) until every element is found.
+        
+        Args:
+            names: Names of saved UI elements
+            frame: Frame to search; captured (or taken from the cache) if None
+            confidence: Minimum match confidence (default: each element's tuned threshold)
+            region: Only search this region (x, y, width, height) when capturing
+            
+        Returns:
+            dict: name -> {"center": (x, y), "box": (x, y, width, height),
+                "confidence": score}, or None for elements that weren't found
+        """
+        results = {}
+        templates = {}
+        for name in names:
+            results[name] = None
+            if name not in self.ui_elements:
+                print(f"UI element '{name}' not found in saved elements")
+                continue
+            template = self.template_store.get(self.ui_elements[name]["image_path"])
+            if template is not None:
+                templates[name] = template
+                
+        if not templates:
+            return results
+            
+        try:
+            if frame is not None or region is not None:
+                frame = frame if frame is not None else self.grab_frame(region)
+                monitor = self.monitor_at(frame.left, frame.top) if frame is not None else None
+                matches = self._locate_many_in_frame(templates, frame, confidence, monitor) if frame is not None else {}
+            else:
+                matches = {}
+                for monitor in self._monitor_order([self.ui_elements[name] for name in templates]):
+                    frame = self.grab_frame(monitor=monitor)
+                    if frame is None:
+                        continue
+                    remaining = {name: template for name, template in templates.items() if not matches.get(name)}
+                    matches.update(self._locate_many_in_frame(remaining, frame, confidence, monitor))
+                    if all(matches.get(name) for name in templates):
+                        break
+        except Exception as e:
+            print(f"Error locating UI elements: {str(e)}")
+            return results
+            
+        found_at = time.time()
+        for name, match in matches.items():
+            if match is None:
+                continue
+            score, (x, y, w, h) = match
+            results[name] = {"center": (x + w // 2, y + h // 2), "box": (x, y, w, h), "confidence": score}
+            with self.element_lock:
+                self.ui_elements[name]["last_found"] = found_at
+                self.ui_elements[name]["last_box"] = [x, y, w, h]
+        return results
+            
+    def _locate_many_in_frame(self, templates, frame, confidence, monitor=None):
+        """Match several element templates against one frame
+        
+        Returns:
+            dict: name -> (score, (x, y, width, height)) or None
+        """
+        matches = {}
+        pending = {}
+        thresholds = {}
+        for name, template in templates.items():
+            element = self.ui_elements[name]
+            if element.get("matcher", "template") != "template":
+                # Screen keypoints are computed once per frame and shared
+                matches[name] = self._feature_match(name, template, frame)
+                continue
+            # Elements still at their last known box need no full scan
+            template = template.scaled(self._element_scale(element, monitor))
+            thresholds[name] = self.element_thresholds(name, confidence)[0]
+            last_box = element.get("last_box")
+            match = None
+            if last_box:
+                match = locate_near(frame, template, tuple(last_box), self.prior_margin, thresholds[name])
+            with self.element_lock:
+                stats = self.element_stats.setdefault(name, {"hits": 0, "misses": 0})
+                stats["hits" if match else "misses"] += 1
+            if match:
+                matches[name] = match
+            else:
+                pending[name] = template
+        matches.update(locate_all(frame, pending, thresholds))
+        return matches
+        
     def perform_action(self, action_type, target=None, text=None, **kwargs):
-        """Perform an action on screen"""
+        """Perform an action on screen
+        
+        A `scope` keyword (as returned by CommandParser) or a `region` keyword
+        limits the search for a named target to that part of the screen.
+        """
         try:
+            scope = kwargs.pop("scope", None)
+            if scope:
+                kwargs["region"] = self.resolve_search_scope(scope)
+                if kwargs["region"] is None:
+                    if not isinstance(target, str):
+                        raise Exception(f"Search scope not found: {scope['name']}")
+                    # "Stores near me" may just be the text to look for
+                    target = unscoped_target(target, scope)
+                    print(f"Search scope not found: {scope['name']}, looking for '{target}' as written")
+                    
             # Capture screenshot before action
             description = f"Before {action_type} on {target}" if target else f"Before {action_type}"
             self.capture_step_screenshot(description)
@@ -172,12 +1015,19 @@ class AIVisionController:
                 self._perform_hotkey(text, **kwargs)
             elif action_type == "wait":
                 self._perform_wait(**kwargs)
+            elif action_type in ("wait_for", "wait_until_gone"):
+                self._perform_watch(action_type, target, **kwargs)
             elif action_type == "scroll":
                 self._perform_scroll(**kwargs)
             else:
                 print(f"Unknown action type: {action_type}")
                 return False
                 
+            # The action changed the screen (or let time pass), so the cached frame is stale
+            self.invalidate_frame()
+            if self.use_settle_detection and action_type != "wait":
+                self.wait_for_screen_settle()
+                
             # Capture screenshot after action
             description = f"After {action_type} on {target}" if target else f"After {action_type}"
             self.capture_step_screenshot(description)
@@ -185,6 +1035,8 @@ class AIVisionController:
             return True
         except Exception as e:
             print(f"Error performing action {action_type}: {str(e)}")
+            # The action may have partially run - don't trust the cached frame
+            self.invalidate_frame()
             # Capture error screenshot
             self.capture_step_screenshot(f"ERROR: {action_type} failed - {str(e)}")
             return False
@@ -195,14 +1047,14 @@ class AIVisionController:
             # Target is x, y coordinates
             x, y = target
             self._move_to_position(x, y)
-            pyautogui.click(x=x, y=y)
+            self.input_backend.click(x, y)
         elif isinstance(target, str) and target in self.ui_elements:
             # Target is a UI element name
-            location = self.find_ui_element(target)
+            location = self.find_ui_element(target, region=kwargs.get("region"))
             if location:
                 x, y = location
                 self._move_to_position(x, y)
-                pyautogui.click(x=x, y=y)
+                self.input_backend.click(x, y)
             else:
                 print(f"Could not find UI element: {target}")
                 raise Exception(f"UI element not found: {target}")
@@ -217,14 +1069,14 @@ class AIVisionController:
             # Target is x, y coordinates
             x, y = target
             self._move_to_position(x, y)
-            pyautogui.doubleClick(x=x, y=y)
+            self.input_backend.click(x, y, clicks=2)
         elif isinstance(target, str) and target in self.ui_elements:
             # Target is a UI element name
-            location = self.find_ui_element(target)
+            location = self.find_ui_element(target, region=kwargs.get("region"))
             if location:
                 x, y = location
                 self._move_to_position(x, y)
-                pyautogui.doubleClick(x=x, y=y)
+                self.input_backend.click(x, y, clicks=2)
             else:
                 print(f"Could not find UI element: {target}")
                 raise Exception(f"UI element not found: {target}")
@@ -239,14 +1091,14 @@ class AIVisionController:
             # Target is x, y coordinates
             x, y = target
             self._move_to_position(x, y)
-            pyautogui.rightClick(x=x, y=y)
+            self.input_backend.click(x, y, button="right")
         elif isinstance(target, str) and target in self.ui_elements:
             # Target is a UI element name
-            location = self.find_ui_element(target)
+            location = self.find_ui_element(target, region=kwargs.get("region"))
             if location:
                 x, y = location
                 self._move_to_position(x, y)
-                pyautogui.rightClick(x=x, y=y)
+                self.input_backend.click(x, y, button="right")
             else:
                 print(f"Could not find UI element: {target}")
                 raise Exception(f"UI element not found: {target}")
@@ -263,7 +1115,7 @@ class AIVisionController:
             self._move_to_position(x, y)
         elif isinstance(target, str) and target in self.ui_elements:
             # Target is a UI element name
-            location = self.find_ui_element(target)
+            location = self.find_ui_element(target, region=kwargs.get("region"))
             if location:
                 x, y = location
                 self._move_to_position(x, y)
@@ -281,7 +1133,7 @@ class AIVisionController:
             print("No text provided for typing")
             return
             
-        pyautogui.typewrite(text, interval=0.05)
+        self.input_backend.type_text(text, interval=0.05)
         
     def _perform_key_press(self, key, **kwargs):
         """Press a key"""
@@ -289,7 +1141,7 @@ class AIVisionController:
             print("No key provided")
             return
             
-        pyautogui.press(key)
+        self.input_backend.press(key)
         
     def _perform_hotkey(self, keys, **kwargs):
         """Press a hotkey combination"""
@@ -299,7 +1151,7 @@ class AIVisionController:
             
         # Split keys by + and press them as a hotkey
         key_list = keys.split('+')
-        pyautogui.hotkey(*key_list)
+        self.input_backend.hotkey(*key_list)
         
     def _perform_wait(self, **kwargs):
         """Wait for a specified duration"""
@@ -317,6 +1169,34 @@ class AIVisionController:
             print(f"Invalid duration: {duration}")
             time.sleep(1.0)  # Default wait
             
+    def _perform_watch(self, action_type, target, **kwargs):
+        """Wait for a target to appear (wait_for) or disappear (wait_until_gone)"""
+        if not target:
+            raise Exception(f"No target provided for {action_type}")
+        timeout = float(kwargs.get("timeout") or self.watch_timeout)
+        if action_type == "wait_for":
+            if self.wait_for(target, timeout, kwargs.get("region")) is None:
+                raise Exception(f"'{target}' did not appear within {timeout:g}s")
+        elif not self.wait_until_gone(target, timeout, kwargs.get("region")):
+            raise Exception(f"'{target}' still visible after {timeout:g}s")
+            
+    def run_watch_command(self, cmd_type, cmd_value):
+        """Run a wait_for/wait_until_gone command
+        
+        The value is the target, optionally followed by a timeout in seconds
+        and/or a search scope: `Save`, `Progress 60`, `Spinner in "Export" 120s`.
+        
+        Returns:
+            bool: True if the condition was met in time
+        """
+        timeout = None
+        match = re.search(r'\s+(\d+(?:\.\d+)?)\s*s?$', cmd_value)
+        if match:
+            timeout = float(match.group(1))
+            cmd_value = cmd_value[:match.start()]
+        target, scope = split_scope(cmd_value.strip())
+        return self.perform_action(cmd_type, target=target, scope=scope, timeout=timeout)
+        
     def _perform_scroll(self, **kwargs):
         """Perform a scroll action"""
         clicks = kwargs.get('clicks')
@@ -328,7 +1208,7 @@ class AIVisionController:
             # Convert to int if it's a string
             if isinstance(clicks, str):
                 clicks = int(clicks)
-            pyautogui.scroll(clicks)
+            self.input_backend.scroll(clicks)
         except ValueError:
             print(f"Invalid clicks amount: {clicks}")
             
@@ -336,10 +1216,10 @@ class AIVisionController:
         """Move mouse to position with optional visual feedback"""
         if self.visual_feedback and self.move_duration > 0:
             # Visual feedback enabled - smooth movement
-            pyautogui.moveTo(x, y, duration=self.move_duration)
+            self.input_backend.move_to(x, y, duration=self.move_duration)
         else:
             # No visual feedback - instant movement
-            pyautogui.moveTo(x, y)
+            self.input_backend.move_to(x, y)
 
     def toggle_visual_feedback(self, enable=None):
         """Toggle visual feedback for mouse movements"""
@@ -356,6 +1236,42 @@ class AIVisionController:
         except ValueError:
             print(f"Invalid duration: {duration}") 
 
+    def click_target(self, target):
+        """Click a UI element or on-screen text named in a command
+        
+        The target may end with a search scope - `OK in "Save As"` (a saved
+        region or window), `OK in region toolbar` or `OK near Search` - so
+        matching and OCR only run on that part of the screen. If the scope
+        can't be found, the whole target is looked for as written.
+        
+        Args:
+            target: Target text from the command
+            
+        Returns:
+            bool: True if the target was found and clicked
+        """
+        target, scope = split_scope(target)
+        region = None
+        if scope:
+            region = self.resolve_search_scope(scope)
+            if region is None:
+                # "Stores near me" may just be the text to click
+                target = unscoped_target(target, scope)
+                print(f"Search scope not found: {scope['name']}, looking for '{target}' as written")
+                
+        # Parsed commands are lowercased, so compare element names case-insensitively
+        element_name = next((name for name in self.ui_elements if name.lower() == target.lower()), None)
+        if element_name is not None:
+            return self.perform_action("click", target=element_name, region=region)
+            
+        # Try OCR-based click
+        success = self.click_on_text(target, region)
+        if not success:
+            print(f"Text not found: {target}")
+            # Capture failed attempt
+            self.capture_step_screenshot(f"ERROR: Text not found: {target}")
+        return success
+        
     def execute_command_sequence(self, commands):
         """Execute a sequence of commands
         
@@ -403,17 +1319,8 @@ class AIVisionController:
                         except Exception as e:
                             print(f"Error parsing coordinates: {str(e)}")
                     else:
-                        # Text description or UI element name
-                        if cmd_value in self.ui_elements:
-                            # It's a known UI element
-                            self.perform_action("click", target=cmd_value)
-                        else:
-                            # Try OCR-based click
-                            success = self.click_on_text(cmd_value)
-                            if not success:
-                                print(f"Text not found: {cmd_value}")
-                                # Capture failed attempt
-                                self.capture_step_screenshot(f"ERROR: Text not found: {cmd_value}")
+                        # UI element name or text, optionally scoped (e.g. OK in "Save As")
+                        self.click_target(cmd_value)
                                 
                 elif cmd_type == "type":
                     self.perform_action("type", text=cmd_value)
@@ -425,6 +1332,9 @@ class AIVisionController:
                     except ValueError:
                         print(f"Invalid wait time: {cmd_value}")
                         
+                elif cmd_type in ("wait_for", "wait_until_gone"):
+                    self.run_watch_command(cmd_type, cmd_value)
+                        
                 elif cmd_type == "press":
                     self.perform_action("key_press", text=cmd_value)
                     
@@ -433,20 +1343,19 @@ class AIVisionController:
                     continue
                     
                 # Take a screenshot after each action for AI analysis
-                screenshot = self.take_screenshot()
-                if screenshot:
-                    # Save screenshot
-                    timestamp = int(time.time())
-                    filename = f"ai_analysis_{timestamp}.png"
-                    filepath = os.path.join(self.session_dir, filename)
-                    screenshot.save(filepath)
+                frame = self.grab_frame()
+                if frame is not None:
+                    # Reuse the step screenshot of this frame if it was already saved
+                    filepath = self.prepare_ai_upload(frame.meta.get("step_path"))
                     screenshot_paths.append(filepath)
                     
                     # Try to detect UI elements using AI if available
                     if self.ai_manager is not None:
                         try:
-                            # Only do this if we've taken fewer than 10 screenshots to avoid API overuse
-                            if len(screenshot_paths) % 3 == 0 and len(screenshot_paths) <= 9:  # Every 3rd action, up to 9 screenshots
+                            # Local box proposals are cheap enough for every action; when Gemini
+                            # labels them, only every 3rd action, up to 9 screenshots, to avoid API overuse
+                            remote = getattr(self.ai_manager, 'remote_labels', True)
+                            if not remote or (len(screenshot_paths) % 3 == 0 and len(screenshot_paths) <= 9):
                                 # Check if the method exists
                                 if callable(getattr(self.ai_manager, 'detect_ui_elements', None)):
                                     self.ai_manager.detect_ui_elements(filepath)
@@ -457,14 +1366,16 @@ class AIVisionController:
                             print(f"Error analyzing UI with AI: {str(e)}")
                 
                 # Wait between commands
-                time.sleep(0.5)
+                self._settle_after_action(0.5)
                 
             print(f"Command execution completed successfully")
             return self.session_dir
             
         except Exception as e:
             print(f"Error executing commands: {str(e)}")
-            return False 
+            return False
+        finally:
+            self.flush_step_screenshots() 
 
     def click_on_text(self, text, region=None):
         """Click on text found on screen using OCR (Base implementation)
@@ -479,12 +1390,13 @@ class AIVisionController:
         print("Base click_on_text called - should be overridden by child class")
         return False
         
-    def find_text_on_screen(self, text, region=None):
+    def find_text_on_screen(self, text, region=None, tiled=None):
         """Find text on screen using OCR
         
         Args:
             text: Text to find
             region: Region to search in (x, y, width, height)
+            tiled: OCR as parallel tiles (None uses use_tiled_ocr)
             
         Returns:
             tuple: (x, y) coordinates of the text or None if not found
@@ -492,24 +1404,59 @@ class AIVisionController:
         # Capture a screenshot before searching
         self.capture_step_screenshot(f"Looking for text: {text}")
         
-        # Try to use OCR to find the text
-        screen_text = self.get_screen_text_ocr(region)
-        
-        # This is a simplified implementation - in a real application
-        # you would want to do more sophisticated text matching and
-        # get the actual position of the text from the OCR engine
-        if text.lower() in screen_text.lower():
-            # For now, just return the center of the region or screen
-            if region:
-                x = region[0] + region[2] // 2
-                y = region[1] + region[3] // 2
-            else:
-                screen_width, screen_height = pyautogui.size()
-                x = screen_width // 2
-                y = screen_height // 2
-            return x, y
+        # Word boxes from one OCR pass per frame, shared by every lookup on it
+        try:
+            index = self.get_text_index(region, tiled)
+        except Exception as e:
+            print(f"OCR error: {str(e)}")
+            return None
+        if index is None:
+            return None
+        return index.locate(text)
         
-        return None
+    def get_ocr_engine(self):
+        """Get the OCR engine, loading Tesseract on first use
+        
+        The engine stays loaded, so OCR calls don't start a tesseract
+        process and reload its language data each time.
+        
+        Returns:
+            OCREngine: The engine (the process-wide one unless ocr_engine was set)
+        """
+        if self.ocr_engine is None:
+            self.ocr_engine = get_ocr_engine()
+        return self.ocr_engine
+        
+    def get_tiled_ocr(self):
+        """Get tiled OCR, which splits big screenshots across worker processes
+        
+        Returns:
+            TiledOCR: The tiled OCR (the process-wide one unless tiled_ocr was set)
+        """
+        if self.tiled_ocr is None:
+            self.tiled_ocr = get_tiled_ocr()
+        return self.tiled_ocr
+        
+    def get_text_index(self, region=None, tiled=None):
+        """OCR the screen once and index its words for many text lookups
+        
+        The index is kept with the captured frame, so looking up several
+        labels on an unchanged screen runs OCR once.
+        
+        Args:
+            region: Region to read (x, y, width, height)
+            tiled: OCR as parallel tiles (see get_tiled_ocr); None uses use_tiled_ocr
+            
+        Returns:
+            ScreenTextIndex: Words in screen coordinates, or None if capture failed
+        """
+        frame = self.grab_frame(region)
+        if frame is None:
+            return None
+        if tiled is None:
+            tiled = self.use_tiled_ocr
+        engine = self.get_tiled_ocr() if tiled else self.get_ocr_engine()
+        return build_text_index(frame, engine)
         
     def get_screen_text_ocr(self, region=None):
         """Get text from screen using OCR
@@ -521,15 +1468,12 @@ class AIVisionController:
             str: Text found on screen or empty string if OCR failed
         """
         try:
-            # Import pytesseract for OCR
-            import pytesseract
-            
             # Take a screenshot of the specified region or the entire screen
             screenshot = self.take_screenshot(region)
             
             if screenshot:
-                # Use pytesseract to get text from the screenshot
-                text = pytesseract.image_to_string(screenshot)
+                # OCR with the engine kept loaded for the controller's lifetime
+                text = self.get_ocr_engine().image_to_string(screenshot)
                 return text
         except Exception as e:
             print(f"OCR error: {str(e)}")
@@ -539,9 +1483,9 @@ class AIVisionController:
 class EnhancedAIVisionController(AIVisionController):
     """Enhanced controller with additional integration"""
     
-    def __init__(self):
+    def __init__(self, display=None):
         """Initialize the enhanced controller"""
-        super().__init__()
+        super().__init__(display)
         
         # These will be set by the GUI
         self.ocr_utils = None
@@ -593,18 +1537,21 @@ class EnhancedAIVisionController(AIVisionController):
             # Make sure step counter is reset
             self.step_counter = 0
             
-            # Clear previous logs
+            # Clear previous logs (after any screenshots still being written)
+            self.flush_step_screenshots()
             with open(os.path.join(self.session_dir, "execution_log.txt"), "w") as log_file:
                 log_file.write(f"Starting execution at {datetime.datetime.now()}\n\n")
             
             # Take an initial screenshot to analyze the starting state
             initial_screenshot = self.capture_step_screenshot("Initial screen state")
             if initial_screenshot and self.ai_manager is not None:
+                # Encode the frame for upload (reuses the step file if the policies match)
+                ai_image = self.prepare_ai_upload(initial_screenshot)
                 # Detect UI elements in the initial screenshot
-                self.ai_manager.detect_ui_elements(initial_screenshot)
+                self.ai_manager.detect_ui_elements(ai_image)
                 # Annotate the screenshot
                 if callable(getattr(self.ai_manager, 'annotate_detected_ui_elements', None)):
-                    annotated_path = self.ai_manager.annotate_detected_ui_elements(initial_screenshot)
+                    annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                     if annotated_path and hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
                         self.on_step_screenshot(self.step_counter, "Initial screen analysis", annotated_path)
             
@@ -641,20 +1588,8 @@ class EnhancedAIVisionController(AIVisionController):
                         except Exception as e:
                             print(f"Error parsing coordinates: {str(e)}")
                     else:
-                        # Text description or UI element name
-                        if cmd_value in self.ui_elements:
-                            # It's a known UI element
-                            self.perform_action("click", target=cmd_value)
-                            action_success = True
-                        else:
-                            # Try OCR-based click
-                            success = self.click_on_text(cmd_value)
-                            if not success:
-                                print(f"Text not found: {cmd_value}")
-                                # Capture failed attempt
-                                self.capture_step_screenshot(f"ERROR: Text not found: {cmd_value}")
-                            else:
-                                action_success = True
+                        # UI element name or text, optionally scoped (e.g. OK in "Save As")
+                        action_success = self.click_target(cmd_value)
                                 
                 elif cmd_type == 'type':
                     self.perform_action("type", text=cmd_value)
@@ -668,6 +1603,9 @@ class EnhancedAIVisionController(AIVisionController):
                     except ValueError:
                         print(f"Invalid wait time: {cmd_value}")
                         
+                elif cmd_type in ('wait_for', 'wait_until_gone'):
+                    action_success = self.run_watch_command(cmd_type, cmd_value)
+                    
                 elif cmd_type == 'press':
                     self.perform_action("key_press", text=cmd_value)
                     action_success = True
@@ -676,8 +1614,8 @@ class EnhancedAIVisionController(AIVisionController):
                     print(f"Unknown command type: {cmd_type}")
                     continue
                 
-                # Always wait a bit after each action to let the UI update
-                time.sleep(1.0)
+                # Let the UI update - waits for the screen to settle rather than a fixed delay
+                self._settle_after_action(1.0)
                     
                 # Take a screenshot after each action for AI analysis
                 after_screenshot = self.capture_step_screenshot(f"After {cmd_type}: {cmd_value}")
@@ -689,15 +1627,17 @@ class EnhancedAIVisionController(AIVisionController):
                         try:
                             # Create an action description for the analysis
                             action_desc = f"{cmd_type}: {cmd_value}"
+                            # Encode the frame for upload (reuses the step file if the policies match)
+                            ai_image = self.prepare_ai_upload(after_screenshot)
                             
                             # First detect UI elements in the screenshot
-                            ui_elements = self.ai_manager.detect_ui_elements(after_screenshot)
+                            ui_elements = self.ai_manager.detect_ui_elements(ai_image)
                             print(f"Detected {len(ui_elements) if ui_elements else 0} UI elements in screenshot")
                             
                             # Analyze this step with AI if the method exists
                             if callable(getattr(self.ai_manager, 'analyze_current_step', None)):
                                 analysis = self.ai_manager.analyze_current_step(
-                                    after_screenshot, 
+                                    ai_image, 
                                     self.step_counter,
                                     action_desc
                                 )
@@ -725,7 +1665,7 @@ class EnhancedAIVisionController(AIVisionController):
                                         overall_success = False
                                         
                                     # Annotate the screenshot with analysis results
-                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(after_screenshot)
+                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                                     
                                     # Update step card if callback is available
                                     if hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
@@ -738,7 +1678,7 @@ class EnhancedAIVisionController(AIVisionController):
                                 print("Warning: analyze_current_step method not available in AI manager")
                                 # Annotate the screenshot with detected UI elements
                                 if callable(getattr(self.ai_manager, 'annotate_detected_ui_elements', None)):
-                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(after_screenshot)
+                                    annotated_path = self.ai_manager.annotate_detected_ui_elements(ai_image)
                                     if annotated_path and hasattr(self, 'on_step_screenshot') and callable(self.on_step_screenshot):
                                         self.on_step_screenshot(self.step_counter, f"{cmd_type}: {cmd_value} - UI elements detected", annotated_path)
                         except Exception as e:
@@ -748,8 +1688,9 @@ class EnhancedAIVisionController(AIVisionController):
                 else:
                     print("Warning: Failed to capture screenshot after action")
                 
-                # Wait between commands
-                time.sleep(0.5)
+                # Wait between commands (settle detection already waited for the UI)
+                if not self.use_settle_detection:
+                    time.sleep(0.5)
                 
             print(f"Command execution completed successfully")
             
@@ -757,7 +1698,8 @@ class EnhancedAIVisionController(AIVisionController):
             final_status = "✓ All steps completed successfully" if overall_success else "⚠️ Some steps had issues"
             print(final_status)
             
-            # Write final status to log
+            # Write final status to log once all step screenshots are written
+            self.flush_step_screenshots()
             with open(os.path.join(self.session_dir, "execution_log.txt"), "a") as log_file:
                 log_file.write(f"\nFinal Status: {final_status}\n")
             
@@ -786,63 +1728,6 @@ class EnhancedAIVisionController(AIVisionController):
             return True
         return False
         
-    def find_text_on_screen(self, text, region=None):
-        """Find text on screen using OCR
-        
-        Args:
-            text: Text to find
-            region: Region to search in (x, y, width, height)
-            
-        Returns:
-            tuple: (x, y) coordinates of the text or None if not found
-        """
-        # Capture a screenshot before searching
-        self.capture_step_screenshot(f"Looking for text: {text}")
-        
-        # Try to use OCR to find the text
-        screen_text = self.get_screen_text_ocr(region)
-        
-        # This is a simplified implementation - in a real application
-        # you would want to do more sophisticated text matching and
-        # get the actual position of the text from the OCR engine
-        if text.lower() in screen_text.lower():
-            # For now, just return the center of the region or screen
-            if region:
-                x = region[0] + region[2] // 2
-                y = region[1] + region[3] // 2
-            else:
-                screen_width, screen_height = pyautogui.size()
-                x = screen_width // 2
-                y = screen_height // 2
-            return x, y
-        
-        return None
-        
-    def get_screen_text_ocr(self, region=None):
-        """Get text from screen using OCR
-        
-        Args:
-            region: Region to get text from (x, y, width, height)
-            
-        Returns:
-            str: Text found on screen or empty string if OCR failed
-        """
-        try:
-            # Import pytesseract for OCR
-            import pytesseract
-            
-            # Take a screenshot of the specified region or the entire screen
-            screenshot = self.take_screenshot(region)
-            
-            if screenshot:
-                # Use pytesseract to get text from the screenshot
-                text = pytesseract.image_to_string(screenshot)
-                return text
-        except Exception as e:
-            print(f"OCR error: {str(e)}")
-        
-        return "" 
-
     def set_ai_manager(self, ai_manager):
         """Set the AI manager for this controller
         
@@ -0,0 +1,141 @@
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from modules.screen_capture import Frame
+
+
+def change_hash(frame) -> int:
+    """Fingerprint of a frame for spotting screen changes
+
+    Hashes every pixel, so even a change of a few pixels (a small icon, a
+    checkbox tick) gives a different hash. That costs a few milliseconds
+    for a full-HD frame, far less than a capture or a template match.
+
+    Args:
+        frame: Frame to fingerprint
+
+    Returns:
+        int: CRC32 of the pixels
+    """
+    return zlib.crc32(np.ascontiguousarray(frame.array))
+
+
+class ContinuousCapture:
+    """Capture the screen on a background thread into a ring buffer
+
+    Every frame gets "capture_started" (monotonic time before the grab),
+    "change_hash" and "changed" (hash differs from the previous frame) in
+    its meta dict. Each entry keeps the pixels that were actually captured,
+    so the buffer holds buffer_size full frames.
+    """
+
+    def __init__(self, grab: Callable, fps: float = 5.0, buffer_size: int = 16):
+        """Initialize the capture thread (call start() to run it)
+
+        Args:
+            grab: Function taking a region and returning a full-screen Frame
+            fps: Target captures per second
+            buffer_size: Number of frames kept in the ring buffer
+        """
+        self._grab = grab
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.frames_captured = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the capture thread if it isn't running"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._capture_loop, name="continuous-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the capture thread and wait for it to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _capture_loop(self):
+        """Grab frames at the target rate until stopped"""
+        interval = 1.0 / self.fps
+        failing = False
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                frame = self._grab(None)
+                failing = False
+            except Exception as e:
+                if not failing:
+                    print(f"Error in continuous capture: {str(e)}")
+                failing = True
+                frame = None
+
+            if frame is not None:
+                self._append(frame, started)
+
+            # Sleep for the rest of the frame interval
+            self._stop.wait(max(0.0, interval - (time.monotonic() - started)))
+
+    def _append(self, frame, started: float):
+        """Add a frame to the ring buffer, noting whether it differs from the previous one"""
+        frame_hash = change_hash(frame)
+        with self._lock:
+            previous = self._buffer[-1] if self._buffer else None
+            changed = previous is None or previous.meta["change_hash"] != frame_hash
+            frame.meta.update({"capture_started": started, "change_hash": frame_hash, "changed": changed})
+            self._buffer.append(frame)
+            self.frames_captured += 1
+
+    def latest(self) -> Optional[Frame]:
+        """Get the most recent frame, or None if nothing was captured yet"""
+        with self._lock:
+            return self._buffer[-1] if self._buffer else None
+
+    def latest_since(self, timestamp: float) -> Optional[Frame]:
+        """Get the most recent frame whose capture started at or after timestamp"""
+        frame = self.latest()
+        if frame is None or frame.meta["capture_started"] < timestamp:
+            return None
+        return frame
+
+    def frames_since(self, timestamp: float, changed_only: bool = False) -> List[Frame]:
+        """Get buffered frames captured after a monotonic timestamp, oldest first
+
+        Args:
+            timestamp: time.monotonic() value to look back to
+            changed_only: Only return frames that differ from their predecessor
+
+        Returns:
+            list: Matching frames from the ring buffer
+        """
+        with self._lock:
+            frames = [frame for frame in self._buffer if frame.timestamp > timestamp]
+        if changed_only:
+            frames = [frame for frame in frames if frame.meta["changed"]]
+        return frames
+
+    def get_stats(self) -> dict:
+        """Get capture counters"""
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "running": self.is_running,
+            "fps": self.fps,
+            "frames_captured": self.frames_captured,
+            "buffered": buffered,
+        }
@@ -1,6 +1,8 @@
 import re
 from typing import List, Dict, Any
 
+from modules.search_scope import split_scope
+
 class CommandParser:
     def __init__(self):
         """Initialize the command parser with predefined patterns"""
@@ -72,7 +74,28 @@ class CommandParser:
         ]
     
     def parse_natural_language_command(self, command: str) -> List[Dict[str, Any]]:
-        """Parse natural language commands into actionable instructions"""
+        """Parse natural language commands into actionable instructions
+        
+        Click commands may end with a search scope, e.g. `click: ok in "save as"`,
+        `click ok in region toolbar` or `click ok near search`. The scope is
+        returned as a 'scope' key on the click actions.
+        """
+        command = command.lower().strip().replace('**', '').replace('`', '')
+        
+        # Split off the scope first so it isn't parsed as part of the target
+        scope = None
+        if re.match(r'(?:double.?|right.?)?click\b', command):
+            command, scope = split_scope(command)
+        
+        actions = self._parse_command(command)
+        if scope:
+            for action in actions:
+                if action.get('action') in ('click', 'double_click', 'right_click'):
+                    action['scope'] = scope
+        return actions
+    
+    def _parse_command(self, command: str) -> List[Dict[str, Any]]:
+        """Parse a single command with any search scope already removed"""
         actions = []
         command = command.lower().strip()
         
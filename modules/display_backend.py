@@ -0,0 +1,506 @@
+import os
+import shutil
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.screen_capture import CaptureBackend, Frame, MSSCaptureBackend, create_capture_backend
+
+
+class InputBackend:
+    """Base class for mouse and keyboard backends
+
+    Method names and arguments follow pyautogui so controllers can swap
+    backends without changing how they call them.
+    """
+
+    name = "base"
+
+    def size(self) -> Tuple[int, int]:
+        """Screen size as (width, height)"""
+        raise NotImplementedError
+
+    def position(self) -> Tuple[int, int]:
+        """Current mouse position"""
+        raise NotImplementedError
+
+    def set_pause(self, seconds: float):
+        """Delay inserted after every input call (0 to disable)"""
+
+    def get_pause(self) -> float:
+        """Current delay after every input call"""
+        return 0.0
+
+    def move_to(self, x: int, y: int, duration: float = 0.0):
+        raise NotImplementedError
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left"):
+        raise NotImplementedError
+
+    def scroll(self, clicks: int, x: Optional[int] = None, y: Optional[int] = None):
+        raise NotImplementedError
+
+    def type_text(self, text: str, interval: float = 0.0):
+        raise NotImplementedError
+
+    def press(self, key: str):
+        raise NotImplementedError
+
+    def hotkey(self, *keys: str):
+        raise NotImplementedError
+
+
+class PyAutoGUIInputBackend(InputBackend):
+    """Drive the real desktop through pyautogui"""
+
+    name = "pyautogui"
+
+    def __init__(self):
+        import pyautogui
+
+        self._pyautogui = pyautogui
+
+    def size(self):
+        return tuple(self._pyautogui.size())
+
+    def position(self):
+        return tuple(self._pyautogui.position())
+
+    def set_pause(self, seconds):
+        self._pyautogui.PAUSE = seconds
+
+    def get_pause(self):
+        return self._pyautogui.PAUSE
+
+    def move_to(self, x, y, duration=0.0):
+        if duration > 0:
+            self._pyautogui.moveTo(x, y, duration=duration)
+        else:
+            self._pyautogui.moveTo(x, y)
+
+    def click(self, x=None, y=None, clicks=1, button="left"):
+        self._pyautogui.click(x=x, y=y, clicks=clicks, button=button)
+
+    def scroll(self, clicks, x=None, y=None):
+        self._pyautogui.scroll(clicks, x=x, y=y)
+
+    def type_text(self, text, interval=0.0):
+        self._pyautogui.typewrite(text, interval=interval)
+
+    def press(self, key):
+        self._pyautogui.press(key)
+
+    def hotkey(self, *keys):
+        self._pyautogui.hotkey(*keys)
+
+
+# pyautogui key names that xdotool spells differently
+_XDOTOOL_KEYS = {
+    "enter": "Return", "return": "Return", "tab": "Tab", "esc": "Escape", "escape": "Escape",
+    "backspace": "BackSpace", "delete": "Delete", "del": "Delete", "space": "space",
+    "up": "Up", "down": "Down", "left": "Left", "right": "Right", "home": "Home", "end": "End",
+    "pageup": "Page_Up", "pagedown": "Page_Down", "win": "super", "winleft": "super",
+    "cmd": "super", "command": "super", "alt": "alt", "ctrl": "ctrl", "shift": "shift",
+}
+
+
+class XdotoolInputBackend(InputBackend):
+    """Send input to an X display (e.g. Xvfb) with the xdotool command"""
+
+    name = "xdotool"
+
+    def __init__(self, display: str, size: Optional[Tuple[int, int]] = None):
+        """Initialize the backend
+
+        Args:
+            display: X display name, e.g. ":99"
+            size: Screen size, queried from the display if not given
+        """
+        if shutil.which("xdotool") is None:
+            raise RuntimeError("xdotool not found. Install it with your package manager (e.g. apt install xdotool)")
+        self.display = display
+        self._env = dict(os.environ, DISPLAY=display)
+        self._size = size
+        self._pause = 0.0
+
+    def _run(self, *args) -> str:
+        result = subprocess.run(["xdotool", *args], env=self._env, capture_output=True, text=True, check=True)
+        if self._pause:
+            time.sleep(self._pause)
+        return result.stdout
+
+    @staticmethod
+    def _key_name(key: str) -> str:
+        key = key.strip()
+        return _XDOTOOL_KEYS.get(key.lower(), key)
+
+    def size(self):
+        if self._size is None:
+            width, height = self._run("getdisplaygeometry").split()
+            self._size = (int(width), int(height))
+        return self._size
+
+    def position(self):
+        values = dict(item.split(":") for item in self._run("getmouselocation").split())
+        return int(values["x"]), int(values["y"])
+
+    def set_pause(self, seconds):
+        self._pause = seconds
+
+    def get_pause(self):
+        return self._pause
+
+    def move_to(self, x, y, duration=0.0):
+        self._run("mousemove", str(int(x)), str(int(y)))
+
+    def click(self, x=None, y=None, clicks=1, button="left"):
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        button_number = {"left": "1", "middle": "2", "right": "3"}[button]
+        self._run("click", "--repeat", str(clicks), button_number)
+
+    def scroll(self, clicks, x=None, y=None):
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        # Buttons 4 and 5 are the scroll wheel; positive clicks scroll up like pyautogui
+        button_number = "4" if clicks > 0 else "5"
+        self._run("click", "--repeat", str(abs(int(clicks))), button_number)
+
+    def type_text(self, text, interval=0.0):
+        self._run("type", "--delay", str(int(interval * 1000)), text)
+
+    def press(self, key):
+        self._run("key", self._key_name(key))
+
+    def hotkey(self, *keys):
+        self._run("key", "+".join(self._key_name(key) for key in keys))
+
+
+class DisplayBackend:
+    """A screen to capture plus the input device that drives it"""
+
+    name = "base"
+
+    def __init__(self, capture: CaptureBackend, input: InputBackend):
+        self.capture = capture
+        self.input = input
+
+    def close(self):
+        """Release the capture backend (and anything the display started)"""
+        self.capture.close()
+
+
+class DesktopDisplay(DisplayBackend):
+    """The real interactive desktop: mss (or pyautogui) capture, pyautogui input"""
+
+    name = "desktop"
+
+    def __init__(self, capture_backend: str = "auto"):
+        super().__init__(create_capture_backend(capture_backend), PyAutoGUIInputBackend())
+
+
+class XvfbDisplay(DisplayBackend):
+    """A virtual X display started with Xvfb, captured with mss and driven by xdotool
+
+    Real applications can be launched on it by setting DISPLAY to
+    display_name, so workflows run unattended on Linux servers.
+    """
+
+    name = "xvfb"
+
+    def __init__(self, width: int = 1920, height: int = 1080, depth: int = 24,
+                 display_number: Optional[int] = None, timeout: float = 5.0):
+        """Start Xvfb
+
+        Args:
+            width: Screen width in pixels
+            height: Screen height in pixels
+            depth: Colour depth
+            display_number: X display number, the first free one from 99 if None
+            timeout: Seconds to wait for the server to accept connections
+        """
+        if shutil.which("Xvfb") is None:
+            raise RuntimeError("Xvfb not found. Install it with your package manager (e.g. apt install xvfb)")
+
+        if display_number is None:
+            display_number = 99
+            while os.path.exists(f"/tmp/.X11-unix/X{display_number}") or os.path.exists(f"/tmp/.X{display_number}-lock"):
+                display_number += 1
+        self.display_name = f":{display_number}"
+        self._process = subprocess.Popen(
+            ["Xvfb", self.display_name, "-screen", "0", f"{width}x{height}x{depth}", "-nolisten", "tcp"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(f"/tmp/.X11-unix/X{display_number}"):
+            if self._process.poll() is not None:
+                raise RuntimeError(f"Xvfb exited with code {self._process.returncode}")
+            if time.monotonic() > deadline:
+                self._process.terminate()
+                raise RuntimeError(f"Xvfb did not start within {timeout:.1f}s")
+            time.sleep(0.05)
+
+        super().__init__(MSSCaptureBackend(display=self.display_name),
+                         XdotoolInputBackend(self.display_name, size=(width, height)))
+
+    def close(self):
+        super().close()
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+
+
+class SyntheticWidget:
+    """A fake widget drawn on a SyntheticDisplay"""
+
+    def __init__(self, name: str, kind: str, rect: Tuple[int, int, int, int], text: str = "",
+                 color: Tuple[int, int, int] = (225, 225, 225), on_click: Optional[Callable] = None):
+        """Initialize the widget
+
+        Args:
+            name: Widget name
+            kind: "button", "textbox" or "label"
+            rect: Screen rectangle (x, y, width, height)
+            text: Caption, or the contents of a textbox
+            color: Fill colour as (B, G, R)
+            on_click: Function called with (display, widget) when clicked
+        """
+        self.name = name
+        self.kind = kind
+        self.rect = tuple(int(v) for v in rect)
+        self.text = text
+        self.color = color
+        self.on_click = on_click
+        self.visible = True
+        self.clicks = 0
+
+    def contains(self, x: int, y: int) -> bool:
+        left, top, width, height = self.rect
+        return left <= x < left + width and top <= y < top + height
+
+
+class SyntheticDisplay(DisplayBackend):
+    """An in-memory framebuffer with fake widgets, for runs without any display
+
+    Clicks hit the topmost visible widget under the pointer, typing goes
+    into the focused textbox, and the screen is redrawn after every change.
+    Each redraw produces a new array, so frames handed out earlier never
+    change underneath their holders. All input is appended to `events`.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, width: int = 1920, height: int = 1080, background: Tuple[int, int, int] = (240, 240, 240),
+                 monitors: Optional[List[Tuple[int, int, int, int]]] = None):
+        """Initialize the display
+
+        Args:
+            width: Screen width in pixels
+            height: Screen height in pixels
+            background: Desktop colour as (B, G, R)
+            monitors: Monitor rectangles (x, y, width, height) splitting the
+                screen, primary first; defaults to one monitor covering it all
+        """
+        self.width = width
+        self.height = height
+        self.background = background
+        self.monitors = list(monitors) if monitors else [(0, 0, width, height)]
+        self.widgets: List[SyntheticWidget] = []
+        self.events = []
+        self.focused = None
+        self.mouse = (width // 2, height // 2)
+        self.frames_rendered = 0
+        self._framebuffer = None
+        self._lock = threading.RLock()
+        super().__init__(SyntheticCaptureBackend(self), SyntheticInputBackend(self))
+
+    def add_widget(self, name: str, kind: str, rect, text: str = "", **kwargs) -> SyntheticWidget:
+        """Add a widget and redraw
+
+        Returns:
+            SyntheticWidget: The new widget
+        """
+        widget = SyntheticWidget(name, kind, rect, text, **kwargs)
+        with self._lock:
+            self.widgets.append(widget)
+            self.invalidate()
+        return widget
+
+    def add_button(self, name: str, rect, text: Optional[str] = None, **kwargs) -> SyntheticWidget:
+        return self.add_widget(name, "button", rect, name if text is None else text, **kwargs)
+
+    def add_textbox(self, name: str, rect, text: str = "", **kwargs) -> SyntheticWidget:
+        return self.add_widget(name, "textbox", rect, text, color=(255, 255, 255), **kwargs)
+
+    def add_label(self, name: str, rect, text: Optional[str] = None, **kwargs) -> SyntheticWidget:
+        return self.add_widget(name, "label", rect, name if text is None else text, color=self.background, **kwargs)
+
+    def get_widget(self, name: str) -> Optional[SyntheticWidget]:
+        return next((widget for widget in self.widgets if widget.name == name), None)
+
+    def widget_at(self, x: int, y: int) -> Optional[SyntheticWidget]:
+        """Topmost visible widget under a point"""
+        with self._lock:
+            for widget in reversed(self.widgets):
+                if widget.visible and widget.contains(x, y):
+                    return widget
+        return None
+
+    def invalidate(self):
+        """Mark the screen for redrawing on the next capture"""
+        self._framebuffer = None
+
+    def _render(self) -> np.ndarray:
+        """Draw the background and every visible widget into a new BGRA array"""
+        image = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        image[:, :, :3] = self.background
+        image[:, :, 3] = 255
+        for widget in self.widgets:
+            if not widget.visible:
+                continue
+            x, y, w, h = widget.rect
+            color = tuple(int(c) for c in widget.color) + (255,)
+            if widget.kind != "label":
+                cv2.rectangle(image, (x, y), (x + w - 1, y + h - 1), color, -1)
+                border = (0, 120, 215, 255) if widget is self.focused else (90, 90, 90, 255)
+                cv2.rectangle(image, (x, y), (x + w - 1, y + h - 1), border, 1)
+            if widget.text:
+                (text_w, text_h), _ = cv2.getTextSize(widget.text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+                if widget.kind == "button":
+                    origin = (x + max(2, (w - text_w) // 2), y + (h + text_h) // 2)
+                else:
+                    origin = (x + 4, y + (h + text_h) // 2)
+                cv2.putText(image, widget.text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0, 255), 1, cv2.LINE_AA)
+        self.frames_rendered += 1
+        return image
+
+    def framebuffer(self) -> np.ndarray:
+        """Current screen contents as a BGRA array (do not modify)"""
+        with self._lock:
+            if self._framebuffer is None:
+                self._framebuffer = self._render()
+            return self._framebuffer
+
+    def _record(self, *event):
+        self.events.append((time.monotonic(),) + event)
+
+    def _click(self, x: int, y: int, clicks: int, button: str):
+        with self._lock:
+            self.mouse = (int(x), int(y))
+            self._record("click", self.mouse, clicks, button)
+            widget = self.widget_at(x, y)
+            if widget is None:
+                return
+            widget.clicks += clicks
+            if widget.kind == "textbox":
+                self.focused = widget
+            if callable(widget.on_click):
+                widget.on_click(self, widget)
+            self.invalidate()
+
+    def _type(self, text: str):
+        with self._lock:
+            self._record("type", text)
+            if self.focused is not None:
+                self.focused.text += text
+                self.invalidate()
+
+    def _key(self, keys: Tuple[str, ...]):
+        with self._lock:
+            self._record("key", "+".join(keys))
+            if keys == ("backspace",) and self.focused is not None and self.focused.text:
+                self.focused.text = self.focused.text[:-1]
+                self.invalidate()
+            elif keys == ("tab",):
+                # Move focus to the next textbox
+                textboxes = [w for w in self.widgets if w.kind == "textbox" and w.visible]
+                if textboxes:
+                    index = textboxes.index(self.focused) + 1 if self.focused in textboxes else 0
+                    self.focused = textboxes[index % len(textboxes)]
+                    self.invalidate()
+
+
+class SyntheticCaptureBackend(CaptureBackend):
+    """Capture backend reading a SyntheticDisplay's framebuffer"""
+
+    name = "synthetic"
+
+    def __init__(self, display: SyntheticDisplay):
+        self.display = display
+
+    def grab(self, region=None) -> Frame:
+        frame = Frame(self.display.framebuffer(), "BGRA")
+        # Like mss, a full-screen grab is the primary monitor
+        return frame.crop(region or self.display.monitors[0])
+
+    def monitors(self):
+        return list(self.display.monitors)
+
+
+class SyntheticInputBackend(InputBackend):
+    """Input backend delivering events to a SyntheticDisplay"""
+
+    name = "synthetic"
+
+    def __init__(self, display: SyntheticDisplay):
+        self.display = display
+
+    def size(self):
+        return (self.display.width, self.display.height)
+
+    def position(self):
+        return self.display.mouse
+
+    def move_to(self, x, y, duration=0.0):
+        self.display.mouse = (int(x), int(y))
+
+    def click(self, x=None, y=None, clicks=1, button="left"):
+        if x is None or y is None:
+            x, y = self.display.mouse
+        self.display._click(x, y, clicks, button)
+
+    def scroll(self, clicks, x=None, y=None):
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        self.display._record("scroll", self.display.mouse, int(clicks))
+
+    def type_text(self, text, interval=0.0):
+        self.display._type(text)
+
+    def press(self, key):
+        self.display._key((key.lower(),))
+
+    def hotkey(self, *keys):
+        self.display._key(tuple(key.lower() for key in keys))
+
+
+DISPLAY_BACKENDS = {
+    "desktop": DesktopDisplay,
+    "xvfb": XvfbDisplay,
+    "synthetic": SyntheticDisplay,
+}
+
+
+def create_display_backend(name: Optional[str] = None, **kwargs) -> DisplayBackend:
+    """Create a display backend by name
+
+    Args:
+        name: "desktop", "xvfb" or "synthetic"; defaults to the
+            AUTOMATION_DISPLAY environment variable, else "desktop"
+        **kwargs: Extra arguments for the backend constructor
+
+    Returns:
+        DisplayBackend: The display backend
+    """
+    if name is None:
+        name = os.environ.get("AUTOMATION_DISPLAY", "desktop")
+    if name not in DISPLAY_BACKENDS:
+        raise ValueError(f"Unknown display backend: {name}")
+    return DISPLAY_BACKENDS[name](**kwargs)
@@ -0,0 +1,214 @@
+import os
+import threading
+import zlib
+
+import cv2
+import numpy as np
+
+FEATURE_FILE_VERSION = 1  # Bump when detector settings change, so saved keypoints are recomputed
+
+
+def feature_file(template_path: str, matcher_name: str) -> str:
+    """Path of the saved keypoints of a template image, next to the image"""
+    return f"{template_path}.{matcher_name}.npz"
+
+
+class FeatureMatcher:
+    """Find templates by keypoint matching instead of pixel correlation
+
+    Keypoint descriptors survive scaling (and small rotations), so an
+    element captured at 100% display scaling is still found at 125% or
+    150%, where template matching fails. Descriptors are computed once
+    per template (kept on the Template in the store, and saved next to
+    the image file so the next run loads them) and once per frame (kept in
+    the frame's meta dict), so matching several elements against one
+    capture only runs the detector on the screen once.
+    """
+
+    name = "base"
+
+    def __init__(self, ratio: float = 0.75, min_inliers: int = 8):
+        """Initialize the matcher
+
+        Args:
+            ratio: Lowe ratio test threshold for descriptor matches
+            min_inliers: Matches consistent with one placement needed to accept
+        """
+        self.ratio = ratio
+        self.min_inliers = min_inliers
+        self._lock = threading.Lock()
+        self._matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+
+    def _create_detector(self, for_template: bool):
+        """Create the OpenCV feature detector"""
+        raise NotImplementedError
+
+    def _detect(self, gray: np.ndarray, for_template: bool, mask: np.ndarray = None):
+        """Detect keypoints and compute descriptors on a grayscale image"""
+        detector = self._create_detector(for_template)
+        keypoints, descriptors = detector.detectAndCompute(gray, mask)
+        return keypoints, descriptors
+
+    def template_features(self, template):
+        """Get (points, descriptors) of a Template, computing them once
+
+        Small UI images have few corners away from their border, so the
+        template is padded before detection and the keypoints shifted back.
+        """
+        features = template.features.get(self.name)
+        if features is None:
+            features = self._load_features(template)
+        if features is None:
+            pad = 16
+            padded = cv2.copyMakeBorder(template.gray, pad, pad, pad, pad, cv2.BORDER_REPLICATE)
+            mask = None
+            if template.mask is not None:
+                # Skip keypoints on the masked-out background
+                mask = cv2.copyMakeBorder(template.mask, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=0)
+            keypoints, descriptors = self._detect(padded, for_template=True, mask=mask)
+            points = np.float32([kp.pt for kp in keypoints]).reshape(-1, 2) - pad
+            features = (points, descriptors)
+            self._save_features(template, features)
+        template.features[self.name] = features
+        return features
+
+    @staticmethod
+    def _mask_crc(template) -> int:
+        return zlib.crc32(np.ascontiguousarray(template.mask)) if template.mask is not None else -1
+
+    def _load_features(self, template):
+        """Read keypoints saved for the same image file, mask and detector settings"""
+        if template.scale != 1.0:
+            return None  # Only the image as stored on disk is saved
+        path = feature_file(template.path, self.name)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if (int(data["version"]) != FEATURE_FILE_VERSION or float(data["mtime"]) != template.mtime
+                        or int(data["mask_crc"]) != self._mask_crc(template)):
+                    return None
+                descriptors = data["descriptors"] if bool(data["has_descriptors"]) else None
+                return data["points"], descriptors
+        except Exception as e:
+            print(f"Ignoring unreadable keypoint file {path}: {str(e)}")
+            return None
+
+    def _save_features(self, template, features):
+        """Save keypoints next to the image file, keyed by its modification time"""
+        if template.scale != 1.0:
+            return
+        points, descriptors = features
+        path = feature_file(template.path, self.name)
+        try:
+            with open(path, "wb") as f:
+                np.savez(f, version=FEATURE_FILE_VERSION, mtime=template.mtime,
+                         mask_crc=self._mask_crc(template), points=points,
+                         has_descriptors=descriptors is not None,
+                         descriptors=descriptors if descriptors is not None else np.zeros((0, 0), np.uint8))
+        except OSError as e:
+            print(f"Could not save keypoints to {path}: {str(e)}")
+
+    def frame_features(self, frame):
+        """Get (points, descriptors) of a Frame, computing them once per frame"""
+        key = f"features_{self.name}"
+        with self._lock:
+            features = frame.meta.get(key)
+            if features is None:
+                keypoints, descriptors = self._detect(frame.to_gray(), for_template=False)
+                points = np.float32([kp.pt for kp in keypoints]).reshape(-1, 2)
+                features = (points, descriptors)
+                frame.meta[key] = features
+        return features
+
+    def locate(self, frame, template, threshold: float = 0.0):
+        """Find a Template in a Frame by matching keypoints
+
+        Args:
+            frame: Frame (or cropped region of one) to search
+            template: Template from the TemplateStore
+            threshold: Minimum inlier ratio (inliers / good matches) to accept
+
+        Returns:
+            tuple: (score, (x, y, width, height)) in screen coordinates, or
+                None. The box is the template's outline under the estimated
+                scale and offset, so its size follows the on-screen size.
+        """
+        template_points, template_descriptors = self.template_features(template)
+        frame_points, frame_descriptors = self.frame_features(frame)
+        if template_descriptors is None or frame_descriptors is None:
+            return None
+        if len(template_descriptors) < self.min_inliers or len(frame_descriptors) < 2:
+            return None
+
+        good = []
+        for pair in self._matcher.knnMatch(template_descriptors, frame_descriptors, k=2):
+            if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance:
+                good.append(pair[0])
+        if len(good) < self.min_inliers:
+            return None
+
+        source = template_points[[m.queryIdx for m in good]]
+        target = frame_points[[m.trainIdx for m in good]]
+        # Scale, rotation and translation only - UI elements don't shear
+        transform, inliers = cv2.estimateAffinePartial2D(source, target, method=cv2.RANSAC,
+                                                         ransacReprojThreshold=3.0)
+        if transform is None or int(inliers.sum()) < self.min_inliers:
+            return None
+        score = float(inliers.sum()) / len(good)
+        if score < threshold:
+            return None
+
+        corners = np.float32([[0, 0], [template.width, 0], [template.width, template.height],
+                              [0, template.height]]).reshape(-1, 1, 2)
+        outline = cv2.transform(corners, transform).reshape(-1, 2)
+        x, y = outline.min(axis=0)
+        right, bottom = outline.max(axis=0)
+        return score, (int(round(x)) + frame.left, int(round(y)) + frame.top,
+                       int(round(right - x)), int(round(bottom - y)))
+
+
+class ORBMatcher(FeatureMatcher):
+    """ORB keypoints: fast, good enough for most icons and buttons"""
+
+    name = "orb"
+
+    def _create_detector(self, for_template: bool):
+        # Smaller patches than the defaults so small icons still get keypoints
+        return cv2.ORB_create(nfeatures=500 if for_template else 10000, edgeThreshold=15,
+                              patchSize=15, fastThreshold=10)
+
+
+class AKAZEMatcher(FeatureMatcher):
+    """AKAZE keypoints: slower than ORB, more robust to large scale changes"""
+
+    name = "akaze"
+
+    def _create_detector(self, for_template: bool):
+        create = getattr(cv2, "AKAZE_create", None)
+        if create is None:
+            raise RuntimeError("AKAZE is not available in this OpenCV build")
+        return create(threshold=0.0005)
+
+
+FEATURE_MATCHERS = {
+    "orb": ORBMatcher,
+    "akaze": AKAZEMatcher,
+}
+
+MATCHERS = ("template",) + tuple(FEATURE_MATCHERS)  # Valid per-element "matcher" settings
+
+
+def create_feature_matcher(name: str, **kwargs) -> FeatureMatcher:
+    """Create a feature matcher by name
+
+    Args:
+        name: "orb" or "akaze"
+        **kwargs: Extra arguments for the matcher constructor
+
+    Returns:
+        FeatureMatcher: The matcher
+    """
+    if name not in FEATURE_MATCHERS:
+        raise ValueError(f"Unknown feature matcher: {name}")
+    return FEATURE_MATCHERS[name](**kwargs)
@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Callable, Optional
+
+
+class FrameCache:
+    """Share one captured screen frame between all consumers of a step
+
+    Template matching, OCR, step logging and AI uploads within a step ask
+    the cache for a frame instead of capturing the screen themselves. The
+    first request captures; later requests get the same frame back until
+    the cache is invalidated, which bumps the generation counter. Input
+    actions invalidate the cache because they are what changes the screen.
+
+    On multi-monitor setups each monitor is captured and cached on its
+    own, so a lookup on one screen doesn't pay for grabbing the others.
+    """
+
+    def __init__(self, grab: Callable, max_age: Optional[float] = None, source: Optional[Callable] = None):
+        """Initialize the frame cache
+
+        Args:
+            grab: Function taking a region and returning a full-screen Frame
+            max_age: Seconds after which a cached frame is recaptured even
+                without invalidation (None to keep it until invalidated)
+            source: Optional function taking a monotonic time and returning a
+                frame captured elsewhere since then (or None); tried before
+                grab on a miss, e.g. a continuous capture thread
+        """
+        self._grab = grab
+        self.source = source
+        self.max_age = max_age
+        self.generation = 0
+        self.invalidated_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.source_hits = 0
+        self._frame = None  # Default (primary) screen
+        self._monitor_frames = {}  # Other monitors by (x, y, width, height)
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, frame) -> bool:
+        """Check whether a cached frame can still be handed out"""
+        if frame is None:
+            return False
+        if self.max_age is None:
+            return True
+        return time.monotonic() - frame.timestamp <= self.max_age
+
+    def get(self, region=None, fresh: bool = False, monitor=None):
+        """Get the frame for the current generation, capturing it if needed
+
+        Args:
+            region: Region to return (x, y, width, height), cropped from the
+                cached full-screen frame without copying
+            fresh: Force a new capture even if a cached frame is available
+            monitor: Monitor rectangle (x, y, width, height) to capture
+                instead of the default screen
+
+        Returns:
+            Frame: The cached frame (or a view of it) or None if capture failed
+        """
+        if monitor is not None:
+            return self._get_monitor(tuple(monitor), region, fresh)
+
+        with self._lock:
+            frame = self._frame
+            if fresh or not self._is_fresh(frame):
+                frame = None
+                if not fresh and self.source is not None:
+                    # A frame captured after the last invalidation is as good as a new one
+                    frame = self.source(self.invalidated_at)
+                    if not self._is_fresh(frame):
+                        frame = None
+                if frame is not None:
+                    self.source_hits += 1
+                else:
+                    frame = self._grab(None)
+                    self.misses += 1
+                self._frame = frame
+            else:
+                self.hits += 1
+
+        if frame is None:
+            return None
+        return frame.crop(region) if region else frame
+
+    def _get_monitor(self, monitor, region, fresh):
+        """Like get() for a monitor other than the default screen"""
+        with self._lock:
+            frame = self._monitor_frames.get(monitor)
+            if fresh or not self._is_fresh(frame):
+                frame = self._grab(monitor)
+                self.misses += 1
+                self._monitor_frames[monitor] = frame
+            else:
+                self.hits += 1
+
+        if frame is None:
+            return None
+        return frame.crop(region) if region else frame
+
+    def peek(self):
+        """Return the cached frame without capturing, or None"""
+        with self._lock:
+            return self._frame if self._is_fresh(self._frame) else None
+
+    def put(self, frame):
+        """Store a frame captured elsewhere as the current generation's frame"""
+        with self._lock:
+            self._frame = frame
+
+    def invalidate(self) -> int:
+        """Drop the cached frame and start a new generation
+
+        Returns:
+            int: The new generation number
+        """
+        with self._lock:
+            self.generation += 1
+            self.invalidated_at = time.monotonic()
+            self._frame = None
+            self._monitor_frames.clear()
+            return self.generation
+
+    def get_stats(self) -> dict:
+        """Get cache hit/miss counters"""
+        total = self.hits + self.misses + self.source_hits
+        return {
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "source_hits": self.source_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,116 @@
+from typing import Dict, List, Sequence, Set, Tuple
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Edit distance between a and b, giving up past limit
+
+    Counts insertions, deletions, substitutions and swaps of adjacent
+    characters ("Cancle" -> "Cancel" is one edit). Only the diagonal band
+    of width 2 * limit + 1 is computed, and the scan stops as soon as every
+    cell of a row exceeds limit.
+
+    Returns:
+        int: The distance, or limit + 1 if it is larger than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    before = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        char = a[i - 1]
+        row_min = current[0]
+        for j in range(low, high + 1):
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != b[j - 1]))
+            if i > 1 and j > 1 and char == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, before[j - 2] + 1)
+            current[j] = value if value <= limit else over
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        before, previous = previous, current
+    return previous[len(b)]
+
+
+def _grams(text: str, n: int) -> Set[str]:
+    """Character n-grams of a word, padded so short words still have some"""
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class FuzzyTextMatcher:
+    """Approximate phrase search over lines of OCR words
+
+    Words are indexed by character n-gram, so a query only looks at words
+    sharing n-grams with one of its own words instead of scoring every
+    word on the screen. Candidate spans of consecutive words around those
+    hits (one word fewer to one word more than the query) are scored by
+    edit distance against the whole query, bounded by the score needed to
+    qualify. That also finds multi-word labels read with OCR mistakes,
+    e.g. "Save as PDF" read as "Save as PDE".
+    """
+
+    def __init__(self, lines: Sequence[Sequence[str]], n: int = 3):
+        """Index the words
+
+        Args:
+            lines: Normalized words of each line, left to right
+            n: n-gram length
+        """
+        self.n = n
+        self.lines = [list(words) for words in lines]
+        self._grams: Dict[str, List[Tuple[int, int]]] = {}  # n-gram -> (line, position) of words
+        for line_number, words in enumerate(self.lines):
+            for position, word in enumerate(words):
+                for gram in _grams(word, n):
+                    self._grams.setdefault(gram, []).append((line_number, position))
+
+    def match(self, query: Sequence[str], min_score: float = 0.7, limit: int = 5) -> List[Tuple[float, int, int, int]]:
+        """Find spans of words similar to a query
+
+        Args:
+            query: Normalized query words
+            min_score: Lowest similarity kept (1 - edit distance / length)
+            limit: Most candidates returned
+
+        Returns:
+            list: (score, line, start, end) tuples, best first; the span is
+                lines[line][start:end]
+        """
+        query = [word for word in query if word]
+        if not query:
+            return []
+        target = " ".join(query)
+        hits = set()
+        for word in query:
+            for gram in _grams(word, self.n):
+                hits.update(self._grams.get(gram, ()))
+
+        count = len(query)
+        spans = set()
+        for line_number, position in hits:
+            length = len(self.lines[line_number])
+            for size in range(max(1, count - 1), count + 2):
+                for start in range(position - size + 1, position + 1):
+                    if start >= 0 and start + size <= length:
+                        spans.add((line_number, start, start + size))
+
+        results = []
+        for line_number, start, end in spans:
+            text = " ".join(self.lines[line_number][start:end])
+            longest = max(len(text), len(target))
+            bound = int((1.0 - min_score) * longest)
+            distance = bounded_edit_distance(target, text, bound)
+            if distance <= bound:
+                results.append((1.0 - distance / longest, line_number, start, end))
+        # Best score first; among equals the shorter span, then reading order
+        results.sort(key=lambda result: (-result[0], result[3] - result[2], result[1], result[2]))
+        return results[:limit]
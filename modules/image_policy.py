@@ -0,0 +1,165 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+
+class ImagePolicy:
+    """How screenshots are encoded when they are written to disk
+
+    A policy chooses the file format and its compression setting, an
+    optional maximum dimension (larger frames are downscaled) and whether
+    to store grayscale only. The controller keeps separate policies for
+    debug step logs and for images uploaded to the AI model.
+    """
+
+    FORMATS = ("png", "webp", "jpeg", "npy")
+    EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg", "npy": ".npy"}
+
+    def __init__(self, format: str = "png", compress_level: int = 6, quality: int = 85,
+                 max_dimension=None, grayscale: bool = False):
+        """Initialize the policy
+
+        Args:
+            format: "png", "webp", "jpeg" or "npy" (raw NumPy array)
+            compress_level: PNG zlib level, 0 (fastest) to 9 (smallest)
+            quality: JPEG/WebP quality, 1 to 100 (WebP uses 100 as lossless)
+            max_dimension: Downscale so neither side exceeds this many pixels
+            grayscale: Store a single luminance channel
+        """
+        format = format.lower()
+        if format == "jpg":
+            format = "jpeg"
+        if format not in self.FORMATS:
+            raise ValueError(f"Unknown image format: {format}")
+
+        self.format = format
+        self.compress_level = int(compress_level)
+        self.quality = int(quality)
+        self.max_dimension = int(max_dimension) if max_dimension else None
+        self.grayscale = bool(grayscale)
+
+    @property
+    def extension(self) -> str:
+        """File extension including the dot"""
+        return self.EXTENSIONS[self.format]
+
+    def to_dict(self) -> dict:
+        """Get the policy settings as a dictionary"""
+        return {
+            "format": self.format,
+            "compress_level": self.compress_level,
+            "quality": self.quality,
+            "max_dimension": self.max_dimension,
+            "grayscale": self.grayscale,
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, ImagePolicy) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"ImagePolicy({self.to_dict()})"
+
+    def prepare(self, source, scale: float = 1.0) -> np.ndarray:
+        """Convert a frame or PIL image to the array that will be stored
+
+        Args:
+            source: Frame or PIL image
+            scale: Extra downscale factor on top of max_dimension
+
+        Returns:
+            np.ndarray: RGB (or grayscale) array
+        """
+        if isinstance(source, Image.Image):
+            image = source.convert("L" if self.grayscale else "RGB")
+            array = np.asarray(image)
+        elif self.grayscale:
+            array = source.to_gray()
+        else:
+            array = source.to_rgb()
+
+        height, width = array.shape[:2]
+        if self.max_dimension and max(width, height) > self.max_dimension:
+            scale *= self.max_dimension / max(width, height)
+        if scale < 1.0:
+            import cv2
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            array = cv2.resize(array, size, interpolation=cv2.INTER_AREA)
+        return array
+
+    def write(self, array: np.ndarray, fp):
+        """Encode a prepared array into a file path or file object"""
+        if self.format == "npy":
+            np.save(fp, array)
+            return
+
+        image = Image.fromarray(array)
+        if self.format == "png":
+            image.save(fp, format="PNG", compress_level=self.compress_level)
+        elif self.format == "jpeg":
+            image.save(fp, format="JPEG", quality=self.quality)
+        else:
+            image.save(fp, format="WEBP", quality=self.quality, lossless=self.quality >= 100)
+
+    def encode(self, source, scale: float = 1.0) -> bytes:
+        """Encode a frame or PIL image to bytes in this policy's format"""
+        buffer = io.BytesIO()
+        self.write(self.prepare(source, scale), buffer)
+        return buffer.getvalue()
+
+    def save(self, source, filepath: str, scale: float = 1.0):
+        """Encode a frame or PIL image and write it to filepath"""
+        array = self.prepare(source, scale)
+        with open(filepath, "wb") as f:
+            self.write(array, f)
+
+
+_session_readers = {}
+
+
+def _get_session_reader(recording_path: str):
+    """Get a cached SessionReader for a recording file"""
+    from modules.session_recorder import SessionReader
+
+    reader = _session_readers.get(recording_path)
+    if reader is None:
+        reader = SessionReader(recording_path)
+        _session_readers[recording_path] = reader
+    return reader
+
+
+def step_image_exists(image_path: str) -> bool:
+    """Check whether a step screenshot path (file or recording reference) exists"""
+    if not image_path:
+        return False
+    from modules.session_recorder import parse_step_reference
+
+    reference = parse_step_reference(image_path)
+    if reference:
+        return os.path.exists(reference[0])
+    return os.path.exists(image_path)
+
+
+def load_step_image(image_path: str) -> Image.Image:
+    """Open a step screenshot written with any ImagePolicy format
+
+    Args:
+        image_path: Path to the screenshot, or a "recording.bin#number"
+            reference into a delta-encoded session recording
+
+    Returns:
+        Image.Image: The screenshot as a PIL image
+    """
+    from modules.session_recorder import parse_step_reference
+
+    reference = parse_step_reference(image_path)
+    if reference:
+        recording_path, number = reference
+        image = _get_session_reader(recording_path).get_image(number)
+        if image is None:
+            raise FileNotFoundError(f"Record {number} not found in recording: {recording_path}")
+        return image
+    if os.path.splitext(image_path)[1].lower() == ".npy":
+        return Image.fromarray(np.load(image_path))
+    return Image.open(image_path)
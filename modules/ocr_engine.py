@@ -0,0 +1,466 @@
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+# Columns of Tesseract's TSV output, as returned by pytesseract.image_to_data
+TSV_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+               "left", "top", "width", "height", "conf", "text")
+
+
+def parse_config(config: str) -> dict:
+    """Split a tesseract command-line config into engine options
+
+    Understands --psm, --oem, --dpi, -l and -c name=value; anything else
+    is ignored (it only matters to the tesseract executable).
+    """
+    options = {"psm": 3, "oem": 3, "dpi": 70, "lang": None, "variables": ()}
+    variables = []
+    tokens = shlex.split(config or "")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token in ("--psm", "--oem", "--dpi") and value is not None:
+            options[token[2:]] = int(value)
+            i += 1
+        elif token == "-l" and value is not None:
+            options["lang"] = value
+            i += 1
+        elif token == "-c" and value is not None and "=" in value:
+            variables.append(tuple(value.split("=", 1)))
+            i += 1
+        i += 1
+    options["variables"] = tuple(sorted(variables))
+    return options
+
+
+def tsv_to_dict(tsv: str) -> Dict[str, list]:
+    """Parse TSV rows (without a header) into pytesseract's Output.DICT layout"""
+    result = {column: [] for column in TSV_COLUMNS}
+    for line in tsv.splitlines():
+        cells = line.split("\t")
+        if len(cells) < len(TSV_COLUMNS) - 1:
+            continue
+        if len(cells) < len(TSV_COLUMNS):
+            cells.append("")  # Rows without text end early
+        for column, cell in zip(TSV_COLUMNS[:-1], cells):
+            try:
+                result[column].append(int(float(cell)))
+            except ValueError:
+                result[column].append(cell)
+        result["text"].append(cells[len(TSV_COLUMNS) - 1])
+    return result
+
+
+def as_ocr_array(image) -> np.ndarray:
+    """Convert a PIL image or array to a contiguous 8-bit gray/RGB/RGBA array"""
+    if not isinstance(image, np.ndarray):
+        if image.mode not in ("L", "RGB", "RGBA"):
+            image = image.convert("L" if image.mode in ("1", "P", "I", "F") else "RGB")
+        image = np.asarray(image)
+    if image.dtype != np.uint8:
+        image = np.clip(image, 0, 255).astype(np.uint8)
+    if image.ndim == 3 and image.shape[2] == 1:
+        image = image[:, :, 0]
+    return np.ascontiguousarray(image)
+
+
+class OCRCache:
+    """LRU cache of OCR results keyed by the exact pixels and config
+
+    Several lookups on a screen that hasn't changed (e.g. consecutive
+    click commands on labels of one dialog) OCR identical pixels; the
+    cache answers those without running Tesseract. Keys hash the whole
+    (preprocessed) image, so a single changed character is a miss.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        """Initialize the cache
+
+        Args:
+            max_entries: Most results kept
+            max_bytes: Approximate memory cap for the cached results
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.saved_time = 0.0  # OCR seconds the hits didn't have to spend
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (result, size, seconds it took)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind: str, array: np.ndarray, config: str, lang: str) -> tuple:
+        """Cache key for one OCR call"""
+        digest = hashlib.blake2b(array.data, digest_size=16).digest()
+        return (kind, digest, array.shape, config, lang)
+
+    def get(self, key: tuple):
+        """Get a cached result (None on a miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_time += entry[2]
+            return entry[0]
+
+    def put(self, key: tuple, result, seconds: float):
+        """Store a result, evicting the least recently used ones over the caps"""
+        size = _result_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (result, size, seconds)
+            self.bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def clear(self):
+        """Forget every result"""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counters, time saved and memory used"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_ms": self.saved_time * 1000,
+            }
+
+
+def _result_size(result) -> int:
+    """Rough memory footprint of an OCR result in bytes"""
+    if isinstance(result, str):
+        return 50 + len(result)
+    rows = len(result.get("text", ()))
+    return 200 + rows * (len(TSV_COLUMNS) * 36) + sum(len(text) for text in result.get("text", ()))
+
+
+class _Handle:
+    """One initialized Tesseract API instance and the lock that guards it"""
+
+    def __init__(self, api):
+        self.api = api
+        self.lock = threading.Lock()
+
+
+class OCREngine:
+    """Tesseract kept loaded in-process, with pytesseract's call interface
+
+    pytesseract writes each image to a temporary file and starts a new
+    tesseract process, which loads the language data again every call.
+    Engines keep an initialized Tesseract API for each language/config
+    combination and reuse it, so a call costs only the recognition itself.
+    image_to_data returns the same dict as pytesseract.image_to_data with
+    Output.DICT, so existing word-box code works unchanged. Results are
+    kept in an OCRCache, so OCR of pixels seen before is free.
+    """
+
+    name = "base"
+
+    def __init__(self, lang: str = "eng", cache: Optional[OCRCache] = None):
+        """Initialize the engine (APIs are created on first use)
+
+        Args:
+            lang: Default Tesseract language(s), e.g. "eng" or "eng+deu"
+            cache: Result cache; a default-sized one if None
+        """
+        self.lang = lang
+        self.cache = cache if cache is not None else OCRCache()
+        self.calls = 0
+        self.total_time = 0.0
+        self._handles: Dict[tuple, _Handle] = {}
+        self._lock = threading.Lock()
+
+    def _create_api(self, lang: str, oem: int, variables: tuple):
+        """Create and initialize a Tesseract API instance"""
+        raise NotImplementedError
+
+    def _recognize(self, api, array: np.ndarray, options: dict, tsv: bool) -> str:
+        """Recognize an image, returning TSV rows (tsv=True) or plain text"""
+        raise NotImplementedError
+
+    def _delete_api(self, api):
+        """Release a Tesseract API instance"""
+
+    def _handle(self, options: dict) -> _Handle:
+        """Get the API instance for a language/engine mode/variables combination"""
+        key = (options["lang"] or self.lang, options["oem"], options["variables"])
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is None:
+                handle = _Handle(self._create_api(*key))
+                self._handles[key] = handle
+        return handle
+
+    def _ocr(self, array: np.ndarray, config: str, tsv: bool) -> str:
+        """Recognize an image with the handle for its config"""
+        options = parse_config(config)
+        handle = self._handle(options)
+        with handle.lock:
+            return self._recognize(handle.api, array, options, tsv)
+
+    def _data(self, array: np.ndarray, config: str) -> Dict[str, list]:
+        """Uncached image_to_data"""
+        return tsv_to_dict(self._ocr(array, config, tsv=True))
+
+    def _string(self, array: np.ndarray, config: str) -> str:
+        """Uncached image_to_string"""
+        return self._ocr(array, config, tsv=False)
+
+    def _cached(self, kind: str, image, config: str, compute: Callable):
+        """Run compute(array, config), or return the cached result for these pixels"""
+        array = as_ocr_array(image)
+        key = None
+        if self.cache is not None:
+            key = OCRCache.key(kind, array, config, self.lang)
+            result = self.cache.get(key)
+            if result is not None:
+                return result
+        start = time.perf_counter()
+        result = compute(array, config)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.total_time += elapsed
+        if key is not None:
+            self.cache.put(key, result, elapsed)
+        return result
+
+    def image_to_data(self, image, config: str = "") -> Dict[str, list]:
+        """Word boxes of an image, like pytesseract.image_to_data(output_type=Output.DICT)
+
+        Args:
+            image: PIL image or array (gray, RGB or RGBA)
+            config: Tesseract options, e.g. "--oem 3 --psm 11"
+
+        Returns:
+            dict: Lists keyed by level, page_num, block_num, par_num,
+                line_num, word_num, left, top, width, height, conf, text
+        """
+        data = self._cached("data", image, config, self._data)
+        # Copies, so callers can't change the cached result
+        return {column: list(values) for column, values in data.items()}
+
+    def image_to_string(self, image, config: str = "") -> str:
+        """Text of an image, like pytesseract.image_to_string"""
+        return self._cached("string", image, config, self._string)
+
+    def close(self):
+        """Release every loaded Tesseract API"""
+        with self._lock:
+            handles, self._handles = list(self._handles.values()), {}
+        for handle in handles:
+            with handle.lock:
+                self._delete_api(handle.api)
+
+    def get_stats(self) -> dict:
+        """Get call counters and the result cache's hit rate and saved time"""
+        with self._lock:
+            stats = {
+                "engine": self.name,
+                "loaded": len(self._handles),
+                "calls": self.calls,
+                "mean_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+            }
+        stats["cache"] = self.cache.get_stats() if self.cache is not None else None
+        return stats
+
+
+class TesserocrEngine(OCREngine):
+    """Tesseract through the tesserocr bindings"""
+
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", cache: Optional[OCRCache] = None):
+        import tesserocr
+        self._tesserocr = tesserocr
+        super().__init__(lang, cache)
+
+    def _create_api(self, lang, oem, variables):
+        api = self._tesserocr.PyTessBaseAPI(lang=lang, oem=self._tesserocr.OEM(oem))
+        for name, value in variables:
+            api.SetVariable(name, value)
+        return api
+
+    def _recognize(self, api, array, options, tsv):
+        height, width = array.shape[:2]
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        api.SetPageSegMode(self._tesserocr.PSM(options["psm"]))
+        api.SetImageBytes(array.tobytes(), width, height, channels, width * channels)
+        api.SetSourceResolution(options["dpi"])
+        api.Recognize()
+        return api.GetTSVText(0) if tsv else api.GetUTF8Text()
+
+    def _delete_api(self, api):
+        api.End()
+
+
+class TesseractCAPIEngine(OCREngine):
+    """Tesseract through its C API (libtesseract), loaded with ctypes"""
+
+    name = "capi"
+
+    def __init__(self, lang: str = "eng", cache: Optional[OCRCache] = None, library: Optional[str] = None,
+                 datapath: Optional[str] = None):
+        """Load libtesseract
+
+        Args:
+            lang: Default Tesseract language(s)
+            cache: Result cache; a default-sized one if None
+            library: Path of the shared library; found automatically if None
+            datapath: tessdata directory; Tesseract's default if None
+        """
+        path = library or ctypes.util.find_library("tesseract")
+        if not path:
+            raise ImportError("libtesseract not found")
+        lib = ctypes.CDLL(path)
+        handle, text = ctypes.c_void_p, ctypes.c_char_p
+        signatures = {
+            "TessBaseAPICreate": ([], handle),
+            "TessBaseAPIInit2": ([handle, text, text, ctypes.c_int], ctypes.c_int),
+            "TessBaseAPISetVariable": ([handle, text, text], ctypes.c_int),
+            "TessBaseAPISetPageSegMode": ([handle, ctypes.c_int], None),
+            "TessBaseAPISetImage": ([handle, ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                                     ctypes.c_int], None),
+            "TessBaseAPISetSourceResolution": ([handle, ctypes.c_int], None),
+            "TessBaseAPIRecognize": ([handle, ctypes.c_void_p], ctypes.c_int),
+            # Returned strings are freed with TessDeleteText, so keep them as raw pointers
+            "TessBaseAPIGetTsvText": ([handle, ctypes.c_int], ctypes.c_void_p),
+            "TessBaseAPIGetUTF8Text": ([handle], ctypes.c_void_p),
+            "TessDeleteText": ([ctypes.c_void_p], None),
+            "TessBaseAPIEnd": ([handle], None),
+            "TessBaseAPIDelete": ([handle], None),
+        }
+        for function, (argtypes, restype) in signatures.items():
+            getattr(lib, function).argtypes = argtypes
+            getattr(lib, function).restype = restype
+        self._lib = lib
+        self.datapath = datapath
+        super().__init__(lang, cache)
+
+    def _create_api(self, lang, oem, variables):
+        api = self._lib.TessBaseAPICreate()
+        datapath = self.datapath.encode() if self.datapath else None
+        if self._lib.TessBaseAPIInit2(api, datapath, lang.encode(), oem) != 0:
+            self._lib.TessBaseAPIDelete(api)
+            raise RuntimeError(f"Could not initialize Tesseract for language '{lang}'")
+        for name, value in variables:
+            self._lib.TessBaseAPISetVariable(api, name.encode(), value.encode())
+        return api
+
+    def _recognize(self, api, array, options, tsv):
+        height, width = array.shape[:2]
+        channels = 1 if array.ndim == 2 else array.shape[2]
+        lib = self._lib
+        lib.TessBaseAPISetPageSegMode(api, options["psm"])
+        lib.TessBaseAPISetImage(api, array.ctypes.data, width, height, channels, array.strides[0])
+        lib.TessBaseAPISetSourceResolution(api, options["dpi"])
+        if lib.TessBaseAPIRecognize(api, None) != 0:
+            raise RuntimeError("Tesseract recognition failed")
+        pointer = lib.TessBaseAPIGetTsvText(api, 0) if tsv else lib.TessBaseAPIGetUTF8Text(api)
+        if not pointer:
+            return ""
+        try:
+            return ctypes.string_at(pointer).decode("utf-8", errors="replace")
+        finally:
+            lib.TessDeleteText(pointer)
+
+    def _delete_api(self, api):
+        self._lib.TessBaseAPIEnd(api)
+        self._lib.TessBaseAPIDelete(api)
+
+
+class PytesseractEngine(OCREngine):
+    """pytesseract fallback: one tesseract process per call, same interface"""
+
+    name = "pytesseract"
+
+    def __init__(self, lang: str = "eng", cache: Optional[OCRCache] = None):
+        import pytesseract
+        self._pytesseract = pytesseract
+        super().__init__(lang, cache)
+
+    def _data(self, array, config):
+        lang = parse_config(config)["lang"] or self.lang
+        return self._pytesseract.image_to_data(array, lang=lang, config=config,
+                                               output_type=self._pytesseract.Output.DICT)
+
+    def _string(self, array, config):
+        lang = parse_config(config)["lang"] or self.lang
+        return self._pytesseract.image_to_string(array, lang=lang, config=config)
+
+
+OCR_ENGINES = {
+    "tesserocr": TesserocrEngine,
+    "capi": TesseractCAPIEngine,
+    "pytesseract": PytesseractEngine,
+}
+
+
+def create_ocr_engine(name: Optional[str] = None, **kwargs) -> OCREngine:
+    """Create an OCR engine by name
+
+    Args:
+        name: "tesserocr", "capi", "pytesseract" or "auto" (the first of
+            those that loads); defaults to the AUTOMATION_OCR environment
+            variable, else "auto"
+        **kwargs: Extra arguments for the engine constructor
+
+    Returns:
+        OCREngine: The engine
+    """
+    if name is None:
+        name = os.environ.get("AUTOMATION_OCR", "auto")
+    if name == "auto":
+        errors = []
+        for engine in OCR_ENGINES.values():
+            try:
+                return engine(**kwargs)
+            except (ImportError, OSError, RuntimeError) as e:
+                errors.append(f"{engine.name}: {e}")
+        raise ImportError("No OCR engine available (" + "; ".join(errors) + ")")
+
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unknown OCR engine: {name}")
+    return OCR_ENGINES[name](**kwargs)
+
+
+_shared_engine = None
+_shared_lock = threading.Lock()
+
+
+def get_ocr_engine() -> OCREngine:
+    """Get the process-wide OCR engine, creating it on first use
+
+    Raises:
+        ImportError: If no engine can be loaded
+    """
+    global _shared_engine
+    with _shared_lock:
+        if _shared_engine is None:
+            _shared_engine = create_ocr_engine()
+        return _shared_engine
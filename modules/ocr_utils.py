@@ -1,20 +1,28 @@
-import cv2
-import numpy as np
-from PIL import Image
 from typing import Optional, Tuple
 import pyautogui
 import traceback
-import difflib
+
+from modules.ocr_engine import get_ocr_engine
+from modules.tiled_ocr import get_tiled_ocr
+from modules.text_index import build_text_index
 
 class OCRUtils:
     def __init__(self, controller):
         """Initialize OCR utilities with a reference to the controller"""
         self.controller = controller
+        self.tiled = False  # OCR word searches as parallel tiles (for large screens), see TiledOCR
+        
+    def _ocr_engine(self, tiled=False):
+        """The controller's OCR engine (or tiled OCR), or the shared one"""
+        getter = getattr(self.controller, "get_tiled_ocr" if tiled else "get_ocr_engine", None)
+        if getter is not None:
+            return getter()
+        return get_tiled_ocr() if tiled else get_ocr_engine()
         
     def get_screen_text_ocr(self, region=None) -> str:
-        """Extract text from screen using OCR (requires pytesseract)"""
+        """Extract text from screen using OCR (requires Tesseract, see modules.ocr_engine)"""
         try:
-            import pytesseract
+            engine = self._ocr_engine()
             
             screenshot = self.controller.take_screenshot(region=region)
             
@@ -34,11 +42,11 @@ class OCRUtils:
             
             # Perform OCR
             config = '--psm 6'  # Assume a single block of text
-            text = pytesseract.image_to_string(processed_image, config=config)
+            text = engine.image_to_string(processed_image, config=config)
             
             return text.strip()
         except ImportError:
-            print("pytesseract not installed. Install with: pip install pytesseract")
+            print("No OCR engine available. Install with: pip install tesserocr (or pytesseract)")
             print("You also need to install Tesseract OCR: https://github.com/tesseract-ocr/tesseract")
             return ""
         except Exception as e:
@@ -46,101 +54,49 @@ class OCRUtils:
             traceback.print_exc()
             return ""
             
-    def find_text_on_screen(self, text: str, region=None) -> Optional[Tuple[int, int]]:
-        """Find text on screen and return its location using OCR"""
+    def get_text_index(self, region=None, tiled=None):
+        """OCR the screen once and index its words for many text lookups
+        
+        Args:
+            region: Part of the screen to read (x, y, width, height)
+            tiled: OCR as overlapping tiles in parallel (None uses self.tiled)
+            
+        Returns:
+            ScreenTextIndex: Words in screen coordinates, or None if capture failed
+        """
+        engine = self._ocr_engine(self.tiled if tiled is None else tiled)
+        frame = self.controller.grab_frame(region)
+        if frame is None:
+            return None
+        # Kept with the frame, so lookups on the same capture share the OCR pass
+        return build_text_index(frame, engine, config=r'--oem 3 --psm 11', threshold=150)
+        
+    def find_text_on_screen(self, text: str, region=None, tiled=None) -> Optional[Tuple[int, int]]:
+        """Find text on screen and return its location using OCR
+        
+        Args:
+            text: Text to look for
+            region: Part of the screen to search (x, y, width, height)
+            tiled: OCR as overlapping tiles in parallel (None uses self.tiled)
+        """
         try:
-            import pytesseract
-            
-            screenshot = self.controller.take_screenshot(region=region)
-            screenshot_np = np.array(screenshot)
-            screenshot_cv = cv2.cvtColor(screenshot_np, cv2.COLOR_RGB2BGR)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
-            
-            # Apply threshold to make text more visible
-            _, binary = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
-            
-            # Use pytesseract to get word boxes
-            custom_config = r'--oem 3 --psm 11'
-            data = pytesseract.image_to_data(binary, config=custom_config, output_type=pytesseract.Output.DICT)
-            
-            # Search for the target text
-            target_text = text.lower()
-            
-            n_boxes = len(data['text'])
-            for i in range(n_boxes):
-                word = data['text'][i].lower().strip()
-                
-                # Check if this word matches or contains the target text
-                if word and (word == target_text or target_text in word):
-                    # Get box coordinates
-                    x = data['left'][i]
-                    y = data['top'][i]
-                    w = data['width'][i]
-                    h = data['height'][i]
-                    
-                    # Calculate center of the word
-                    center_x = x + w // 2
-                    center_y = y + h // 2
-                    
-                    # If region was provided, adjust coordinates
-                    if region:
-                        center_x += region[0]
-                        center_y += region[1]
-                        
-                    print(f"Found text '{text}' at ({center_x}, {center_y})")
-                    return (center_x, center_y)
-                    
-                # Also check for consecutive words that form the target
-                if i < n_boxes - 1:
-                    two_words = f"{word} {data['text'][i+1].lower().strip()}"
-                    if two_words == target_text or target_text in two_words:
-                        # Calculate center between two words
-                        x1 = data['left'][i]
-                        x2 = data['left'][i+1] + data['width'][i+1]
-                        y1 = data['top'][i] + data['height'][i] // 2
-                        y2 = data['top'][i+1] + data['height'][i+1] // 2
-                        
-                        center_x = (x1 + x2) // 2
-                        center_y = (y1 + y2) // 2
-                        
-                        # If region was provided, adjust coordinates
-                        if region:
-                            center_x += region[0]
-                            center_y += region[1]
-                            
-                        print(f"Found text '{text}' at ({center_x}, {center_y})")
-                        return (center_x, center_y)
+            index = self.get_text_index(region, tiled)
+            if index is None:
+                print("Could not capture the screen for OCR")
+                return None
+            
+            # Whole words or phrases along a line, else text contained in a line
+            spans = index.find(text)
+            if spans:
+                center_x, center_y = spans[0].center
+                print(f"Found text '{text}' at ({center_x}, {center_y})")
+                return (center_x, center_y)
                         
-            # If text is not found directly, check for partial matches
-            best_match = None
-            best_ratio = 0
-            
-            for i in range(n_boxes):
-                word = data['text'][i].lower().strip()
-                if len(word) >= 3:  # Ignore very short words
-                    # Calculate similarity ratio
-                    ratio = difflib.SequenceMatcher(None, word, target_text).ratio()
-                    
-                    if ratio > 0.7 and ratio > best_ratio:  # At least 70% similar
-                        best_match = i
-                        best_ratio = ratio
-            
-            if best_match is not None:
-                x = data['left'][best_match]
-                y = data['top'][best_match]
-                w = data['width'][best_match]
-                h = data['height'][best_match]
-                
-                center_x = x + w // 2
-                center_y = y + h // 2
-                
-                # If region was provided, adjust coordinates
-                if region:
-                    center_x += region[0]
-                    center_y += region[1]
-                    
+            # If text is not found directly, look for a close match (OCR misreadings)
+            matches = index.fuzzy(text, min_score=0.7)
+            if matches:
+                best_ratio, best_match = matches[0]
+                center_x, center_y = best_match.center
                 print(f"Found closest match for '{text}' at ({center_x}, {center_y}) with {best_ratio:.2f} confidence")
                 return (center_x, center_y)
             
@@ -148,7 +104,7 @@ class OCRUtils:
             return None
             
         except ImportError:
-            print("Required libraries not installed. Install with: pip install pytesseract opencv-python")
+            print("Required libraries not installed. Install with: pip install tesserocr (or pytesseract) opencv-python")
             return None
         except Exception as e:
             print(f"Error finding text: {str(e)}")
@@ -159,7 +115,13 @@ class OCRUtils:
         """Find and click on text visible on screen"""
         text_pos = self.find_text_on_screen(text, region)
         if text_pos:
-            pyautogui.click(text_pos[0], text_pos[1])
+            input_backend = getattr(self.controller, 'input_backend', None)
+            if input_backend is not None:
+                input_backend.click(text_pos[0], text_pos[1])
+            else:
+                pyautogui.click(text_pos[0], text_pos[1])
+            if callable(getattr(self.controller, 'invalidate_frame', None)):
+                self.controller.invalidate_frame()
             self.controller.log_action(f"Clicked on text '{text}' at {text_pos}")
             return True
         else:
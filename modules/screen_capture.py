@@ -0,0 +1,270 @@
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    """A captured screen frame backed by a NumPy array
+
+    The pixel data is kept in whatever channel order the backend produced
+    (``BGRA`` for mss, ``RGB`` for pyautogui) so no conversion happens at
+    capture time. Conversions to PIL, BGR or grayscale are done lazily and
+    cached on the frame, so several consumers can share one capture.
+    """
+
+    def __init__(self, array: np.ndarray, channel_order: str = "RGB", left: int = 0, top: int = 0,
+                 timestamp: Optional[float] = None):
+        """Initialize the frame
+
+        Args:
+            array: Pixel data with shape (height, width, channels)
+            channel_order: "BGRA" or "RGB"
+            left: Screen x coordinate of the top-left pixel
+            top: Screen y coordinate of the top-left pixel
+            timestamp: Monotonic capture time, defaults to now
+        """
+        self.array = array
+        self.channel_order = channel_order
+        self.left = left
+        self.top = top
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self.meta = {}  # Per-frame data shared by consumers, e.g. where it was saved
+        self._pil = None
+        self._bgr = None
+        self._gray = None
+
+    @property
+    def width(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Frame size as (width, height), like PIL's Image.size"""
+        return self.width, self.height
+
+    @property
+    def region(self) -> Tuple[int, int, int, int]:
+        """Screen region covered by this frame as (x, y, width, height)"""
+        return self.left, self.top, self.width, self.height
+
+    def to_pil(self) -> Image.Image:
+        """Return the frame as an RGB PIL image (converted once, then cached)"""
+        if self._pil is None:
+            data = np.ascontiguousarray(self.array)
+            if self.channel_order == "BGRA":
+                self._pil = Image.frombuffer("RGB", self.size, data, "raw", "BGRX", 0, 1)
+            else:
+                self._pil = Image.fromarray(data, "RGB")
+        return self._pil
+
+    def to_rgb(self) -> np.ndarray:
+        """Return the frame as an RGB array"""
+        if self.channel_order == "RGB":
+            return self.array
+        import cv2
+        return cv2.cvtColor(self.array, cv2.COLOR_BGRA2RGB)
+
+    def to_bgr(self) -> np.ndarray:
+        """Return the frame as a BGR array for OpenCV (converted once, then cached)"""
+        if self._bgr is None:
+            import cv2
+            if self.channel_order == "BGRA":
+                self._bgr = cv2.cvtColor(self.array, cv2.COLOR_BGRA2BGR)
+            else:
+                self._bgr = cv2.cvtColor(self.array, cv2.COLOR_RGB2BGR)
+        return self._bgr
+
+    def to_gray(self) -> np.ndarray:
+        """Return the frame as a single-channel grayscale array (cached)"""
+        if self._gray is None:
+            import cv2
+            if self.channel_order == "BGRA":
+                self._gray = cv2.cvtColor(self.array, cv2.COLOR_BGRA2GRAY)
+            else:
+                self._gray = cv2.cvtColor(self.array, cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+    def crop(self, region: Tuple[int, int, int, int]) -> "Frame":
+        """Return a view of part of this frame
+
+        Args:
+            region: Region in screen coordinates (x, y, width, height)
+
+        Returns:
+            Frame: A frame sharing this frame's pixel buffer
+        """
+        x, y, w, h = region
+        x0 = max(0, x - self.left)
+        y0 = max(0, y - self.top)
+        x1 = min(self.width, x - self.left + w)
+        y1 = min(self.height, y - self.top + h)
+        view = self.array[y0:y1, x0:x1]
+        cropped = Frame(view, self.channel_order, self.left + x0, self.top + y0, self.timestamp)
+        # Reuse conversions already done on the whole frame
+        if self._bgr is not None:
+            cropped._bgr = self._bgr[y0:y1, x0:x1]
+        if self._gray is not None:
+            cropped._gray = self._gray[y0:y1, x0:x1]
+        return cropped
+
+
+class CaptureBackend:
+    """Base class for screen capture backends"""
+
+    name = "base"
+
+    def grab(self, region=None) -> Frame:
+        """Capture the primary screen or a region of it
+
+        Args:
+            region: Region to capture (x, y, width, height), or None for the full screen
+
+        Returns:
+            Frame: The captured frame
+        """
+        raise NotImplementedError
+
+    def monitors(self) -> List[Tuple[int, int, int, int]]:
+        """List the physical monitors, primary first
+
+        Returns:
+            list: (left, top, width, height) of each monitor in global
+                screen coordinates; grab() accepts any of them as a region
+        """
+        frame = self.grab()
+        return [(frame.left, frame.top, frame.width, frame.height)]
+
+    def close(self):
+        """Release any resources held by the backend"""
+        pass
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """Capture backend using pyautogui.screenshot()"""
+
+    name = "pyautogui"
+
+    def grab(self, region=None) -> Frame:
+        import pyautogui
+
+        if region:
+            image = pyautogui.screenshot(region=region)
+            left, top = region[0], region[1]
+        else:
+            image = pyautogui.screenshot()
+            left, top = 0, 0
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        frame = Frame(np.asarray(image), "RGB", left, top)
+        # The PIL image already exists, keep it so to_pil() is free
+        frame._pil = image
+        return frame
+
+    def monitors(self):
+        import pyautogui
+
+        # pyautogui only sees the primary screen
+        width, height = pyautogui.size()
+        return [(0, 0, width, height)]
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """Capture backend keeping one mss grabber alive per thread
+
+    mss handles are not safe to share between threads, so each thread that
+    captures gets its own grabber, created on first use and reused for every
+    later capture until close() is called.
+    """
+
+    name = "mss"
+
+    def __init__(self, monitor: int = 1, display: Optional[str] = None):
+        """Initialize the backend
+
+        Args:
+            monitor: Index into mss' monitor list used for full-screen grabs
+                (0 is the union of all monitors, 1 is the primary screen)
+            display: X display to capture (e.g. ":99" for Xvfb), Linux only
+        """
+        import mss  # noqa: F401 - fail early if mss is not installed
+
+        self.monitor = monitor
+        self.display = display
+        self._local = threading.local()
+        self._grabbers = []
+        self._lock = threading.Lock()
+
+    def _grabber(self):
+        """Get the mss grabber for the calling thread"""
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            sct = mss.mss(display=self.display) if self.display else mss.mss()
+            self._local.sct = sct
+            with self._lock:
+                self._grabbers.append(sct)
+        return sct
+
+    def grab(self, region=None) -> Frame:
+        sct = self._grabber()
+        if region:
+            x, y, w, h = region
+            monitor = {"left": int(x), "top": int(y), "width": int(w), "height": int(h)}
+        else:
+            monitor = sct.monitors[self.monitor]
+        shot = sct.grab(monitor)
+        # Wrap the raw BGRA buffer without copying it
+        array = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        return Frame(array, "BGRA", shot.left, shot.top)
+
+    def monitors(self):
+        # monitors[0] is the union of all screens, the rest are the physical ones
+        screens = self._grabber().monitors[1:]
+        rects = [(m["left"], m["top"], m["width"], m["height"]) for m in screens]
+        if 1 <= self.monitor <= len(rects):
+            rects.insert(0, rects.pop(self.monitor - 1))
+        return rects
+
+    def close(self):
+        with self._lock:
+            grabbers, self._grabbers = self._grabbers, []
+        for sct in grabbers:
+            try:
+                sct.close()
+            except Exception as e:
+                print(f"Error closing mss grabber: {str(e)}")
+        self._local = threading.local()
+
+
+CAPTURE_BACKENDS = {
+    "pyautogui": PyAutoGUICaptureBackend,
+    "mss": MSSCaptureBackend,
+}
+
+
+def create_capture_backend(name: str = "auto", **kwargs) -> CaptureBackend:
+    """Create a capture backend by name
+
+    Args:
+        name: "mss", "pyautogui" or "auto" (mss if installed, else pyautogui)
+        **kwargs: Extra arguments for the backend constructor
+
+    Returns:
+        CaptureBackend: The capture backend
+    """
+    if name == "auto":
+        try:
+            return MSSCaptureBackend(**kwargs)
+        except ImportError:
+            return PyAutoGUICaptureBackend()
+
+    if name not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend: {name}")
+    return CAPTURE_BACKENDS[name](**kwargs)
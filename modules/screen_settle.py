@@ -0,0 +1,81 @@
+import time
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+
+def sample_frame(frame, step: int = 8) -> np.ndarray:
+    """Take a cheap strided sample of a frame for change detection
+
+    Args:
+        frame: Frame to sample
+        step: Keep every step-th pixel in both directions
+
+    Returns:
+        np.ndarray: Small int16 array of the colour channels
+    """
+    return frame.array[::step, ::step, :3].astype(np.int16)
+
+
+def changed_fraction(previous: np.ndarray, current: np.ndarray, tolerance: int = 16) -> float:
+    """Fraction of sampled pixels that differ by more than tolerance"""
+    if previous.shape != current.shape:
+        return 1.0
+    diff = np.abs(current - previous).max(axis=2)
+    return float(np.count_nonzero(diff > tolerance)) / diff.size
+
+
+def wait_for_settle(grab: Callable, stable_ms: float = 250, timeout: float = 3.0, interval: float = 0.05,
+                    sample_step: int = 8, max_changed: float = 0.001,
+                    react_ms: float = 500) -> Tuple[bool, Optional[object]]:
+    """Wait until the screen stops changing
+
+    Frames are sampled every interval seconds; the screen counts as settled
+    once no more than max_changed of the sampled pixels have changed for
+    stable_ms milliseconds. A blinking caret or a clock changes far fewer
+    pixels than that, so they don't keep the wait going.
+
+    Right after an action the app may not have started reacting yet (a
+    dialog about to open, a page about to load), so an unchanged screen
+    only counts as settled once it has changed or react_ms has passed.
+
+    Args:
+        grab: Function returning a fresh full-screen Frame
+        stable_ms: How long the screen must stay unchanged
+        timeout: Give up after this many seconds
+        interval: Seconds between samples
+        sample_step: Pixel stride used when sampling frames
+        max_changed: Fraction of sampled pixels allowed to change
+        react_ms: How long to wait for a first change before accepting
+            the screen as it was
+
+    Returns:
+        tuple: (settled, last_frame) - settled is False on timeout
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    frame = grab(None)
+    if frame is None:
+        return False, None
+
+    previous = sample_frame(frame, sample_step)
+    stable_since = time.monotonic()
+    reacted = False
+
+    while True:
+        now = time.monotonic()
+        waited_for_reaction = reacted or (now - start) * 1000 >= react_ms
+        if waited_for_reaction and (now - stable_since) * 1000 >= stable_ms:
+            return True, frame
+        if now >= deadline:
+            return False, frame
+
+        time.sleep(interval)
+        current_frame = grab(None)
+        if current_frame is None:
+            return False, frame
+        current = sample_frame(current_frame, sample_step)
+        if changed_fraction(previous, current) > max_changed:
+            stable_since = time.monotonic()
+            reacted = True
+        frame, previous = current_frame, current
@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Callable, List, Optional
+
+from modules.capture_thread import change_hash
+
+
+class Watch:
+    """One registered condition: something appearing on (or leaving) the screen"""
+
+    def __init__(self, check: Callable, region=None, appear: bool = True,
+                 callback: Optional[Callable] = None, name: str = ""):
+        """Initialize the watch
+
+        Args:
+            check: Function taking a Frame and returning a result (e.g. a
+                match location) when the thing is visible, or None
+            region: Part of the screen to watch (x, y, width, height), None for the whole screen
+            appear: Fire when check finds something (True) or when it stops finding it (False)
+            callback: Called with the result when the watch fires
+            name: Label used in logs
+        """
+        self.check = check
+        self.region = tuple(region) if region else None
+        self.appear = appear
+        self.callback = callback
+        self.name = name
+        self.future = Future()
+        self.last_hash = None  # Pixels the check last ran on
+
+
+class ScreenWatcher:
+    """Wait for templates or text to appear or disappear, with one polling loop
+
+    All watches share a single background thread. Each poll captures every
+    watched region once, and a watch's check only runs again when the
+    pixels of its region have changed since it last ran, so waiting on an
+    idle screen costs one capture and a hash per poll.
+    """
+
+    def __init__(self, grab: Callable, interval: float = 0.25):
+        """Initialize the watcher (the thread starts with the first watch)
+
+        Args:
+            grab: Function taking a region (or None) and returning a Frame
+            interval: Seconds between polls
+        """
+        self._grab = grab
+        self.interval = interval
+        self.polls = 0
+        self.checks = 0
+        self.skipped = 0
+        self._watches: List[Watch] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def watch(self, check: Callable, region=None, appear: bool = True,
+              callback: Optional[Callable] = None, name: str = "") -> Future:
+        """Register a condition to wait for
+
+        Args:
+            check: Function taking a Frame and returning a result or None
+            region: Part of the screen to watch (x, y, width, height)
+            appear: Wait for check to find something (True) or to stop finding it (False)
+            callback: Called with the result when the watch fires
+            name: Label used in logs
+
+        Returns:
+            Future: Resolves to check's result (appear) or True (disappear);
+                cancel it to drop the watch
+        """
+        watch = Watch(check, region, appear, callback, name)
+        with self._lock:
+            self._watches.append(watch)
+            if not self.is_running:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._poll_loop, name="screen-watcher", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return watch.future
+
+    def wait(self, check: Callable, region=None, appear: bool = True, timeout: Optional[float] = None,
+             name: str = ""):
+        """Block until a condition is met
+
+        Returns:
+            The watch result, or None if the timeout passed first
+        """
+        future = self.watch(check, region, appear, name=name)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            return None
+
+    def _poll_loop(self):
+        """Capture watched regions and run the checks whose pixels changed"""
+        while not self._stop.is_set():
+            started = time.monotonic()
+            with self._lock:
+                self._watches = [watch for watch in self._watches if not watch.future.done()]
+                watches = list(self._watches)
+                if not watches:
+                    self._thread = None
+                    return
+            self._poll(watches)
+            self._wake.clear()
+            self._wake.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def _poll(self, watches: List[Watch]):
+        """Run one round of checks"""
+        self.polls += 1
+        frames = {}
+        for watch in watches:
+            if watch.region not in frames:
+                try:
+                    frame = self._grab(watch.region)
+                except Exception as e:
+                    print(f"Error capturing for screen watcher: {str(e)}")
+                    frame = None
+                frames[watch.region] = (frame, change_hash(frame) if frame is not None else None)
+            frame, frame_hash = frames[watch.region]
+            if frame is None or watch.future.done():
+                continue
+            if frame_hash == watch.last_hash:
+                self.skipped += 1
+                continue
+
+            watch.last_hash = frame_hash
+            self.checks += 1
+            try:
+                result = watch.check(frame)
+            except Exception as e:
+                print(f"Error checking watch '{watch.name}': {str(e)}")
+                continue
+            if watch.appear and result is not None:
+                self._fire(watch, result)
+            elif not watch.appear and result is None:
+                self._fire(watch, True)
+
+    def _fire(self, watch: Watch, result):
+        """Resolve a watch and run its callback"""
+        if not watch.future.set_running_or_notify_cancel():
+            return  # Cancelled by the caller
+        watch.future.set_result(result)
+        if watch.callback is not None:
+            try:
+                watch.callback(result)
+            except Exception as e:
+                print(f"Error in watch callback for '{watch.name}': {str(e)}")
+
+    def cancel_all(self):
+        """Cancel every pending watch"""
+        with self._lock:
+            watches, self._watches = self._watches, []
+        for watch in watches:
+            watch.future.cancel()
+
+    def stop(self):
+        """Cancel all watches and wait for the polling thread to exit"""
+        self.cancel_all()
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._thread = None
+
+    def get_stats(self) -> dict:
+        """Get polling counters"""
+        with self._lock:
+            pending = sum(1 for watch in self._watches if not watch.future.done())
+        return {
+            "running": self.is_running,
+            "pending": pending,
+            "polls": self.polls,
+            "checks": self.checks,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,208 @@
+import re
+from typing import Dict, Optional, Tuple
+
+NEAR_RADIUS = 200  # Half-size of the square searched around a "near" anchor
+
+# "OK in "Save As"", "OK inside 'Toolbar'", "OK in "Don't Save"", "OK near Search box"
+_QUOTED = r'(?P<quote>["\'])(?P<quoted>.+?)(?P=quote)'
+_IN_PATTERN = re.compile(r'^(.+?)\s+(?:in|inside|within)\s+(?:window\s+)?' + _QUOTED + r'\s*$', re.IGNORECASE)
+_REGION_PATTERN = re.compile(r'^(.+?)\s+in\s+region\s+(?:' + _QUOTED + r'|(?P<bare>.+?))\s*$', re.IGNORECASE)
+_NEAR_PATTERN = re.compile(r'^(.+?)\s+near\s+(?:' + _QUOTED + r'|(?P<bare>.+?))\s*$', re.IGNORECASE)
+
+
+def split_scope(target: str) -> Tuple[str, Optional[Dict[str, str]]]:
+    """Split a search scope off the end of a command target
+
+    Supported forms:
+        OK in "Save As"       - a saved region or a window with that title
+        OK in region toolbar  - a saved region only
+        OK near Search        - the neighbourhood of an anchor element or text
+
+    Args:
+        target: Target text as written in the command
+
+    The scope dict keeps the text that was split off as "suffix", so a
+    target that only looked like it had a scope ("Stores near me") can be
+    tried as written when the scope doesn't resolve (see unscoped_target).
+
+    Returns:
+        tuple: (target without the scope, scope dict or None)
+    """
+    target = target.strip()
+    for scope_type, pattern in (("region", _REGION_PATTERN), ("in", _IN_PATTERN), ("near", _NEAR_PATTERN)):
+        match = pattern.match(target)
+        if match:
+            name = match.group("quoted") or match.groupdict().get("bare") or ""
+            scope = {"type": scope_type, "name": name.strip(), "suffix": target[match.end(1):]}
+            return match.group(1).strip(), scope
+    return target, None
+
+
+def unscoped_target(target, scope):
+    """The target as originally written, with the scope text put back
+
+    Args:
+        target: Target returned by split_scope
+        scope: Scope dict returned with it
+
+    Returns:
+        The full original target (target itself if it isn't text or has no scope)
+    """
+    if not scope or not isinstance(target, str):
+        return target
+    return target + scope.get("suffix", "")
+
+
+def screen_bounds(controller=None) -> Tuple[int, int, int, int]:
+    """Bounding box of all monitors in global screen coordinates
+
+    Monitors left of or above the primary one have negative coordinates,
+    so this can start below 0.
+
+    Args:
+        controller: Controller with get_monitors() or a capture_backend;
+            without one only the primary screen (pyautogui.size()) is known
+
+    Returns:
+        tuple: (x, y, width, height) covering every monitor
+    """
+    monitors = []
+    try:
+        if callable(getattr(controller, "get_monitors", None)):
+            monitors = controller.get_monitors()
+        elif getattr(controller, "capture_backend", None) is not None:
+            monitors = controller.capture_backend.monitors()
+    except Exception as e:
+        print(f"Error listing monitors: {str(e)}")
+    if not monitors:
+        input_backend = getattr(controller, "input_backend", None)
+        if input_backend is not None:
+            width, height = input_backend.size()
+        else:
+            import pyautogui
+            width, height = pyautogui.size()
+        return (0, 0, int(width), int(height))
+    left = min(m[0] for m in monitors)
+    top = min(m[1] for m in monitors)
+    right = max(m[0] + m[2] for m in monitors)
+    bottom = max(m[1] + m[3] for m in monitors)
+    return (left, top, right - left, bottom - top)
+
+
+def clip_region(region, bounds=None) -> Optional[Tuple[int, int, int, int]]:
+    """Clip a region to the desktop
+
+    Args:
+        region: Region (x, y, width, height)
+        bounds: Desktop rectangle (x, y, width, height), defaults to screen_bounds()
+
+    Returns:
+        tuple: The clipped region, or None if nothing of it is on screen
+    """
+    if bounds is None:
+        bounds = screen_bounds()
+    screen_x, screen_y, screen_width, screen_height = bounds
+    x, y, width, height = (int(v) for v in region)
+    left, top = max(screen_x, x), max(screen_y, y)
+    right, bottom = min(screen_x + screen_width, x + width), min(screen_y + screen_height, y + height)
+    if right <= left or bottom <= top:
+        return None
+    return (left, top, right - left, bottom - top)
+
+
+def find_window_region(title: str, bounds=None) -> Optional[Tuple[int, int, int, int]]:
+    """Find the on-screen rectangle of a visible window by title
+
+    The match is case-insensitive because parsed commands are lowercased.
+    An exact title wins over a window whose title only contains the text.
+
+    Args:
+        title: Window title or part of it
+        bounds: Desktop rectangle to clip to (see clip_region)
+
+    Returns:
+        tuple: Region (x, y, width, height) or None if no window matched
+    """
+    try:
+        import pygetwindow
+    except ImportError:
+        print("pygetwindow not installed. Install with: pip install pygetwindow")
+        return None
+    except NotImplementedError:
+        print("Window lookup is not supported on this platform")
+        return None
+
+    wanted = title.lower()
+    best = None
+    try:
+        for window in pygetwindow.getAllWindows():
+            window_title = (window.title or "").lower()
+            if wanted not in window_title:
+                continue
+            if getattr(window, "isMinimized", False) or getattr(window, "visible", True) is False:
+                continue
+            if window_title == wanted:
+                best = window
+                break
+            if best is None:
+                best = window
+    except Exception as e:
+        print(f"Error listing windows: {str(e)}")
+        return None
+
+    if best is None:
+        return None
+    return clip_region((best.left, best.top, best.width, best.height), bounds)
+
+
+def neighbourhood(point, radius: int = NEAR_RADIUS, bounds=None) -> Optional[Tuple[int, int, int, int]]:
+    """Square region of the given radius around a point, clipped to the desktop"""
+    x, y = int(point[0]), int(point[1])
+    return clip_region((x - radius, y - radius, 2 * radius, 2 * radius), bounds)
+
+
+def resolve_scope(controller, scope) -> Optional[Tuple[int, int, int, int]]:
+    """Turn a scope from split_scope into a screen region
+
+    Saved rectangles come from controller.regions; "near" anchors are looked
+    up with controller.find_ui_element, falling back to find_text_on_screen.
+
+    Args:
+        controller: Controller providing regions and the locators
+        scope: Scope dict, or None for the full screen
+
+    Returns:
+        tuple: Region (x, y, width, height), or None if the scope is not on screen
+    """
+    if not scope:
+        return None
+
+    name = scope["name"]
+    bounds = screen_bounds(controller)  # All monitors, not just the primary screen
+    regions = {key.lower(): value for key, value in getattr(controller, "regions", {}).items()}
+    if scope["type"] in ("in", "region") and name.lower() in regions:
+        return clip_region(regions[name.lower()], bounds)
+    if scope["type"] == "region":
+        print(f"Saved region not found: {name}")
+        return None
+    if scope["type"] == "in":
+        region = find_window_region(name, bounds)
+        if region is None:
+            print(f"Window not found: {name}")
+        return region
+
+    # "near": find the anchor, then search the area around it
+    anchor = None
+    elements = getattr(controller, "ui_elements", {})
+    element_name = next((key for key in elements if key.lower() == name.lower()), None)
+    if element_name is not None:
+        anchor = controller.find_ui_element(element_name)
+    if anchor is None and callable(getattr(controller, "find_text_on_screen", None)):
+        anchor = controller.find_text_on_screen(name)
+    if anchor is None:
+        print(f"Anchor not found: {name}")
+        return None
+    if len(anchor) == 4:
+        # Locators that return a box (x, y, width, height)
+        anchor = (anchor[0] + anchor[2] // 2, anchor[1] + anchor[3] // 2)
+    return neighbourhood(anchor, getattr(controller, "near_radius", NEAR_RADIUS), bounds)
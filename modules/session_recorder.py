@@ -0,0 +1,290 @@
+import json
+import os
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+RECORDING_FILE = "recording.bin"
+INDEX_FILE = "recording_index.jsonl"
+
+
+def _tile_grid(array: np.ndarray, tile_size: int) -> np.ndarray:
+    """View an image as a grid of tiles, padding the edges with zeros
+
+    Returns:
+        np.ndarray: Array of shape (rows, cols, tile, tile, channels)
+    """
+    height, width = array.shape[:2]
+    if array.ndim == 2:
+        array = array[:, :, None]
+    rows = -(-height // tile_size)
+    cols = -(-width // tile_size)
+    pad_h = rows * tile_size - height
+    pad_w = cols * tile_size - width
+    if pad_h or pad_w:
+        array = np.pad(array, ((0, pad_h), (0, pad_w), (0, 0)))
+    channels = array.shape[2]
+    return array.reshape(rows, tile_size, cols, tile_size, channels).swapaxes(1, 2)
+
+
+def step_reference(recording_path: str, number: int) -> str:
+    """Build the path used to refer to one record inside a recording"""
+    return f"{recording_path}#{number}"
+
+
+def parse_step_reference(path: str) -> Optional[Tuple[str, int]]:
+    """Split a "recording.bin#12" reference into (recording path, record number)"""
+    base, sep, number = path.rpartition("#")
+    if not sep or not number.isdigit() or not base.endswith(RECORDING_FILE):
+        return None
+    return base, int(number)
+
+
+def _read_index(index_path: str) -> List[dict]:
+    entries = []
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    entries.append(json.loads(line))
+    return entries
+
+
+class SessionRecorder:
+    """Append step frames to a delta-encoded session recording
+
+    The first frame, and every keyframe_interval-th frame after it, is
+    stored whole. Every other frame stores only the tiles that changed
+    since the previous record. Payloads are zlib-compressed and appended
+    to one file, and an index line is written per record so a reader can
+    seek straight to any step.
+
+    References point at record numbers, not step numbers: step numbers
+    start over with every command sequence while the recording keeps
+    growing, so "recording.bin#N" stays tied to the frame it was made for.
+    """
+
+    def __init__(self, directory: str, tile_size: int = 32, keyframe_interval: int = 25,
+                 compress_level: int = 1):
+        """Initialize the recorder
+
+        Args:
+            directory: Session directory to write the recording into
+            tile_size: Edge length of the square tiles compared between frames
+            keyframe_interval: Store a full frame every this many records
+            compress_level: zlib level for payloads, 1 (fast) to 9 (small)
+        """
+        self.directory = directory
+        self.path = os.path.join(directory, RECORDING_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.compress_level = compress_level
+        # Continue an existing recording of the same session
+        existing = _read_index(self.index_path)
+        self.records = len(existing)
+        self.bytes_written = 0
+        self._next_number = max((entry["number"] for entry in existing), default=-1) + 1
+        self._pending: Dict[int, int] = {}  # Reserved record number -> step
+        self._previous = None
+        self._since_keyframe = 0
+        self._keyframe_record = -1
+        self._lock = threading.Lock()
+
+    def reserve(self, step: int) -> str:
+        """Hand out the reference of a frame that will be recorded later
+
+        Lets a step be logged before a background writer records it.
+
+        Args:
+            step: Step number the frame belongs to
+
+        Returns:
+            str: Reference to pass to record() ("…/recording.bin#number")
+        """
+        with self._lock:
+            number = self._next_number
+            self._next_number += 1
+            self._pending[number] = step
+            return step_reference(self.path, number)
+
+    def record(self, step: Optional[int], array: np.ndarray, number: Optional[int] = None) -> str:
+        """Append one frame to the recording
+
+        Args:
+            step: Step number the frame belongs to (None to use the one
+                given to reserve())
+            array: RGB or grayscale image array
+            number: Record number from a reserve() reference; a new one is
+                taken if None
+
+        Returns:
+            str: Reference to the frame ("…/recording.bin#number")
+        """
+        array = np.ascontiguousarray(array)
+        with self._lock:
+            if number is None:
+                number = self._next_number
+                self._next_number += 1
+            reserved_step = self._pending.pop(number, None)
+            if step is None:
+                step = reserved_step
+            previous = self._previous
+            is_keyframe = (
+                previous is None
+                or previous.shape != array.shape
+                or self._since_keyframe >= self.keyframe_interval
+            )
+
+            tiles = None
+            if not is_keyframe:
+                old_grid = _tile_grid(previous, self.tile_size)
+                new_grid = _tile_grid(array, self.tile_size)
+                changed = np.any(old_grid != new_grid, axis=(2, 3, 4))
+                tiles = np.flatnonzero(changed).astype(np.uint32)
+                # A mostly-changed screen is cheaper to store whole
+                if len(tiles) > changed.size // 2:
+                    is_keyframe = True
+                else:
+                    tile_data = new_grid.reshape(-1, *new_grid.shape[2:])[tiles]
+                    payload = tiles.tobytes() + tile_data.tobytes()
+
+            if is_keyframe:
+                payload = array.tobytes()
+
+            data = zlib.compress(payload, self.compress_level)
+            with open(self.path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+
+            if is_keyframe:
+                self._keyframe_record = self.records
+                self._since_keyframe = 0
+            self._since_keyframe += 1
+
+            entry = {
+                "step": step,
+                "number": number,
+                "record": self.records,
+                "offset": offset,
+                "length": len(data),
+                "keyframe": self._keyframe_record,
+                "shape": list(array.shape),
+                "tile_size": self.tile_size,
+                "tiles": 0 if is_keyframe else int(len(tiles)),
+            }
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+            self._previous = array
+            self.records += 1
+            self.bytes_written += len(data)
+            return step_reference(self.path, number)
+
+
+class SessionReader:
+    """Rebuild step frames from a delta-encoded session recording"""
+
+    def __init__(self, path: str):
+        """Initialize the reader
+
+        Args:
+            path: Recording file or the session directory containing it
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, RECORDING_FILE)
+        self.path = path
+        self.index_path = os.path.join(os.path.dirname(path), INDEX_FILE)
+        self.entries: List[dict] = []
+        self._by_number: Dict[int, int] = {}
+        self._cached_record = -1
+        self._cached_array = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Re-read the index, picking up records appended since the last read"""
+        entries = _read_index(self.index_path)
+        self.entries = entries
+        self._by_number = {entry["number"]: i for i, entry in enumerate(entries)}
+
+    def steps(self) -> List[int]:
+        """Get the recorded step numbers in recording order (they repeat across runs)"""
+        return [entry["step"] for entry in self.entries]
+
+    def _read_payload(self, f, entry) -> bytes:
+        f.seek(entry["offset"])
+        return zlib.decompress(f.read(entry["length"]))
+
+    def _apply(self, f, entry, base: Optional[np.ndarray]) -> np.ndarray:
+        """Decode one record on top of the previous record's frame"""
+        shape = tuple(entry["shape"])
+        payload = self._read_payload(f, entry)
+        if entry["record"] == entry["keyframe"]:
+            return np.frombuffer(payload, dtype=np.uint8).reshape(shape).copy()
+
+        count = entry["tiles"]
+        frame = base.copy()
+        if count == 0:
+            return frame
+        tiles = np.frombuffer(payload[:count * 4], dtype=np.uint32)
+        channels = shape[2] if len(shape) == 3 else 1
+        size = entry["tile_size"]
+        tile_data = np.frombuffer(payload[count * 4:], dtype=np.uint8).reshape(count, size, size, channels)
+
+        height, width = shape[:2]
+        cols = -(-width // size)
+        view = frame if frame.ndim == 3 else frame[:, :, None]
+        for tile_index, data in zip(tiles, tile_data):
+            row, col = divmod(int(tile_index), cols)
+            y, x = row * size, col * size
+            h, w = min(size, height - y), min(size, width - x)
+            view[y:y + h, x:x + w] = data[:h, :w]
+        return frame
+
+    def get_array(self, number: int) -> Optional[np.ndarray]:
+        """Rebuild the frame of a record
+
+        Args:
+            number: Record number from a "recording.bin#number" reference
+
+        Returns:
+            np.ndarray: The frame, or None if the record is not in the recording
+        """
+        with self._lock:
+            if number not in self._by_number:
+                self.reload()
+                if number not in self._by_number:
+                    return None
+
+            target = self._by_number[number]
+            keyframe = self.entries[target]["keyframe"]
+            # Continue from the last rebuilt frame when it is on the way
+            if keyframe <= self._cached_record <= target:
+                start, array = self._cached_record + 1, self._cached_array
+            else:
+                start, array = keyframe, None
+
+            with open(self.path, "rb") as f:
+                for record in range(start, target + 1):
+                    array = self._apply(f, self.entries[record], array)
+
+            self._cached_record, self._cached_array = target, array
+            return array.copy()
+
+    def get_image(self, number: int) -> Optional[Image.Image]:
+        """Rebuild the frame of a record as a PIL image"""
+        array = self.get_array(number)
+        return Image.fromarray(array) if array is not None else None
+
+    def iter_frames(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (step, frame) for every record in order, for replay"""
+        array = None
+        with open(self.path, "rb") as f:
+            for entry in list(self.entries):
+                array = self._apply(f, entry, array)
+                yield entry["step"], array.copy()
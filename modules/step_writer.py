@@ -0,0 +1,223 @@
+import queue
+import threading
+from typing import Callable, Optional
+
+
+class StepWriteJob:
+    """A step screenshot waiting to be written by the StepScreenshotWriter"""
+
+    def __init__(self, step: int, description: str, filepath: Optional[str], frame, log_path: str,
+                 log_entry: str, callback: Optional[Callable] = None):
+        """Initialize the job
+
+        Args:
+            step: Step number
+            description: Step description passed to the callback
+            filepath: Where the screenshot is (or will be) saved
+            frame: Frame to encode, or None if the file already exists
+            log_path: Path of the execution log to append to
+            log_entry: Line to append to the execution log
+            callback: Function called with (step, description, filepath) once written
+        """
+        self.step = step
+        self.description = description
+        self.filepath = filepath
+        self.frame = frame
+        self.log_path = log_path
+        self.log_entry = log_entry
+        self.callback = callback
+        self.seq = -1
+        self.scale = 1.0
+        self.dropped = False
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the screenshot is written and the step is logged
+
+        Returns:
+            bool: True if the job finished within the timeout
+        """
+        return self._done.wait(timeout)
+
+
+class StepScreenshotWriter:
+    """Write step screenshots from a pool of background threads
+
+    Frames are handed over through a bounded queue so encoding, disk writes
+    and the step notification happen off the automation thread. Encoding
+    runs in parallel, but log entries and callbacks are issued strictly in
+    submission order so the execution log and step cards stay in sequence.
+
+    Backpressure policies when the queue is full:
+        block: wait for a free slot (nothing is lost)
+        drop_oldest: discard the oldest queued screenshot; its step is
+            still logged and notified, without an image
+        downsample: encode at half resolution once the queue is half full,
+            and block when it is full
+    """
+
+    POLICIES = ("block", "drop_oldest", "downsample")
+
+    def __init__(self, max_queue: int = 8, workers: int = 2, policy: str = "block",
+                 save_image: Optional[Callable] = None):
+        """Initialize the writer
+
+        Args:
+            max_queue: Maximum number of screenshots waiting to be written
+            workers: Number of writer threads
+            policy: Backpressure policy, one of POLICIES
+            save_image: Function called with (frame, filepath, scale) to encode
+                and write one screenshot; defaults to a PNG via PIL
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+
+        self.policy = policy
+        self.save_image = save_image or self._save_png
+        self.dropped_count = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = {}  # filepath -> job, for wait_for()
+        self._finished = {}  # seq -> job, finished but not yet committed
+        self._next_seq = 0
+        self._next_commit = 0
+        self._submit_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._workers = []
+
+        for i in range(workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"step-writer-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    @staticmethod
+    def _save_png(frame, filepath, scale=1.0):
+        """Default encoder: save the frame as a PNG"""
+        image = frame.to_pil()
+        if scale != 1.0:
+            width, height = image.size
+            image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))))
+        image.save(filepath)
+
+    def submit(self, job: StepWriteJob) -> StepWriteJob:
+        """Queue a step for writing, applying the backpressure policy
+
+        Args:
+            job: The job to queue
+
+        Returns:
+            StepWriteJob: The same job, so callers can wait() on it
+        """
+        with self._submit_lock:
+            job.seq = self._next_seq
+            self._next_seq += 1
+            if job.filepath:
+                with self._pending_lock:
+                    self._pending[job.filepath] = job
+
+            if self.policy == "drop_oldest":
+                while True:
+                    try:
+                        self._queue.put_nowait(job)
+                        break
+                    except queue.Full:
+                        self._drop_oldest()
+            else:
+                if self.policy == "downsample" and self._queue.qsize() >= self._queue.maxsize // 2:
+                    job.scale = 0.5
+                self._queue.put(job)
+
+        return job
+
+    def _drop_oldest(self):
+        """Discard the oldest queued job to make room"""
+        try:
+            oldest = self._queue.get_nowait()
+        except queue.Empty:
+            return
+        oldest.dropped = True
+        if oldest.frame is not None:
+            # Later steps must not reference a file that will never exist
+            if oldest.frame.meta.get("step_path") == oldest.filepath:
+                oldest.frame.meta.pop("step_path", None)
+            with self._pending_lock:
+                self._pending.pop(oldest.filepath, None)
+            oldest.filepath = None
+        self.dropped_count += 1
+        self._finish(oldest)
+        self._queue.task_done()
+
+    def _worker_loop(self):
+        """Encode and write queued screenshots until a stop sentinel arrives"""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            try:
+                if job.frame is not None:
+                    self.save_image(job.frame, job.filepath, job.scale)
+            except Exception as e:
+                job.error = e
+                print(f"Error writing step screenshot: {str(e)}")
+            finally:
+                self._finish(job)
+                self._queue.task_done()
+
+    def _finish(self, job: StepWriteJob):
+        """Commit finished jobs in submission order"""
+        with self._commit_lock:
+            self._finished[job.seq] = job
+            while self._next_commit in self._finished:
+                ready = self._finished.pop(self._next_commit)
+                self._commit(ready)
+                self._next_commit += 1
+
+    def _commit(self, job: StepWriteJob):
+        """Append the log entry and notify the callback for one job"""
+        try:
+            entry = job.log_entry
+            if job.dropped:
+                entry = entry.rstrip("\n") + " (screenshot dropped)\n"
+            with open(job.log_path, "a") as log_file:
+                log_file.write(entry)
+        except Exception as e:
+            print(f"Error writing execution log: {str(e)}")
+
+        if callable(job.callback):
+            try:
+                job.callback(job.step, job.description, job.filepath)
+            except Exception as e:
+                print(f"Error in step screenshot callback: {str(e)}")
+
+        with self._pending_lock:
+            if job.filepath and self._pending.get(job.filepath) is job:
+                del self._pending[job.filepath]
+        job.frame = None
+        job._done.set()
+
+    def wait_for(self, filepath: str, timeout: Optional[float] = None) -> bool:
+        """Wait until the screenshot for a file path has been written
+
+        Returns:
+            bool: True if the file is written (or was never queued)
+        """
+        with self._pending_lock:
+            job = self._pending.get(filepath)
+        if job is None:
+            return True
+        return job.wait(timeout)
+
+    def flush(self):
+        """Block until every queued screenshot is written and logged"""
+        self._queue.join()
+
+    def close(self):
+        """Flush the queue and stop the writer threads"""
+        self.flush()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
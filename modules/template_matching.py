@@ -0,0 +1,239 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _match_executor() -> ThreadPoolExecutor:
+    """Shared worker pool for matching many templates at once"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1),
+                                           thread_name_prefix="template-match")
+        return _executor
+
+
+def match_template(image: np.ndarray, template: np.ndarray, threshold: float = 0.8,
+                   method: int = cv2.TM_CCOEFF_NORMED,
+                   mask: Optional[np.ndarray] = None) -> Optional[Tuple[float, Tuple[int, int, int, int]]]:
+    """Find the best match of a template in an image
+
+    Args:
+        image: Image to search (grayscale or BGR, same type as template)
+        template: Template to look for
+        threshold: Minimum normalized score to accept
+        method: OpenCV matching method (a normalized correlation method)
+        mask: Only compare the template pixels where mask is non-zero
+
+    Returns:
+        tuple: (score, (x, y, width, height)) in image coordinates, or None
+            if the best score is below threshold or the template doesn't fit
+    """
+    height, width = template.shape[:2]
+    if image.shape[0] < height or image.shape[1] < width:
+        return None
+
+    result = cv2.matchTemplate(image, template, method, mask=mask)
+    if mask is not None:
+        # Masked scores divide by the variance under the mask, which is zero
+        # (giving NaN or inf) wherever the screen is flat there
+        result[~np.isfinite(result)] = -1.0
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    if not max_val >= threshold:  # Also rejects NaN from flat images
+        return None
+    return float(max_val), (max_loc[0], max_loc[1], width, height)
+
+
+def locate_in_frame(frame, template, threshold: float = 0.8, color: bool = False):
+    """Find a Template in a Frame and return the match in screen coordinates
+
+    Args:
+        frame: Frame (or cropped region of one) to search
+        template: Template from the TemplateStore
+        threshold: Minimum normalized score to accept
+        color: Match BGR pixels instead of grayscale
+
+    Returns:
+        tuple: (score, (x, y, width, height)) in screen coordinates, or None
+    """
+    if color:
+        match = match_template(frame.to_bgr(), template.color, threshold, mask=template.mask)
+    else:
+        match = match_template(frame.to_gray(), template.gray, threshold, mask=template.mask)
+    if match is None:
+        return None
+    score, (x, y, width, height) = match
+    return score, (x + frame.left, y + frame.top, width, height)
+
+
+def derive_thresholds(bests: List[float], runners: List[float], default: float = 0.8, min_samples: int = 5,
+                      margin: float = 0.05) -> Tuple[float, Optional[float]]:
+    """Work out an element's match threshold from its past match scores
+
+    The two histories are kept apart because scans that stop early only
+    see the best score: mixing them would let early stops push the
+    runner-ups out of a shared window and drop the element back to the
+    default threshold.
+
+    Args:
+        bests: Best scores of past successful lookups
+        runners: Best scores away from the match, from scans that ran to
+            the end
+        default: Threshold to use until there is enough history
+        min_samples: Lookups needed before the history is trusted
+        margin: Gap kept above the strongest runner-up ever seen
+
+    Returns:
+        tuple: (threshold, accept_score) - the threshold sits halfway between
+            the weakest real matches and the strongest false candidates; a
+            score of accept_score or more beats every runner-up seen so far,
+            so a scan can stop there. accept_score is None until both
+            distributions are known and clearly apart.
+    """
+    if len(bests) < min_samples or len(runners) < min_samples:
+        return default, None
+    low_best = float(np.percentile(bests, 10))
+    high_runner = float(np.percentile(runners, 90))
+    if low_best - high_runner < 2 * margin:
+        return default, None  # Real and false matches overlap, keep the safe default
+    threshold = min(0.98, max(0.5, (low_best + high_runner) / 2))
+    accept_score = min(0.99, max(threshold, max(runners) + margin))
+    return threshold, accept_score
+
+
+def scan_template(frame, template, threshold: float = 0.8, accept_score: Optional[float] = None,
+                  start_y: Optional[int] = None, color: bool = False, band_rows: int = 256):
+    """Match a Template against a Frame band by band, stopping at a clear winner
+
+    Without accept_score the whole response map is computed at once. With
+    it, the frame is matched in horizontal bands, starting with the band
+    around start_y (e.g. where the element was last seen), and the scan
+    stops as soon as a score reaches accept_score.
+
+    Args:
+        frame: Frame (or cropped region of one) to search
+        template: Template from the TemplateStore
+        threshold: Minimum normalized score to accept
+        accept_score: Score that wins outright, see derive_thresholds
+        start_y: Screen y coordinate to start scanning at
+        color: Match BGR pixels instead of grayscale
+        band_rows: Response map rows computed per band
+
+    Returns:
+        tuple: (match, best, runner_up) - match is (score, (x, y, width,
+            height)) in screen coordinates or None, best the highest score
+            seen, runner_up the best score away from it (None if the scan
+            stopped early)
+    """
+    image = frame.to_bgr() if color else frame.to_gray()
+    pixels = template.color if color else template.gray
+    height, width = pixels.shape[:2]
+    if image.shape[0] < height or image.shape[1] < width:
+        return None, None, None
+
+    rows = image.shape[0] - height + 1
+    bands = [(y, min(rows, y + band_rows)) for y in range(0, rows, band_rows)] if accept_score else [(0, rows)]
+    if start_y is not None:
+        center = start_y - frame.top
+        bands.sort(key=lambda band: abs((band[0] + band[1]) / 2 - center))
+
+    best, best_loc = -1.0, None
+    results = []
+    for y0, y1 in bands:
+        result = cv2.matchTemplate(image[y0:y1 + height - 1], pixels, cv2.TM_CCOEFF_NORMED, mask=template.mask)
+        if template.mask is not None:
+            result[~np.isfinite(result)] = -1.0
+        _, score, _, (x, y) = cv2.minMaxLoc(result)
+        if score > best:
+            best, best_loc = score, (x, y + y0)
+        results.append((y0, result))
+        if accept_score is not None and best >= accept_score:
+            break
+
+    match = None
+    if best >= threshold:
+        match = float(best), (best_loc[0] + frame.left, best_loc[1] + frame.top, width, height)
+    if len(results) < len(bands):
+        return match, float(best), None
+
+    # Full map: the runner-up is the best score outside the winner's neighbourhood
+    response = np.vstack([result for _, result in sorted(results, key=lambda item: item[0])])
+    x, y = best_loc
+    response[max(0, y - height // 2):y + height // 2 + 1, max(0, x - width // 2):x + width // 2 + 1] = -1.0
+    return match, float(best), float(response.max())
+
+
+def locate_near(frame, template, box: Tuple[int, int, int, int], margin: int = 32,
+                threshold: float = 0.8, color: bool = False):
+    """Find a Template where it was last seen, or close to it
+
+    First checks that the pixels at box still match the template (a single
+    same-size comparison), then searches box grown by margin on each side.
+    Both are tiny next to a full-screen scan.
+
+    Args:
+        frame: Frame (or cropped region of one) to search
+        template: Template from the TemplateStore
+        box: Last known location (x, y, width, height) in screen coordinates
+        margin: Pixels around box to search if the element moved slightly
+        threshold: Minimum normalized score to accept
+        color: Match BGR pixels instead of grayscale
+
+    Returns:
+        tuple: (score, (x, y, width, height)) in screen coordinates, or None
+    """
+    x, y, width, height = box
+    if (width, height) != (template.width, template.height):
+        return None
+
+    spot = frame.crop(box)
+    if (spot.width, spot.height) == (width, height):
+        match = locate_in_frame(spot, template, threshold, color)
+        if match is not None:
+            return match
+
+    area = frame.crop((x - margin, y - margin, width + 2 * margin, height + 2 * margin))
+    if area.width < width or area.height < height:
+        return None
+    return locate_in_frame(area, template, threshold, color)
+
+
+def locate_all(frame, templates: Dict[str, object], threshold: Union[float, Dict[str, float]] = 0.8,
+               color: bool = False) -> Dict[str, Optional[tuple]]:
+    """Find several Templates in one Frame using worker threads
+
+    cv2.matchTemplate releases the GIL, so the templates are matched in
+    parallel against the same pixels. The frame's grayscale (or BGR) copy
+    is made once up front and shared by every worker.
+
+    Args:
+        frame: Frame (or cropped region of one) to search
+        templates: Templates from the TemplateStore by name
+        threshold: Minimum normalized score to accept, or one per name
+        color: Match BGR pixels instead of grayscale
+
+    Returns:
+        dict: name -> (score, (x, y, width, height)) in screen coordinates,
+            or None for templates that weren't found
+    """
+    image = frame.to_bgr() if color else frame.to_gray()
+
+    def locate(name, template):
+        limit = threshold[name] if isinstance(threshold, dict) else threshold
+        match = match_template(image, template.color if color else template.gray, limit, mask=template.mask)
+        if match is None:
+            return None
+        score, (x, y, width, height) = match
+        return score, (x + frame.left, y + frame.top, width, height)
+
+    if len(templates) <= 1:
+        return {name: locate(name, template) for name, template in templates.items()}
+    futures = {name: _match_executor().submit(locate, name, template) for name, template in templates.items()}
+    return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,255 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import cv2
+import numpy as np
+
+
+def alpha_mask(image: np.ndarray) -> Optional[np.ndarray]:
+    """Mask of the opaque pixels of a BGRA image, or None if it has no transparency"""
+    if image.ndim != 3 or image.shape[2] != 4:
+        return None
+    alpha = image[:, :, 3]
+    if alpha.min() >= 250:
+        return None
+    mask = np.where(alpha >= 128, 255, 0).astype(np.uint8)
+    return mask if np.count_nonzero(mask) >= 16 else None
+
+
+def background_mask(color: np.ndarray, tolerance: int = 12) -> Optional[np.ndarray]:
+    """Guess which pixels of a capture are background and mask them out
+
+    UI element captures usually have a border of plain background (the
+    wallpaper or toolbar around an icon). The background colour is taken
+    from the border; pixels close to it that connect to the border are
+    masked out, so enclosed areas of the same colour inside the element
+    are kept.
+
+    Args:
+        color: BGR template image
+        tolerance: Maximum per-channel difference from the background colour
+
+    Returns:
+        np.ndarray: 255 for element pixels, 0 for background, or None if the
+            border isn't a plain colour or the mask would be useless
+    """
+    height, width = color.shape[:2]
+    if min(height, width) < 8:
+        return None
+    border = np.concatenate([color[0], color[-1], color[:, 0], color[:, -1]])
+    background = np.median(border, axis=0)
+    if np.mean(np.all(np.abs(border - background) <= tolerance, axis=1)) < 0.6:
+        return None
+
+    near = np.all(np.abs(color.astype(np.int16) - background) <= tolerance, axis=2).astype(np.uint8)
+    _, labels = cv2.connectedComponents(near, connectivity=4)
+    edge_labels = np.unique(np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]]))
+    edge_labels = edge_labels[edge_labels != 0]  # Label 0 is the non-background pixels
+    is_background = np.isin(labels, edge_labels) & (near == 1)
+
+    kept = 1.0 - np.mean(is_background)
+    if kept < 0.1 or kept > 0.97:
+        return None
+    return np.where(is_background, 0, 255).astype(np.uint8)
+
+
+class Template:
+    """A UI element image decoded once, with the variants matchers need"""
+
+    def __init__(self, path: str, image: np.ndarray, mtime: float, pyramid_levels: int = 3,
+                 auto_mask: bool = False):
+        """Build the template variants
+
+        Args:
+            path: Image file the template was loaded from
+            image: Decoded image as BGR (or BGRA) array
+            mtime: Modification time of the file when it was read
+            pyramid_levels: Number of half-size levels to precompute
+            auto_mask: Without an alpha channel, mask out the plain background
+                around the element (see background_mask)
+        """
+        self.path = path
+        self.mtime = mtime
+        if image.ndim == 2:
+            self.color = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        else:
+            self.color = np.ascontiguousarray(image[:, :, :3])
+        # Pixels that belong to the element (255) - matching ignores the rest
+        self.mask = alpha_mask(image)
+        if self.mask is None and auto_mask:
+            self.mask = background_mask(self.color)
+        self.gray = cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+        self.edges = cv2.Canny(self.gray, 50, 150)
+        # pyramid[0] is the full-size grayscale image, each level half the previous one
+        self.pyramid: List[np.ndarray] = [self.gray]
+        for _ in range(pyramid_levels):
+            level = self.pyramid[-1]
+            if min(level.shape[:2]) < 16:
+                break
+            self.pyramid.append(cv2.pyrDown(level))
+        # Keypoints and descriptors by feature matcher name, filled in on first use
+        self.features: Dict[str, tuple] = {}
+        self._pyramid_levels = pyramid_levels
+        self._auto_mask = auto_mask
+        self._scaled: Dict[float, "Template"] = {}
+        self.scale = 1.0  # Resize factor relative to the image file
+
+    def scaled(self, scale: float) -> "Template":
+        """Get this template resized by scale (e.g. for a monitor with other DPI)
+
+        Scaled copies are built once and kept with the template.
+        """
+        if scale == 1.0:
+            return self
+        template = self._scaled.get(scale)
+        if template is None:
+            size = (max(1, round(self.width * scale)), max(1, round(self.height * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            image = cv2.resize(self.color, size, interpolation=interpolation)
+            if self.mask is not None:
+                mask = cv2.resize(self.mask, size, interpolation=cv2.INTER_NEAREST)
+                image = np.dstack([image, mask])
+            template = Template(self.path, image, self.mtime, self._pyramid_levels, self._auto_mask)
+            template.scale = self.scale * scale
+            self._scaled[scale] = template
+        return template
+
+    @property
+    def width(self) -> int:
+        return self.gray.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.gray.shape[0]
+
+
+class TemplateStore:
+    """In-memory library of decoded UI element templates
+
+    Each image is read and decoded once; later lookups get the cached
+    Template. Entries are reloaded when the file's modification time
+    changes, which is checked at most every check_interval seconds per
+    entry so repeated lookups of the same element do no file I/O at all.
+    """
+
+    def __init__(self, pyramid_levels: int = 3, check_interval: float = 2.0, auto_mask: bool = False):
+        """Initialize the store
+
+        Args:
+            pyramid_levels: Number of half-size levels built per template
+            check_interval: Seconds between modification-time checks of an entry
+            auto_mask: Mask out the plain background of templates without
+                an alpha channel (PNGs with transparency always use it)
+        """
+        self.pyramid_levels = pyramid_levels
+        self.auto_mask = auto_mask
+        self.check_interval = check_interval
+        self.loads = 0
+        self.hits = 0
+        self._templates: Dict[str, Template] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, path: str) -> Optional[Template]:
+        """Read and decode one image file"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            print(f"Image file not found: {path}")
+            return None
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            print(f"Could not load template: {path}")
+            return None
+        if image.dtype != np.uint8:
+            image = cv2.convertScaleAbs(image, alpha=255.0 / np.iinfo(image.dtype).max)
+        self.loads += 1
+        return Template(path, image, mtime, self.pyramid_levels, self.auto_mask)
+
+    def get(self, path: str) -> Optional[Template]:
+        """Get the template for an image file, loading it if needed
+
+        Args:
+            path: Path of the UI element image
+
+        Returns:
+            Template: The decoded template, or None if the file can't be read
+        """
+        key = os.path.abspath(path)
+        now = time.monotonic()
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None and now - self._checked.get(key, 0.0) < self.check_interval:
+                self.hits += 1
+                return template
+
+        if template is not None:
+            try:
+                if os.path.getmtime(key) == template.mtime:
+                    with self._lock:
+                        self._checked[key] = now
+                        self.hits += 1
+                    return template
+            except OSError:
+                pass
+
+        # Not loaded yet, or the file changed (or vanished) since it was loaded
+        template = self._load(key)
+        with self._lock:
+            if template is None:
+                self._templates.pop(key, None)
+                self._checked.pop(key, None)
+            else:
+                self._templates[key] = template
+                self._checked[key] = now
+        return template
+
+    def add(self, path: str) -> Optional[Template]:
+        """Load (or reload) an image into the store"""
+        self.remove(path)
+        return self.get(path)
+
+    def preload(self, paths: Iterable[str]) -> int:
+        """Load several images up front
+
+        Returns:
+            int: Number of templates loaded successfully
+        """
+        return sum(1 for path in paths if self.get(path) is not None)
+
+    def remove(self, path: str):
+        """Forget the template for an image file"""
+        key = os.path.abspath(path)
+        with self._lock:
+            self._templates.pop(key, None)
+            self._checked.pop(key, None)
+
+    def set_auto_mask(self, enabled: bool = True):
+        """Turn background masking of opaque templates on or off
+
+        Cached templates are dropped so they are rebuilt with the new setting.
+        """
+        self.auto_mask = enabled
+        self.clear()
+
+    def clear(self):
+        """Forget every template"""
+        with self._lock:
+            self._templates.clear()
+            self._checked.clear()
+
+    def get_stats(self) -> dict:
+        """Get load/hit counters and the memory used by cached variants"""
+        with self._lock:
+            templates = list(self._templates.values())
+        memory = sum(t.color.nbytes + t.edges.nbytes + sum(level.nbytes for level in t.pyramid)
+                     + (t.mask.nbytes if t.mask is not None else 0) for t in templates)
+        return {
+            "templates": len(templates),
+            "masked": sum(1 for t in templates if t.mask is not None),
+            "loads": self.loads,
+            "hits": self.hits,
+            "memory_bytes": memory,
+        }
@@ -0,0 +1,325 @@
+import bisect
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+
+from modules.fuzzy_text import FuzzyTextMatcher
+
+Box = Tuple[int, int, int, int]  # (x, y, width, height) in screen coordinates
+
+_EDGE_PUNCTUATION = re.compile(r"^\W+|\W+$")
+
+
+def normalize_token(text: str) -> str:
+    """Lookup key of an OCR word: case-folded, without surrounding punctuation"""
+    return _EDGE_PUNCTUATION.sub("", text.casefold())
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a phrase into lookup keys"""
+    return [key for key in (normalize_token(part) for part in text.split()) if key]
+
+
+def _distance(point: Tuple[float, float], box: Box) -> float:
+    """Distance from a point to the nearest edge of a box (0 inside it)"""
+    x, y, w, h = box
+    dx = max(x - point[0], 0, point[0] - (x + w))
+    dy = max(y - point[1], 0, point[1] - (y + h))
+    return math.hypot(dx, dy)
+
+
+def _union(boxes) -> Box:
+    x1 = min(b[0] for b in boxes)
+    y1 = min(b[1] for b in boxes)
+    x2 = max(b[0] + b[2] for b in boxes)
+    y2 = max(b[1] + b[3] for b in boxes)
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
+class TextWord:
+    """One OCR word in screen coordinates"""
+
+    __slots__ = ("text", "key", "box", "conf", "line", "position")
+
+    def __init__(self, text: str, box: Box, conf: float):
+        self.text = text
+        self.key = normalize_token(text)
+        self.box = box
+        self.conf = conf
+        self.line = None  # TextLine the word belongs to
+        self.position = 0  # Index of the word in its line
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x, y, w, h = self.box
+        return (x + w // 2, y + h // 2)
+
+    def __repr__(self):
+        return f"TextWord({self.text!r}, {self.box})"
+
+
+class TextSpan:
+    """Consecutive words of one line, e.g. a matched phrase"""
+
+    def __init__(self, words: List[TextWord]):
+        self.words = words
+        self.box = _union([word.box for word in words])
+
+    @property
+    def text(self) -> str:
+        return " ".join(word.text for word in self.words)
+
+    @property
+    def conf(self) -> float:
+        return min(word.conf for word in self.words)
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x, y, w, h = self.box
+        return (x + w // 2, y + h // 2)
+
+    def __repr__(self):
+        return f"TextSpan({self.text!r}, {self.box})"
+
+
+class TextLine(TextSpan):
+    """All words of one OCR line, left to right"""
+
+
+class ScreenTextIndex:
+    """Words from one OCR pass, indexed for many text queries
+
+    Built once per frame from image_to_data output; a workflow that looks
+    up several labels on the same screen then runs OCR once. Words are
+    grouped into lines (Tesseract's block/paragraph/line numbers), keyed
+    by normalized token for exact and prefix lookups, and bucketed in a
+    grid for position queries. Phrases are matched along lines, so
+    multi-word labels ("Save as PDF") are found as one span.
+    """
+
+    def __init__(self, data: Dict[str, list], offset: Tuple[int, int] = (0, 0), min_conf: float = 0,
+                 cell_size: int = 64):
+        """Build the index
+
+        Args:
+            data: OCR word boxes in pytesseract's Output.DICT layout
+            offset: Screen position of the OCRed image's top-left corner
+            min_conf: Ignore words with a lower confidence
+            cell_size: Grid cell size in pixels for position queries
+        """
+        self.cell_size = cell_size
+        self.words: List[TextWord] = []
+        self.lines: List[TextLine] = []
+        self._by_key: Dict[str, List[TextWord]] = {}
+        self._grid: Dict[Tuple[int, int], List[TextWord]] = {}
+        self._max_extent = 0.0  # Largest center-to-corner distance of a word, bounds the grid search
+        self._matcher = None  # FuzzyTextMatcher, built on the first fuzzy lookup
+
+        grouped = {}
+        for i, text in enumerate(data.get("text", ())):
+            text = str(text).strip()
+            conf = float(data["conf"][i])
+            if not text or conf < min_conf:
+                continue
+            box = (data["left"][i] + offset[0], data["top"][i] + offset[1], data["width"][i], data["height"][i])
+            word = TextWord(text, box, conf)
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            grouped.setdefault(key, []).append(word)
+
+        for key in sorted(grouped):
+            words = sorted(grouped[key], key=lambda word: word.box[0])
+            line = TextLine(words)
+            for position, word in enumerate(words):
+                word.line = line
+                word.position = position
+                self._add(word)
+            self.lines.append(line)
+        self.lines.sort(key=lambda line: (line.box[1], line.box[0]))
+        self._keys = sorted(self._by_key)  # For prefix lookups
+
+    def _add(self, word: TextWord):
+        self.words.append(word)
+        if word.key:
+            self._by_key.setdefault(word.key, []).append(word)
+        cx, cy = word.center
+        self._grid.setdefault((cx // self.cell_size, cy // self.cell_size), []).append(word)
+        self._max_extent = max(self._max_extent, math.hypot(word.box[2], word.box[3]) / 2)
+
+    def __len__(self):
+        return len(self.words)
+
+    def exact(self, text: str) -> List[TextWord]:
+        """Words equal to text (ignoring case and surrounding punctuation)"""
+        return list(self._by_key.get(normalize_token(text), ()))
+
+    def prefix(self, text: str) -> List[TextWord]:
+        """Words starting with text"""
+        start = normalize_token(text)
+        words = []
+        for key in self._keys[bisect.bisect_left(self._keys, start):]:
+            if not key.startswith(start):
+                break
+            words.extend(self._by_key[key])
+        return words
+
+    def phrase(self, text: str) -> List[TextSpan]:
+        """Runs of consecutive words on one line matching the words of text"""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        spans = []
+        for first in self._by_key.get(tokens[0], ()):
+            words = first.line.words[first.position:first.position + len(tokens)]
+            if len(words) == len(tokens) and all(word.key == token for word, token in zip(words, tokens)):
+                spans.append(TextSpan(words))
+        return spans
+
+    def contains(self, text: str) -> List[TextSpan]:
+        """Spans of words whose line text contains text (case-insensitive)
+
+        Catches partial words ("Sav" in "Save") and phrases that OCR split
+        or joined differently from the query.
+        """
+        target = text.casefold().strip()
+        if not target:
+            return []
+        spans = []
+        for line in self.lines:
+            starts = []
+            joined = ""
+            for word in line.words:
+                starts.append(len(joined))
+                joined += word.text.casefold() + " "
+            index = joined.find(target)
+            while index != -1:
+                end = index + len(target)
+                words = [word for word, start in zip(line.words, starts)
+                         if start < end and start + len(word.text) > index]
+                spans.append(TextSpan(words))
+                index = joined.find(target, index + 1)
+        return spans
+
+    def find(self, text: str) -> List[TextSpan]:
+        """Whole-word phrase matches, else substring matches, in reading order"""
+        spans = self.phrase(text) or self.contains(text)
+        return sorted(spans, key=lambda span: (span.box[1], span.box[0]))
+
+    def fuzzy(self, text: str, min_score: float = 0.7, limit: int = 5) -> List[Tuple[float, TextSpan]]:
+        """Spans similar to text, for OCR misreadings and typos
+
+        Args:
+            text: Word or phrase to look for
+            min_score: Lowest similarity kept (1 - edit distance / length)
+            limit: Most candidates returned
+
+        Returns:
+            list: (score, span) pairs, best first
+        """
+        if self._matcher is None:
+            self._matcher = FuzzyTextMatcher([[word.key for word in line.words] for line in self.lines])
+        return [(score, TextSpan(self.lines[line].words[start:end]))
+                for score, line, start, end in self._matcher.match(tokenize(text), min_score, limit)]
+
+    def locate(self, text: str) -> Optional[Tuple[int, int]]:
+        """Center of the first match of text, or None"""
+        spans = self.find(text)
+        return spans[0].center if spans else None
+
+    def words_in(self, region: Box) -> List[TextWord]:
+        """Words whose centers lie in region (x, y, width, height)"""
+        x, y, w, h = region
+        cell = self.cell_size
+        words = []
+        for gx in range(x // cell, (x + w) // cell + 1):
+            for gy in range(y // cell, (y + h) // cell + 1):
+                for word in self._grid.get((gx, gy), ()):
+                    cx, cy = word.center
+                    if x <= cx < x + w and y <= cy < y + h:
+                        words.append(word)
+        return sorted(words, key=lambda word: (word.box[1], word.box[0]))
+
+    def nearest(self, target, text: Optional[str] = None, max_distance: Optional[float] = None):
+        """Text closest to a point or an element box
+
+        Args:
+            target: Point (x, y) or box (x, y, width, height)
+            text: Only consider matches of this text (see find)
+            max_distance: Ignore anything farther away than this
+
+        Returns:
+            TextWord or TextSpan: The closest word (or match of text), or None
+        """
+        if len(target) == 4:
+            x, y, w, h = target
+            point, slack = (x + w / 2, y + h / 2), math.hypot(w, h) / 2
+        else:
+            point, slack = tuple(target), 0.0
+
+        def distance(item):
+            # Edge-to-edge for boxes: subtract the target's own half-diagonal
+            return max(0.0, _distance(point, item.box) - slack)
+
+        if text is not None:
+            candidates = self.find(text)
+        else:
+            candidates = self._grid_candidates(point, slack, max_distance)
+        best, best_distance = None, math.inf
+        for item in candidates:
+            d = distance(item)
+            if d < best_distance:
+                best, best_distance = item, d
+        if best is None or (max_distance is not None and best_distance > max_distance):
+            return None
+        return best
+
+    def _grid_candidates(self, point, slack: float, max_distance: Optional[float]) -> List[TextWord]:
+        """Words in grid rings around point, out to where nothing closer can be"""
+        if not self.words:
+            return []
+        cell = self.cell_size
+        cx, cy = int(point[0]) // cell, int(point[1]) // cell
+        limit = max(max(abs(gx - cx), abs(gy - cy)) for gx, gy in self._grid)
+        found, reach = [], math.inf
+        for ring in range(0, limit + 1):
+            # Closest any word centred in this ring can be
+            bound = (ring - 1) * cell - self._max_extent
+            if bound > reach or (max_distance is not None and bound - slack > max_distance):
+                break
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for word in self._grid.get((gx, gy), ()):
+                        found.append(word)
+                        reach = min(reach, _distance(point, word.box))
+        return found
+
+
+def build_text_index(frame, engine, config: str = "--oem 3 --psm 11", threshold: Optional[int] = 150,
+                     min_conf: float = 0) -> ScreenTextIndex:
+    """Get the text index of a Frame, running OCR only the first time
+
+    The index is kept in the frame's meta dict, so every lookup on the same
+    capture shares one OCR pass.
+
+    Args:
+        frame: Frame (or cropped region of one) to read
+        engine: OCR engine with image_to_data (OCREngine or TiledOCR)
+        config: Tesseract options
+        threshold: Binarize the grayscale image at this level first (None to skip)
+        min_conf: Ignore words with a lower confidence
+
+    Returns:
+        ScreenTextIndex: Words in screen coordinates
+    """
+    key = ("text_index", config, threshold, min_conf, getattr(engine, "name", type(engine).__name__))
+    index = frame.meta.get(key)
+    if index is None:
+        gray = frame.to_gray()
+        if threshold is not None:
+            _, gray = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+        index = ScreenTextIndex(engine.image_to_data(gray, config=config), (frame.left, frame.top), min_conf)
+        frame.meta[key] = index
+    return index
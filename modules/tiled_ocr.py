@@ -0,0 +1,216 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from modules.ocr_engine import TSV_COLUMNS, OCRCache, as_ocr_array, create_ocr_engine, get_ocr_engine
+
+_worker_engine = None  # OCR engine of a pool worker process, loaded once per process
+
+
+def _init_worker(engine_name: Optional[str], lang: str):
+    """Load the OCR engine in a pool worker"""
+    global _worker_engine
+    _worker_engine = create_ocr_engine(engine_name, lang=lang)
+    _worker_engine.cache = None  # Whole images are cached in the parent
+
+
+def _ocr_tile(tile: np.ndarray, config: str) -> Dict[str, list]:
+    """OCR one tile in a pool worker"""
+    return _worker_engine.image_to_data(tile, config=config)
+
+
+def tile_grid(width: int, height: int, tile_size: Tuple[int, int], overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Split an image into overlapping tiles
+
+    Args:
+        width: Image width
+        height: Image height
+        tile_size: (width, height) of a tile, not counting the overlap
+        overlap: Pixels each tile extends into its neighbours
+
+    Returns:
+        list: Tile rectangles (x, y, width, height) covering the image
+    """
+    tiles = []
+    step_x, step_y = tile_size
+    for top in range(0, height, step_y):
+        for left in range(0, width, step_x):
+            x1, y1 = max(0, left - overlap), max(0, top - overlap)
+            x2, y2 = min(width, left + step_x + overlap), min(height, top + step_y + overlap)
+            tiles.append((x1, y1, x2 - x1, y2 - y1))
+    return tiles
+
+
+class TiledOCR:
+    """OCR a large image as overlapping tiles across a process pool
+
+    Tesseract uses one core per image, so a full-screen page segmentation
+    run on a 4K screenshot leaves the other cores idle. The image is cut
+    into tiles that overlap by more than a line of text, each tile is
+    OCRed in a worker process that keeps its own engine loaded, and the
+    word boxes are shifted back to image coordinates. Words cut by a tile
+    edge are dropped (the neighbouring tile sees them whole), and words
+    found by two tiles in the overlap are merged, keeping the more
+    confident reading.
+
+    image_to_data returns word rows (level 5) in pytesseract's Output.DICT
+    layout. Block numbers are made unique per tile, so a line of text that
+    crosses a tile boundary comes back as two lines.
+    """
+
+    def __init__(self, tile_size: Tuple[int, int] = (1024, 768), overlap: int = 96,
+                 workers: Optional[int] = None, engine_name: Optional[str] = None, lang: str = "eng",
+                 cache: Optional[OCRCache] = None):
+        """Initialize tiled OCR (the pool starts on first use)
+
+        Args:
+            tile_size: (width, height) of a tile before adding the overlap
+            overlap: Pixels each tile extends into its neighbours; should
+                exceed the widest word and tallest line expected
+            workers: Worker processes; defaults to the number of CPUs
+            engine_name: OCR engine used by the workers (see create_ocr_engine)
+            lang: Tesseract language(s)
+            cache: Result cache for whole images; a default-sized one if None
+        """
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.workers = workers or os.cpu_count() or 1
+        self.engine_name = engine_name
+        self.lang = lang
+        self.cache = cache if cache is not None else OCRCache()
+        self.calls = 0
+        self.tiles = 0
+        self.skipped_tiles = 0
+        self.total_time = 0.0
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.engine_name, self.lang))
+            return self._pool
+
+    def image_to_data(self, image, config: str = "") -> Dict[str, list]:
+        """Word boxes of an image, OCRed tile by tile in parallel
+
+        Args:
+            image: PIL image or array (gray, RGB or RGBA)
+            config: Tesseract options, e.g. "--oem 3 --psm 11"
+
+        Returns:
+            dict: Word rows keyed like pytesseract.image_to_data's Output.DICT
+        """
+        array = as_ocr_array(image)
+        key = None
+        if self.cache is not None:
+            key = OCRCache.key("tiled", array, config, self.lang)
+            data = self.cache.get(key)
+            if data is not None:
+                return {column: list(values) for column, values in data.items()}
+
+        start = time.perf_counter()
+        height, width = array.shape[:2]
+        tiles = tile_grid(width, height, self.tile_size, self.overlap)
+        skipped = 0
+        if len(tiles) == 1:
+            # Nothing to split - the in-process engine is faster than a round trip to a worker
+            results = [(tiles[0], get_ocr_engine().image_to_data(array, config=config))]
+        else:
+            pool = self._get_pool()
+            futures = []
+            for x, y, w, h in tiles:
+                tile = array[y:y + h, x:x + w]
+                if int(tile.max()) - int(tile.min()) < 16:
+                    skipped += 1  # Flat area, no text to find
+                    continue
+                futures.append(((x, y, w, h), pool.submit(_ocr_tile, np.ascontiguousarray(tile), config)))
+            results = [(rect, future.result()) for rect, future in futures]
+        data = self._merge(results, width, height)
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.tiles += len(tiles)
+            self.skipped_tiles += skipped
+            self.total_time += elapsed
+        if key is not None:
+            self.cache.put(key, data, elapsed)
+        return {column: list(values) for column, values in data.items()}
+
+    def _merge(self, results, width: int, height: int) -> Dict[str, list]:
+        """Shift tile word boxes to image coordinates and drop seam duplicates"""
+        words = []  # (x, y, w, h, conf, text, block, par, line, word)
+        for index, ((tile_x, tile_y, tile_w, tile_h), data) in enumerate(results):
+            for i, text in enumerate(data["text"]):
+                if data["level"][i] != 5 or not str(text).strip():
+                    continue
+                x, y, w, h = data["left"][i], data["top"][i], data["width"][i], data["height"][i]
+                # A word touching an inner tile edge may be cut off; the neighbour has all of it
+                if ((x <= 1 and tile_x > 0) or (y <= 1 and tile_y > 0)
+                        or (x + w >= tile_w - 1 and tile_x + tile_w < width)
+                        or (y + h >= tile_h - 1 and tile_y + tile_h < height)):
+                    continue
+                words.append((x + tile_x, y + tile_y, w, h, float(data["conf"][i]), text,
+                              index * 1000 + data["block_num"][i], data["par_num"][i],
+                              data["line_num"][i], data["word_num"][i]))
+
+        # The same word read by two overlapping tiles: keep the more confident one
+        words.sort(key=lambda word: word[4], reverse=True)
+        kept = []
+        if words:
+            boxes = np.array([word[:4] for word in words], dtype=np.int64)
+            suppressed = np.zeros(len(words), dtype=bool)
+            for i, word in enumerate(words):
+                if suppressed[i]:
+                    continue
+                kept.append(word)
+                x, y, w, h = word[:4]
+                inter_w = np.clip(np.minimum(x + w, boxes[:, 0] + boxes[:, 2]) - np.maximum(x, boxes[:, 0]), 0, None)
+                inter_h = np.clip(np.minimum(y + h, boxes[:, 1] + boxes[:, 3]) - np.maximum(y, boxes[:, 1]), 0, None)
+                smaller = np.maximum(np.minimum(w * h, boxes[:, 2] * boxes[:, 3]), 1)
+                suppressed |= inter_w * inter_h >= 0.5 * smaller
+
+        kept.sort(key=lambda word: (word[6], word[7], word[8], word[9]))
+        data = {column: [] for column in TSV_COLUMNS}
+        for x, y, w, h, conf, text, block, par, line, number in kept:
+            for column, value in zip(TSV_COLUMNS, (5, 1, block, par, line, number, x, y, w, h, int(conf), text)):
+                data[column].append(value)
+        return data
+
+    def close(self):
+        """Shut down the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def get_stats(self) -> dict:
+        """Get call, tile and cache counters"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "calls": self.calls,
+                "tiles": self.tiles,
+                "skipped_tiles": self.skipped_tiles,
+                "mean_ms": self.total_time / self.calls * 1000 if self.calls else 0.0,
+                "cache": self.cache.get_stats() if self.cache is not None else None,
+            }
+
+
+_shared_tiled = None
+_shared_lock = threading.Lock()
+
+
+def get_tiled_ocr() -> TiledOCR:
+    """Get the process-wide TiledOCR, creating it on first use"""
+    global _shared_tiled
+    with _shared_lock:
+        if _shared_tiled is None:
+            _shared_tiled = TiledOCR()
+        return _shared_tiled
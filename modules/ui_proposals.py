@@ -0,0 +1,250 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from modules.ocr_engine import get_ocr_engine
+
+Box = Tuple[int, int, int, int]  # (x, y, width, height) in pixels
+
+
+def _overlap_ratio(box: Box, boxes: np.ndarray) -> np.ndarray:
+    """Intersection of box with each of boxes, as a fraction of the smaller area"""
+    x, y, w, h = box
+    left = np.maximum(x, boxes[:, 0])
+    top = np.maximum(y, boxes[:, 1])
+    right = np.minimum(x + w, boxes[:, 0] + boxes[:, 2])
+    bottom = np.minimum(y + h, boxes[:, 1] + boxes[:, 3])
+    inter = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    smaller = np.minimum(w * h, boxes[:, 2] * boxes[:, 3])
+    return inter / np.maximum(smaller, 1)
+
+
+def _inside(inner: Box, outer: Box, pad: int = 2) -> bool:
+    """Whether inner lies within outer (allowing pad pixels of slack)"""
+    x, y, w, h = inner
+    ox, oy, ow, oh = outer
+    return x >= ox - pad and y >= oy - pad and x + w <= ox + ow + pad and y + h <= oy + oh + pad
+
+
+class UIProposer:
+    """Propose UI element boxes locally from edges, contours and text
+
+    A CPU replacement for asking a vision model where the widgets are.
+    Outlined controls (buttons, text fields, checkboxes, panels) come from
+    closed edge contours; text and icons come from the foreground left
+    after removing long straight lines, grouped into words and lines. A
+    1080p screen takes tens of milliseconds.
+
+    With use_ocr, buttons, text fields and similar controls also get their
+    captions as labels. Only the control boxes are read, one small
+    single-line OCR call each (up to max_captions), rather than a
+    full-screen pass, which can take seconds on a large screen.
+
+    Results use the vision model's format: dicts with "box_2d" as
+    [x1, y1, x2, y2] normalized to 0-1000 and a "label" string.
+    """
+
+    def __init__(self, min_size: Tuple[int, int] = (10, 8), max_fraction: float = 0.9,
+                 use_ocr: bool = False, max_proposals: int = 200, max_captions: int = 30):
+        """Initialize the proposer
+
+        Args:
+            min_size: Smallest (width, height) in pixels kept as a proposal
+            max_fraction: Drop boxes covering more than this fraction of the screen
+            use_ocr: Read control captions with OCR when Tesseract is available
+            max_proposals: Keep at most this many boxes (largest first)
+            max_captions: Read at most this many control captions per screenshot
+        """
+        self.min_size = min_size
+        self.max_fraction = max_fraction
+        self.use_ocr = use_ocr
+        self.max_proposals = max_proposals
+        self.max_captions = max_captions
+        self._ocr_available = None  # Unknown until the first OCR attempt
+
+    def propose(self, image: np.ndarray) -> List[dict]:
+        """Propose UI element boxes on a screenshot
+
+        Args:
+            image: Screenshot as a BGR, BGRA or grayscale array
+
+        Returns:
+            list: {"box_2d": [x1, y1, x2, y2], "label": str} dicts with
+                coordinates normalized to 0-1000, top to bottom
+        """
+        if image.ndim == 2:
+            gray = image
+        elif image.shape[2] == 4:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+        else:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+
+        blobs = self._foreground_blobs(gray)
+        text_boxes = [box for box in blobs if box[2] >= 1.5 * box[3]]
+        # Squarish foreground blobs that aren't text are icons
+        icons = [box for box in blobs if box[2] < 1.5 * box[3] and max(box[2], box[3]) >= 12
+                 and not any(_inside(box, other) for other in text_boxes)]
+        # Glyph outlines also form closed contours - keep only boxes that aren't part of a text line
+        widgets = [box for box in self._outlined_boxes(gray)
+                   if not any(_inside(box, other) for other in text_boxes)]
+
+        proposals = []
+        controls = []
+        captions = 0
+        for box in self._dedupe(widgets):
+            inner_text = [other for other in text_boxes if _inside(other, box)]
+            kind = self._classify(gray, box, inner_text)
+            caption = ""
+            if kind not in ("window", "panel"):
+                controls.append(box)
+                if inner_text and self.use_ocr and captions < self.max_captions:
+                    caption = self._read_caption(gray, box)
+                    captions += 1
+            proposals.append((box, f'{kind} "{caption}"' if caption else kind))
+        for box in text_boxes:
+            # Text on a control is its caption, not an element of its own
+            if any(_inside(box, other) for other in controls):
+                continue
+            proposals.append((box, "text"))
+        proposals.extend((box, "icon") for box in self._dedupe(icons)
+                         if not any(_inside(box, other) for other in controls))
+
+        proposals.sort(key=lambda item: item[0][2] * item[0][3], reverse=True)
+        proposals = proposals[:self.max_proposals]
+        proposals.sort(key=lambda item: (item[0][1], item[0][0]))
+        return [{"box_2d": self._normalize(box, width, height), "label": label} for box, label in proposals]
+
+    def propose_file(self, path: str) -> Optional[List[dict]]:
+        """Propose UI element boxes on a screenshot file
+
+        Returns:
+            list: Proposals as from propose(), or None if the file can't be read
+        """
+        image = cv2.imread(path, cv2.IMREAD_COLOR)
+        if image is None:
+            print(f"Could not read screenshot: {path}")
+            return None
+        return self.propose(image)
+
+    def _keep(self, box: Box, width: int, height: int) -> bool:
+        """Size filter for candidate boxes"""
+        _, _, w, h = box
+        return (w >= self.min_size[0] and h >= self.min_size[1]
+                and w * h <= self.max_fraction * width * height)
+
+    def _outlined_boxes(self, gray: np.ndarray) -> List[Box]:
+        """Boxes of closed, roughly rectangular outlines (control borders and panels)"""
+        height, width = gray.shape
+        edges = cv2.Canny(gray, 30, 100)
+        edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+        contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for contour in contours:
+            box = cv2.boundingRect(contour)
+            if not self._keep(box, width, height):
+                continue
+            # Rectangles fill their bounding box; glyphs and diagonal strokes don't
+            if cv2.contourArea(contour) >= 0.8 * box[2] * box[3]:
+                boxes.append(box)
+        return boxes
+
+    def _foreground_blobs(self, gray: np.ndarray) -> List[Box]:
+        """Boxes of text words/lines and icons: foreground without long straight lines"""
+        height, width = gray.shape
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        # Borders and separators are long straight runs - text and icons aren't
+        lines = cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((1, 30), np.uint8))
+        lines |= cv2.morphologyEx(binary, cv2.MORPH_OPEN, np.ones((20, 1), np.uint8))
+        binary &= ~lines
+        # Join letters into words and words into lines
+        binary = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, np.ones((3, 9), np.uint8))
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = []
+        for contour in contours:
+            box = cv2.boundingRect(contour)
+            x, y, w, h = box
+            if w <= 3 or h <= 3 or h > 96:
+                continue  # Leftover line stubs, or something too tall to be text or an icon
+            if self._keep(box, width, height):
+                boxes.append(box)
+        return boxes
+
+    def _read_caption(self, gray: np.ndarray, box: Box) -> str:
+        """Read the caption inside a control with the shared OCR engine
+
+        Returns:
+            str: The caption, or "" if there is none or OCR isn't available
+        """
+        if self._ocr_available is False:
+            return ""
+        x, y, w, h = box
+        inner = gray[y + 2:y + h - 2, x + 2:x + w - 2]
+        if inner.size == 0:
+            return ""
+        # Tesseract reads small text better with some margin and a bit larger
+        inner = cv2.copyMakeBorder(inner, 8, 8, 8, 8, cv2.BORDER_REPLICATE)
+        if h < 32:
+            inner = cv2.resize(inner, None, fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
+        try:
+            text = get_ocr_engine().image_to_string(inner, config="--psm 7")
+            self._ocr_available = True
+        except Exception as e:
+            if self._ocr_available is None:
+                print(f"OCR not available for UI proposals, using layout only: {str(e)}")
+            self._ocr_available = False
+            return ""
+        return " ".join(text.split())
+
+    def _classify(self, gray: np.ndarray, box: Box, texts: List[Box]) -> str:
+        """Guess what kind of widget an outlined box is from its shape and contents"""
+        height, width = gray.shape
+        x, y, w, h = box
+        if w >= 0.5 * width or h >= 0.5 * height:
+            return "window"
+        if max(w, h) <= 24 and 0.75 <= w / h <= 1.33:
+            return "checkbox"
+        if h <= 48 and w >= 1.5 * h:
+            inner = gray[y + 2:y + h - 2, x + 2:x + w - 2]
+            if texts:
+                # Captions are centred on buttons, text field contents start at the left
+                first = min(texts)[0]
+                return "text field" if first - x < 0.15 * w and w > 4 * h else "button"
+            # An empty, bright, flat control is a text field waiting for input
+            if inner.size and inner.mean() >= 245 and inner.std() < 8:
+                return "text field"
+            return "button"
+        if max(w, h) <= 96 and 0.5 <= w / h <= 2.0:
+            return "icon"
+        return "panel"
+
+    @staticmethod
+    def _dedupe(boxes: List[Box], overlap: float = 0.85) -> List[Box]:
+        """Drop near-duplicate boxes (e.g. the inner and outer edge of one border)"""
+        if not boxes:
+            return []
+        order = sorted(boxes, key=lambda b: b[2] * b[3], reverse=True)
+        array = np.array(order, dtype=np.int64)
+        areas = array[:, 2] * array[:, 3]
+        corners = np.concatenate([array[:, :2], array[:, :2] + array[:, 2:]], axis=1)
+        kept = []
+        suppressed = np.zeros(len(order), dtype=bool)
+        for i, box in enumerate(order):
+            if suppressed[i]:
+                continue
+            kept.append(box)
+            # Nearly the same box: mostly overlapping and of similar area, or
+            # with every side within a few pixels (small controls)
+            similar = ((_overlap_ratio(box, array) >= overlap) & (areas >= overlap * areas[i])) | \
+                np.all(np.abs(corners - corners[i]) <= 4, axis=1)
+            suppressed |= similar
+        return kept
+
+    @staticmethod
+    def _normalize(box: Box, width: int, height: int) -> List[int]:
+        """Pixel box to [x1, y1, x2, y2] on a 0-1000 scale"""
+        x, y, w, h = box
+        return [int(round(x * 1000 / width)), int(round(y * 1000 / height)),
+                int(round((x + w) * 1000 / width)), int(round((y + h) * 1000 / height))]
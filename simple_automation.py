@@ -1,6 +1,8 @@
 import time, sys
-import numpy as np, cv2, mss
+import cv2
 import pyautogui, pygetwindow as gw
+from modules.screen_capture import MSSCaptureBackend
+from modules.screen_watcher import ScreenWatcher
 
 REMOTE_ID = "1394620449"
 ANYDESK_LAUNCH_WAIT = 3
@@ -11,6 +13,9 @@ pyautogui.FAILSAFE = True
 pyautogui.PAUSE    = 0.25
 
 TEMPLATE = cv2.imread("disconnect_btn.png", cv2.IMREAD_GRAYSCALE)  # red ❌
+CAPTURE  = MSSCaptureBackend(monitor=1)   # one grabber for the whole run
+MONITORS = CAPTURE.monitors()             # every screen, primary first
+WATCHER  = ScreenWatcher(CAPTURE.grab, interval=LOOK_INTERVAL)  # re-matches only changed screens
 
 # ----------------------------------------------------------------------
 def launch_anydesk():
@@ -32,15 +37,34 @@ def dial_id(win):
 def match_toolbar_icon(threshold=0.85):
     if TEMPLATE is None:
         return False
-    with mss.mss() as sct:
-        frame = np.array(sct.grab(sct.monitors[1]))        # BGRA
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
-    res  = cv2.matchTemplate(gray, TEMPLATE, cv2.TM_CCOEFF_NORMED)
-    return (res >= threshold).any()
+    # one monitor at a time, the one the toolbar was last seen on first
+    for monitor in list(MONITORS):
+        gray = CAPTURE.grab(monitor).to_gray()
+        res  = cv2.matchTemplate(gray, TEMPLATE, cv2.TM_CCOEFF_NORMED)
+        if (res >= threshold).any():
+            MONITORS.remove(monitor)
+            MONITORS.insert(0, monitor)
+            return True
+    return False
+
+def toolbar_check(threshold=0.85):
+    def check(frame):
+        res = cv2.matchTemplate(frame.to_gray(), TEMPLATE, cv2.TM_CCOEFF_NORMED)
+        return True if (res >= threshold).any() else None
+    return check
 
 def wait_for_session(timeout=CONNECTION_TIMEOUT):
     print(f"⏳ Waiting (max {timeout}s) for remote user to accept…")
+    # 2) Toolbar icon visible - one watch per monitor on the shared watcher
+    toolbar = [WATCHER.watch(toolbar_check(), region=m, name="toolbar") for m in MONITORS] if TEMPLATE is not None else []
     start = time.time()
+    try:
+        return poll_session(start, timeout, toolbar)
+    finally:
+        for future in toolbar:
+            future.cancel()
+
+def poll_session(start, timeout, toolbar):
     while time.time() - start < timeout:
         # 1) Viewer window appears
         viewer = next(
@@ -53,7 +77,7 @@ def wait_for_session(timeout=CONNECTION_TIMEOUT):
             return True
 
         # 2) Toolbar icon visible
-        if match_toolbar_icon():
+        if any(future.done() and not future.cancelled() for future in toolbar):
             print("✅ Toolbar detected — session live.")
             return True
 
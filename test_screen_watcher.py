@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Test script for wait_for/wait_until_gone on a synthetic display: an element smaller than
+# any sampling grid must still wake the watcher when it appears and when it goes away
+#
+# Usage: python test_screen_watcher.py
+
+import sys
+import os
+import threading
+import tempfile
+
+from PIL import Image
+
+# Add modules directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from modules.ai_vision_controller import EnhancedAIVisionController
+from modules.display_backend import SyntheticDisplay
+
+ICON_RECT = (113, 113, 12, 12)  # Off any 16-pixel grid, smaller than a grid cell
+
+
+def set_visible_later(display, widget, visible, delay):
+    """Show or hide a widget after a delay, like an app reacting in the background"""
+    def change():
+        with display._lock:
+            widget.visible = visible
+            display.invalidate()
+    timer = threading.Timer(delay, change)
+    timer.start()
+    return timer
+
+
+def main():
+    """Main entry point"""
+    display = SyntheticDisplay()
+    icon = display.add_widget("icon", "button", ICON_RECT, color=(200, 0, 0))
+    controller = EnhancedAIVisionController(display)
+    failures = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Save the icon as a UI element, then hide it
+        frame = controller.grab_frame(fresh=True)
+        path = os.path.join(directory, "icon.png")
+        Image.fromarray(frame.crop(ICON_RECT).to_rgb()).save(path)
+        controller.save_ui_element("icon", path)
+        icon.visible = False
+        display.invalidate()
+
+        set_visible_later(display, icon, True, 0.6)
+        found = controller.wait_for("icon", timeout=3)
+        stats = controller.screen_watcher.get_stats()
+        if found is None:
+            print(f"FAIL: wait_for missed the 12x12 icon ({stats})", flush=True)
+            failures += 1
+        else:
+            print(f"OK: wait_for found the icon at {found} ({stats})", flush=True)
+
+        set_visible_later(display, icon, False, 0.6)
+        gone = controller.wait_until_gone("icon", timeout=3)
+        if not gone:
+            print("FAIL: wait_until_gone missed the icon disappearing", flush=True)
+            failures += 1
+        else:
+            print("OK: wait_until_gone saw the icon go away", flush=True)
+
+    controller.screen_watcher.stop()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
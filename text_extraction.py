@@ -1,7 +1,9 @@
 import cv2
 import numpy as np
 import pyautogui
-import pytesseract
+
+from modules.ocr_engine import get_ocr_engine
+from modules.tiled_ocr import get_tiled_ocr
 # from PIL import Image
 # import re
 
@@ -10,6 +12,8 @@ class ScreenTextLocator:
         """Initialize the screen text locator"""
         # Disable pyautogui failsafe for smoother operation
         pyautogui.FAILSAFE = False
+        # OCR as overlapping tiles in a process pool (faster on big screens)
+        self.tiled = False
         
     def take_screenshot(self):
         """Take a screenshot of the entire screen"""
@@ -32,10 +36,11 @@ class ScreenTextLocator:
         
         return processed
     
-    def extract_text_with_positions(self, image):
+    def extract_text_with_positions(self, image, tiled=False):
         """Extract text and their bounding box coordinates from image"""
-        # Get detailed data from tesseract including bounding boxes
-        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        # Get detailed data from tesseract including bounding boxes (engine stays loaded between calls)
+        engine = get_tiled_ocr() if tiled else get_ocr_engine()
+        data = engine.image_to_data(image)
         
         text_info = []
         n_boxes = len(data['level'])
@@ -56,7 +61,7 @@ class ScreenTextLocator:
         
         return text_info
     
-    def find_text_location(self, target_text, case_sensitive=False, partial_match=True):
+    def find_text_location(self, target_text, case_sensitive=False, partial_match=True, tiled=None):
         """
         Find the geometric location of specific text on screen
         
@@ -64,6 +69,7 @@ class ScreenTextLocator:
             target_text (str): Text to search for
             case_sensitive (bool): Whether to perform case-sensitive search
             partial_match (bool): Whether to allow partial matches
+            tiled (bool): OCR as parallel tiles (None uses self.tiled)
             
         Returns:
             list: List of dictionaries containing text matches with their locations
@@ -75,7 +81,7 @@ class ScreenTextLocator:
         processed_image = self.preprocess_image(screenshot)
         
         # Extract text with positions
-        text_info = self.extract_text_with_positions(processed_image)
+        text_info = self.extract_text_with_positions(processed_image, self.tiled if tiled is None else tiled)
         
         # Search for target text
         matches = []